@@ -2,6 +2,7 @@ import { NextResponse } from "next/server"
 import { spawn } from "child_process"
 import path from "path"
 import fs from "fs"
+import net from "net"
 
 // ML Model Integration API
 export async function POST(request) {
@@ -171,8 +172,82 @@ async function runComprehensiveAnalysis(inputData) {
   }
 }
 
+// Endpoints served by ml_models/inference_server.py, keyed by script name
+const INFERENCE_SERVER_ENDPOINTS = {
+  'predict_yield.py': '/predict_yield',
+  'predict_crops.py': '/recommend_crops',
+  'comprehensive_analysis.py': '/comprehensive_analysis'
+}
+
+// Call the long-running inference server instead of spawning Python
+async function runInferenceServer(url, inputData) {
+  const response = await fetch(url, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ input: inputData })
+  })
+
+  if (!response.ok) {
+    throw new Error(`Inference server returned ${response.status}`)
+  }
+
+  return response.json()
+}
+
+// Tasks run by ml_models/zygote_server.py, keyed by script name
+const ZYGOTE_TASKS = {
+  'predict_yield.py': 'predict_yield',
+  'predict_crops.py': 'recommend_crops',
+  'comprehensive_analysis.py': 'comprehensive_analysis'
+}
+
+// Have the zygote fork a pre-loaded child for this request instead of spawning Python
+function runZygote(socketPath, task, inputData) {
+  return new Promise((resolve, reject) => {
+    const socket = net.createConnection(socketPath)
+    let output = ''
+
+    socket.setEncoding('utf8')
+    socket.setTimeout(60000)
+
+    socket.on('connect', () => {
+      socket.write(JSON.stringify({ task: task, input: inputData }) + '\n')
+    })
+
+    socket.on('data', (data) => {
+      output += data
+    })
+
+    socket.on('timeout', () => {
+      socket.destroy(new Error('Zygote request timed out'))
+    })
+
+    socket.on('error', reject)
+
+    socket.on('end', () => {
+      try {
+        resolve(JSON.parse(output))
+      } catch (parseError) {
+        reject(new Error(`Failed to parse zygote output: ${parseError.message}`))
+      }
+    })
+  })
+}
+
 // Run Python script with input data
 async function runPythonScript(scriptPath, inputData) {
+  const serverUrl = process.env.ML_INFERENCE_URL
+  const endpoint = INFERENCE_SERVER_ENDPOINTS[path.basename(scriptPath)]
+  if (serverUrl && endpoint) {
+    return runInferenceServer(serverUrl.replace(/\/$/, '') + endpoint, inputData)
+  }
+
+  const zygoteSocket = process.env.ML_ZYGOTE_SOCKET
+  const zygoteTask = ZYGOTE_TASKS[path.basename(scriptPath)]
+  if (zygoteSocket && zygoteTask) {
+    return runZygote(zygoteSocket, zygoteTask, inputData)
+  }
+
   return new Promise((resolve, reject) => {
     const python = spawn('python', [scriptPath], {
       stdio: ['pipe', 'pipe', 'pipe']
@@ -0,0 +1,114 @@
+"""
+Admission Control
+Bounds the prediction queue and sheds requests that cannot meet their deadline to the heuristic fallbacks
+"""
+
+import time
+import threading
+from typing import Callable, Dict, Optional
+
+DEADLINE_HEADER = 'X-Deadline-Ms'
+
+SHED_REASONS = ('queue_full', 'expected_wait', 'deadline_expired')
+
+
+class AdmissionController:
+    """Decides per prediction request whether to run the models or answer from the fallback.
+
+    A request is shed at arrival when max_queue predictions are already
+    queued or running, or when the expected wait plus service time would
+    miss its deadline. The wait is estimated from the requests ahead of it
+    and a moving average of service time. An admitted request that is
+    still queued when its deadline passes is shed when it would start.
+
+    With micro-batching, workers is the batch size and service time is
+    measured per batch, so a full batch counts as one round of workers.
+    """
+
+    def __init__(self, max_queue: int = 64, workers: int = 4, deadline_ms: float = 1000.0,
+                 smoothing: float = 0.1):
+        self.max_queue = max_queue
+        self.workers = max(workers, 1)
+        self.deadline_ms = deadline_ms
+        self.smoothing = smoothing
+
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.service_seconds = None
+        self.stats = {"admitted": 0, **{reason: 0 for reason in SHED_REASONS}}
+
+    def deadline_for(self, headers: Dict, payload: Dict) -> float:
+        """Monotonic deadline from the X-Deadline-Ms header, the body's deadline_ms, or the default"""
+        budget_ms = headers.get(DEADLINE_HEADER.lower(), payload.get("deadline_ms"))
+        try:
+            budget_ms = float(budget_ms) if budget_ms is not None else self.deadline_ms
+        except (TypeError, ValueError):
+            budget_ms = self.deadline_ms
+        return time.monotonic() + budget_ms / 1000.0
+
+    def expected_wait_seconds(self) -> float:
+        """Time until a worker frees up for a request arriving now"""
+        if self.service_seconds is None:
+            return 0.0
+        ahead = self.in_flight - self.workers + 1
+        return max(ahead, 0) * self.service_seconds / self.workers
+
+    def try_admit(self, deadline: float) -> Optional[str]:
+        """None if the request may queue for the models, else the reason it is shed"""
+        with self._lock:
+            if self.in_flight >= self.max_queue:
+                reason = "queue_full"
+            elif self.service_seconds is not None and \
+                    time.monotonic() + self.expected_wait_seconds() + self.service_seconds > deadline:
+                reason = "expected_wait"
+            else:
+                self.in_flight += 1
+                self.stats["admitted"] += 1
+                return None
+            self.stats[reason] += 1
+            return reason
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def record_expired(self):
+        with self._lock:
+            self.stats["deadline_expired"] += 1
+
+    def record_service(self, seconds: float):
+        with self._lock:
+            if self.service_seconds is None:
+                self.service_seconds = seconds
+            else:
+                self.service_seconds += self.smoothing * (seconds - self.service_seconds)
+
+    def guard(self, handler: Callable, deadline: float, degrade: Callable[[], Dict]) -> Callable:
+        """Wrap a blocking handler so it falls back if its deadline passed while it was queued.
+
+        Batched predictions bypass it; the micro-batcher checks their deadline
+        when it dequeues them and times each batch instead.
+        """
+        def guarded(*args):
+            if time.monotonic() >= deadline:
+                self.record_expired()
+                return degrade()
+            start = time.perf_counter()
+            try:
+                return handler(*args)
+            finally:
+                self.record_service(time.perf_counter() - start)
+        return guarded
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            shed = sum(self.stats[reason] for reason in SHED_REASONS)
+            return {
+                **self.stats,
+                "shed": shed,
+                "in_flight": self.in_flight,
+                "max_queue": self.max_queue,
+                "deadline_ms": self.deadline_ms,
+                "service_ms": self.service_seconds * 1000 if self.service_seconds is not None else None,
+                "expected_wait_ms": self.expected_wait_seconds() * 1000
+            }
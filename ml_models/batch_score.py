@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Batch Scoring Script
+Streams large JSONL/CSV farm files through the yield and crop models in chunks
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import contextlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from model_inference import AgriculturalMLInference
+from predict_crops import generate_mock_crop_recommendation
+from predict_yield import generate_mock_yield_prediction
+from thread_config import InferenceThreadPolicy
+
+RESULT_COLUMNS = [
+    'ensemble_yield', 'yield_lower', 'yield_upper', 'yield_uncertainty',
+    'top_crop', 'top_crop_score', 'recommended_crops', 'error'
+]
+
+# Model components each --task needs
+TASK_COMPONENTS = {
+    'yield': ['preprocessor', 'yield_predictor'],
+    'crops': ['preprocessor', 'crop_recommender'],
+    'both': ['preprocessor', 'yield_predictor', 'crop_recommender']
+}
+
+# Inference tasks behind each --task; a missing one is served by its heuristic fallback
+TASK_PARTS = {
+    'yield': ['predict_yield'],
+    'crops': ['recommend_crops'],
+    'both': ['predict_yield', 'recommend_crops']
+}
+
+# Loaded once per pool process by _init_worker
+_inference = None
+
+
+def detect_format(path: str, explicit: Optional[str] = None) -> str:
+    """Pick jsonl or csv from an explicit flag or the file extension"""
+    if explicit:
+        return explicit
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def read_chunks(path: str, file_format: str, chunk_size: int) -> Iterator[List[Dict]]:
+    """Yield lists of at most chunk_size input records without reading the whole file"""
+    if file_format == 'csv':
+        for chunk in pd.read_csv(path, chunksize=chunk_size):
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+            yield chunk.to_dict('records')
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = (line for line in f if line.strip())
+        while True:
+            chunk = list(islice(lines, chunk_size))
+            if not chunk:
+                return
+            yield [json.loads(line) for line in chunk]
+
+
+def _init_worker(models_dir: str, task: str = 'both', cache_db: Optional[str] = None,
+                 threads: Optional[int] = None):
+    """Load the models the task needs once in each pool process"""
+    global _inference
+    _inference = AgriculturalMLInference(models_dir)
+    # Pool processes split the cores instead of each starting a full-core pool
+    threads = threads or os.cpu_count() or 1
+    _inference.configure_threads(InferenceThreadPolicy(
+        single_row_threads=1, small_batch_threads=threads, bulk_threads=threads, native_threads=threads
+    ), tier='bulk')
+    with contextlib.redirect_stdout(sys.stderr):
+        if not _inference.load_models(TASK_COMPONENTS[task]):
+            missing = [part for part in TASK_PARTS[task] if not _inference.is_available(part)]
+            if len(missing) == len(TASK_PARTS[task]):
+                raise RuntimeError(f"Could not load models from {models_dir}")
+            print(f"⚠️ Models for {', '.join(missing)} are not available, "
+                  f"scoring them with the heuristic fallback")
+    if cache_db:
+        # Disk only: rows rarely repeat within one run, but reruns share the file
+        _inference.enable_prediction_cache(max_entries=0, ttl_seconds=None, disk_path=cache_db)
+
+
+def score_chunk(records: List[Dict], task: str = 'both', top_k: int = 5) -> List[Dict]:
+    """Score one chunk with the batch API and flatten results into output rows"""
+    with contextlib.redirect_stdout(sys.stderr):
+        if task == 'both' and _inference.is_available('comprehensive_analysis'):
+            analyses = _inference.get_comprehensive_analysis_batch(records, top_k)
+            results = [
+                (
+                    {"success": a.get("success"), "predictions": a.get("yield_prediction"), "error": a.get("error")},
+                    {"success": a.get("success"), "recommendations": a.get("crop_recommendations"), "error": a.get("error")},
+                )
+                for a in analyses
+            ]
+        else:
+            yield_results = crop_results = [None] * len(records)
+            if 'predict_yield' in TASK_PARTS[task]:
+                yield_results = _score_part(records, 'predict_yield', top_k)
+            if 'recommend_crops' in TASK_PARTS[task]:
+                crop_results = _score_part(records, 'recommend_crops', top_k)
+            results = list(zip(yield_results, crop_results))
+
+    rows = []
+    for record, (yield_result, crop_result) in zip(records, results):
+        row = dict(record)
+        errors = []
+
+        if yield_result is not None:
+            if yield_result.get("success"):
+                predictions = yield_result["predictions"]
+                interval = predictions.get("confidence_interval", {})
+                row['ensemble_yield'] = predictions.get("ensemble_yield")
+                row['yield_lower'] = interval.get("lower")
+                row['yield_upper'] = interval.get("upper")
+                row['yield_uncertainty'] = interval.get("uncertainty")
+            else:
+                errors.append(yield_result.get("error"))
+
+        if crop_result is not None:
+            if crop_result.get("success"):
+                recommendations = crop_result["recommendations"]
+                if recommendations:
+                    row['top_crop'] = recommendations[0]['crop']
+                    row['top_crop_score'] = float(recommendations[0]['score'])
+                row['recommended_crops'] = ";".join(rec['crop'] for rec in recommendations)
+            else:
+                errors.append(crop_result.get("error"))
+
+        if errors:
+            row['error'] = "; ".join(dict.fromkeys(e for e in errors if e))
+        rows.append(row)
+
+    return rows
+
+
+def _score_part(records: List[Dict], part: str, top_k: int) -> List[Dict]:
+    """Score one inference task over a chunk, with its heuristic when the models are missing"""
+    if part == 'predict_yield':
+        if _inference.is_available(part):
+            return _inference.predict_yield_batch(records)
+        return [generate_mock_yield_prediction(record) for record in records]
+
+    if _inference.is_available(part):
+        return _inference.recommend_crops_batch(records, top_k)
+    results = [generate_mock_crop_recommendation(record) for record in records]
+    for result in results:
+        result["recommendations"] = result["recommendations"][:top_k]
+    return results
+
+
+class ResultWriter:
+    def __init__(self, path: str, file_format: str):
+        self.file_format = file_format
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        self.csv_writer = None
+
+    def write(self, rows: List[Dict]):
+        if self.file_format == 'jsonl':
+            self.file.writelines(json.dumps(row) + "\n" for row in rows)
+            return
+
+        if self.csv_writer is None:
+            # Columns are fixed by the first chunk: its input fields, then the results
+            input_columns = [col for col in rows[0] if col not in RESULT_COLUMNS] if rows else []
+            self.csv_writer = csv.DictWriter(self.file, fieldnames=input_columns + RESULT_COLUMNS,
+                                             extrasaction='ignore')
+            self.csv_writer.writeheader()
+        self.csv_writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+def run_batch_scoring(input_path: str, output_path: str, models_dir: str = "trained_models",
+                      chunk_size: int = 10000, processes: int = 1, task: str = 'both', top_k: int = 5,
+                      input_format: Optional[str] = None, output_format: Optional[str] = None,
+                      cache_db: Optional[str] = None) -> Dict:
+    """Score input_path into output_path, keeping at most a few chunks in memory"""
+    input_format = detect_format(input_path, input_format)
+    output_format = detect_format(output_path, output_format)
+    chunks = read_chunks(input_path, input_format, chunk_size)
+    writer = ResultWriter(output_path, output_format)
+
+    total_rows = 0
+    start_time = time.perf_counter()
+
+    def report(rows: List[Dict]):
+        nonlocal total_rows
+        writer.write(rows)
+        total_rows += len(rows)
+        elapsed = time.perf_counter() - start_time
+        print(f"Scored {total_rows} rows ({total_rows / elapsed:.0f} rows/s)", file=sys.stderr)
+
+    try:
+        if processes <= 1:
+            _init_worker(models_dir, task, cache_db)
+            for records in chunks:
+                report(score_chunk(records, task, top_k))
+        else:
+            # Results are written in submission order; the window bounds memory use
+            max_in_flight = processes * 2
+            with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                     initargs=(models_dir, task, cache_db,
+                                               max(1, (os.cpu_count() or 1) // processes))) as executor:
+                pending = deque()
+                for records in chunks:
+                    pending.append(executor.submit(score_chunk, records, task, top_k))
+                    if len(pending) >= max_in_flight:
+                        report(pending.popleft().result())
+                while pending:
+                    report(pending.popleft().result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start_time
+    return {
+        "rows": total_rows,
+        "seconds": elapsed,
+        "rows_per_second": total_rows / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def main():
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Score large farm files with the trained ML models")
+    parser.add_argument("input", help="Input file (.jsonl or .csv)")
+    parser.add_argument("output", help="Output file (.jsonl or .csv)")
+    parser.add_argument("--models-dir", default="trained_models")
+    parser.add_argument("--task", choices=['yield', 'crops', 'both'], default='both')
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--input-format", choices=['jsonl', 'csv'])
+    parser.add_argument("--output-format", choices=['jsonl', 'csv'])
+    parser.add_argument("--cache-db", help="SQLite prediction cache reused by later runs on the same models")
+    args = parser.parse_args()
+
+    summary = run_batch_scoring(
+        args.input, args.output, models_dir=args.models_dir, chunk_size=args.chunk_size,
+        processes=args.processes, task=args.task, top_k=args.top_k,
+        input_format=args.input_format, output_format=args.output_format, cache_db=args.cache_db
+    )
+    print(f"✅ Scored {summary['rows']} rows in {summary['seconds']:.1f}s "
+          f"({summary['rows_per_second']:.0f} rows/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Compiled Yield Ensemble
+Flattens the trained yield models into numpy arrays evaluated in one vectorized pass
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from typing import Dict, List, Optional
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Objectives whose raw score is the prediction, so leaf sums need no link function
+XGBOOST_IDENTITY_OBJECTIVES = ('reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror')
+LIGHTGBM_IDENTITY_OBJECTIVES = ('regression', 'regression_l1', 'huber', 'fair', 'quantile', 'mape')
+
+
+def _float32_floor(values: np.ndarray) -> np.ndarray:
+    """Largest float32 not above each float64 value"""
+    rounded = np.asarray(values, dtype=np.float64).astype(np.float32)
+    return np.where(rounded.astype(np.float64) > values,
+                    np.nextafter(rounded, np.float32(-np.inf)), rounded)
+
+
+def _float32_cut(split_values: np.ndarray) -> np.ndarray:
+    """Float64 thresholds t such that x <= t exactly when float32(x) <= split_values.
+
+    sklearn and XGBoost compare float32 copies of the input; this moves the
+    rounding into the threshold so every tree can share one float64 rule.
+    """
+    f = np.asarray(split_values, dtype=np.float32)
+    above = np.nextafter(f, np.float32(np.inf))
+    midpoint = (f.astype(np.float64) + above.astype(np.float64)) / 2
+    # A float64 input exactly halfway rounds to the float32 neighbour with an even mantissa
+    rounds_down = (f.view(np.uint32) & 1) == 0
+    return np.where(rounds_down, midpoint, np.nextafter(midpoint, -np.inf))
+
+
+class _Forest:
+    """Accumulates trees as flat node arrays with global node indices"""
+
+    def __init__(self):
+        self.feature = []
+        self.threshold = []
+        self.left = []
+        self.right = []
+        self.value = []
+        self.roots = []
+        self.tree_model = []
+        self.tree_depth = []
+        self.n_nodes = 0
+
+    def add_tree(self, model_index: int, feature: np.ndarray, threshold: np.ndarray,
+                 left: np.ndarray, right: np.ndarray, value: np.ndarray, depth: int):
+        """Add one tree; leaves are marked with left == -1 and loop back to themselves"""
+        nodes = np.arange(len(feature)) + self.n_nodes
+        leaves = left < 0
+
+        self.feature.append(np.where(leaves, 0, feature))
+        self.threshold.append(np.where(leaves, 0.0, threshold))
+        self.left.append(np.where(leaves, nodes, left + self.n_nodes))
+        self.right.append(np.where(leaves, nodes, right + self.n_nodes))
+        self.value.append(np.where(leaves, value, 0.0))
+        self.roots.append(self.n_nodes)
+        self.tree_model.append(model_index)
+        self.tree_depth.append(depth)
+        self.n_nodes += len(feature)
+
+
+def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+    max_depth = 0
+    stack = [(0, 0)]
+    while stack:
+        node, depth = stack.pop()
+        max_depth = max(max_depth, depth)
+        if left[node] >= 0:
+            stack.append((left[node], depth + 1))
+            stack.append((right[node], depth + 1))
+    return max_depth
+
+
+def _add_sklearn_trees(forest: _Forest, model_index: int, estimators, scale: float):
+    for estimator in estimators:
+        tree = estimator.tree_
+        forest.add_tree(
+            model_index,
+            tree.feature,
+            # sklearn goes left when float32(x) <= threshold
+            _float32_cut(_float32_floor(tree.threshold)),
+            tree.children_left,
+            tree.children_right,
+            tree.value[:, 0, 0] * scale,
+            tree.max_depth
+        )
+
+
+def _compile_random_forest(forest: _Forest, model_index: int, model) -> float:
+    _add_sklearn_trees(forest, model_index, model.estimators_, 1.0 / len(model.estimators_))
+    return 0.0
+
+
+def _compile_gradient_boosting(forest: _Forest, model_index: int, model) -> float:
+    if isinstance(model.init_, str) and model.init_ == 'zero':
+        base = 0.0
+    elif hasattr(model.init_, 'constant_'):
+        base = float(np.ravel(model.init_.constant_)[0])
+    else:
+        raise ValueError("only constant init estimators can be compiled")
+
+    _add_sklearn_trees(forest, model_index, model.estimators_[:, 0], model.learning_rate)
+    return base
+
+
+def _compile_xgboost(forest: _Forest, model_index: int, model) -> float:
+    learner = json.loads(model.get_booster().save_raw('json'))['learner']
+    objective = learner['objective']['name']
+    if objective not in XGBOOST_IDENTITY_OBJECTIVES:
+        raise ValueError(f"objective {objective} is not supported")
+
+    booster = learner['gradient_booster']
+    if booster['name'] != 'gbtree':
+        raise ValueError(f"booster {booster['name']} is not supported")
+
+    trees = booster['model']['trees']
+    try:
+        best_iteration = model.best_iteration
+    except AttributeError:
+        best_iteration = None
+    if best_iteration is not None:
+        trees = trees[:booster['model']['iteration_indptr'][best_iteration + 1]]
+
+    for tree in trees:
+        if any(tree.get('split_type', [])):
+            raise ValueError("categorical splits are not supported")
+
+        left = np.asarray(tree['left_children'], dtype=np.int64)
+        right = np.asarray(tree['right_children'], dtype=np.int64)
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        # XGBoost goes left when float32(x) < condition; leaves store their value in split_conditions
+        forest.add_tree(
+            model_index,
+            np.asarray(tree['split_indices'], dtype=np.int64),
+            _float32_cut(np.nextafter(conditions, np.float32(-np.inf))),
+            left,
+            right,
+            conditions.astype(np.float64),
+            _tree_depth(left, right)
+        )
+
+    return float(learner['learner_model_param']['base_score'].strip('[]'))
+
+
+def _compile_lightgbm(forest: _Forest, model_index: int, model) -> float:
+    dump = model.booster_.dump_model()
+    objective = dump.get('objective', '').split()[0]
+    if objective not in LIGHTGBM_IDENTITY_OBJECTIVES:
+        raise ValueError(f"objective {objective} is not supported")
+
+    for tree_info in dump['tree_info']:
+        feature, threshold, left, right, value = [], [], [], [], []
+        depth = 0
+        # Depth-first so children get indices after their parent
+        stack = [(tree_info['tree_structure'], None, False, 0)]
+        while stack:
+            node, parent, is_right, node_depth = stack.pop()
+            index = len(feature)
+            depth = max(depth, node_depth)
+            if parent is not None:
+                (right if is_right else left)[parent] = index
+
+            if 'leaf_value' in node:
+                feature.append(0)
+                threshold.append(0.0)
+                left.append(-1)
+                right.append(-1)
+                value.append(node['leaf_value'])
+                continue
+
+            if node['decision_type'] != '<=' or node.get('missing_type') == 'Zero':
+                raise ValueError("only numerical splits without zero-as-missing are supported")
+
+            feature.append(node['split_feature'])
+            threshold.append(node['threshold'])
+            left.append(-1)
+            right.append(-1)
+            value.append(0.0)
+            stack.append((node['right_child'], index, True, node_depth + 1))
+            stack.append((node['left_child'], index, False, node_depth + 1))
+
+        # LightGBM compares the float64 input directly
+        forest.add_tree(
+            model_index,
+            np.asarray(feature, dtype=np.int64),
+            np.asarray(threshold, dtype=np.float64),
+            np.asarray(left, dtype=np.int64),
+            np.asarray(right, dtype=np.int64),
+            np.asarray(value, dtype=np.float64),
+            depth
+        )
+
+    return 0.0
+
+
+class CompiledEnsemble:
+    """The yield ensemble as flat arrays: one tree walk, one linear product, RBF kernels"""
+
+    def __init__(self, model_names: List[str], n_features: int):
+        self.model_names = list(model_names)
+        self.n_features = n_features
+        self.base = np.zeros(len(self.model_names))
+
+        # Trees of every tree model, walked together
+        self.node_feature = np.zeros(0, dtype=np.intp)
+        self.node_threshold = np.zeros(0)
+        # Left child at 2 * node, right child at 2 * node + 1
+        self.node_children = np.zeros(0, dtype=np.intp)
+        self.node_value = np.zeros(0)
+        self.tree_roots = np.zeros(0, dtype=np.intp)
+        self.tree_to_model = np.zeros((0, len(self.model_names)))
+        self.tree_depth = np.zeros(0, dtype=np.intp)
+
+        # Linear models share one coefficient matrix
+        self.linear_coef = np.zeros((n_features, len(self.model_names)))
+
+        # model index -> (support vectors, squared norms, dual coefficients, gamma)
+        self.rbf_kernels = {}
+
+        # Models that could not be compiled keep their own predict
+        self.native_models = {}
+
+    def predict(self, X, ensemble_weights: Optional[Dict[str, float]] = None) -> Dict[str, np.ndarray]:
+        """Per-model predictions plus the weighted 'ensemble', like CropYieldPredictor.predict_yield.
+
+        With ensemble_weights only the weighted models are evaluated, so a
+        cheaper operating point also walks fewer and shallower trees.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got shape {X.shape}")
+
+        active = np.array([not ensemble_weights or name in ensemble_weights for name in self.model_names])
+        outputs = self.base + X @ self.linear_coef
+
+        trees = self.tree_to_model[:, active].any(axis=1)
+        if trees.any():
+            # Every row walks every tree one level per step; leaves loop back to themselves
+            X_flat = X.ravel()
+            row_offsets = (np.arange(len(X)) * self.n_features)[:, None]
+            roots = self.tree_roots[trees]
+            nodes = np.broadcast_to(roots, (len(X), len(roots)))
+            for _ in range(self.tree_depth[trees].max()):
+                go_right = X_flat[row_offsets + self.node_feature[nodes]] > self.node_threshold[nodes]
+                nodes = self.node_children[2 * nodes + go_right]
+            outputs += self.node_value[nodes] @ self.tree_to_model[trees]
+
+        for index, (support_vectors, sv_norms, dual_coef, gamma) in self.rbf_kernels.items():
+            if not active[index]:
+                continue
+            sq_dist = (X * X).sum(axis=1)[:, None] + sv_norms - 2 * (X @ support_vectors.T)
+            outputs[:, index] += np.exp(-gamma * np.maximum(sq_dist, 0)) @ dual_coef
+
+        for index, model in self.native_models.items():
+            if active[index]:
+                outputs[:, index] = model.predict(X)
+
+        predictions = {name: outputs[:, i] for i, name in enumerate(self.model_names) if active[i]}
+
+        if ensemble_weights:
+            weights = np.array([ensemble_weights.get(name, 0.0) for name in self.model_names])
+            predictions['ensemble'] = outputs @ weights
+
+        return predictions
+
+    @classmethod
+    def from_models(cls, models: Dict, n_features: Optional[int] = None) -> 'CompiledEnsemble':
+        """Compile fitted models, keeping any unsupported model as a native fallback"""
+        if n_features is None:
+            n_features = next(model.n_features_in_ for model in models.values()
+                              if hasattr(model, 'n_features_in_'))
+        ensemble = cls(list(models), n_features)
+        forest = _Forest()
+
+        for index, (name, model) in enumerate(models.items()):
+            try:
+                ensemble.base[index] = ensemble._compile_model(forest, index, model)
+            except (ValueError, KeyError) as e:
+                print(f"⚠️ {name} kept as a native model: {e}")
+                ensemble.native_models[index] = model
+
+        if forest.roots:
+            ensemble.node_feature = np.concatenate(forest.feature).astype(np.intp)
+            ensemble.node_threshold = np.concatenate(forest.threshold).astype(np.float64)
+            ensemble.node_children = np.stack(
+                [np.concatenate(forest.left), np.concatenate(forest.right)], axis=1
+            ).ravel().astype(np.intp)
+            ensemble.node_value = np.concatenate(forest.value).astype(np.float64)
+            ensemble.tree_roots = np.asarray(forest.roots, dtype=np.intp)
+            ensemble.tree_depth = np.asarray(forest.tree_depth, dtype=np.intp)
+            ensemble.tree_to_model = np.zeros((len(forest.roots), len(ensemble.model_names)))
+            ensemble.tree_to_model[np.arange(len(forest.roots)), forest.tree_model] = 1.0
+
+        return ensemble
+
+    def _compile_model(self, forest: _Forest, index: int, model) -> float:
+        """Add one model's arrays and return its constant offset"""
+        kind = type(model).__name__
+
+        if kind in ('RandomForestRegressor', 'ExtraTreesRegressor'):
+            return _compile_random_forest(forest, index, model)
+        if kind == 'GradientBoostingRegressor':
+            return _compile_gradient_boosting(forest, index, model)
+        if kind == 'XGBRegressor':
+            return _compile_xgboost(forest, index, model)
+        if kind == 'LGBMRegressor':
+            return _compile_lightgbm(forest, index, model)
+
+        if kind in ('LinearRegression', 'Ridge', 'Lasso', 'ElasticNet') or \
+                (kind == 'SVR' and model.kernel == 'linear'):
+            coef = np.ravel(model.coef_)
+            if len(coef) != self.n_features:
+                raise ValueError("coefficient shape does not match the features")
+            self.linear_coef[:, index] = coef
+            return float(np.ravel(model.intercept_)[0])
+
+        if kind == 'SVR' and model.kernel == 'rbf':
+            support_vectors = np.asarray(model.support_vectors_, dtype=np.float64)
+            self.rbf_kernels[index] = (
+                support_vectors,
+                (support_vectors * support_vectors).sum(axis=1),
+                np.ravel(model.dual_coef_).astype(np.float64),
+                float(model._gamma)
+            )
+            return float(np.ravel(model.intercept_)[0])
+
+        raise ValueError(f"{kind} is not supported")
+
+
+def compare_with_native(models: Dict, compiled: CompiledEnsemble, X: np.ndarray) -> Dict[str, float]:
+    """Largest absolute difference between compiled and native predictions per model"""
+    compiled_predictions = compiled.predict(X)
+    return {
+        name: float(np.max(np.abs(compiled_predictions[name] - model.predict(X))))
+        for name, model in models.items()
+    }
+
+
+def _time_predict(predict, X: np.ndarray, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        predict(X)
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def main():
+    """Export a compiled artifact from an existing yield_predictor.pkl"""
+    parser = argparse.ArgumentParser(description="Compile the yield ensemble into flat numpy arrays")
+    parser.add_argument("model", nargs="?", default="trained_models/yield_predictor.pkl")
+    parser.add_argument("output", nargs="?", help="Output path (default: <model>_compiled.pkl)")
+    parser.add_argument("--check-rows", type=int, default=1000,
+                        help="Random rows used to compare against the native models and time both")
+    args = parser.parse_args()
+
+    from yield_predictor import CropYieldPredictor, COMPILED_MAX_ROWS
+
+    predictor = CropYieldPredictor()
+    predictor.load_model(args.model)
+    output = args.output or args.model.replace('.pkl', '_compiled.pkl')
+    compiled = predictor.export_compiled(output)
+
+    if args.check_rows > 0:
+        X = np.random.default_rng(0).normal(size=(args.check_rows, compiled.n_features))
+        for name, diff in compare_with_native(predictor.models, compiled, X).items():
+            print(f"  {name:<20} max |compiled - native| = {diff:.2e}")
+
+        native = CropYieldPredictor()
+        native.models, native.ensemble_weights, native.is_trained = \
+            predictor.models, predictor.ensemble_weights, True
+        crossover = None
+        for rows in sorted({r for r in (1, 8, 32, 64, 128, 256, 512, args.check_rows) if r <= args.check_rows}):
+            native_ms = _time_predict(native.predict_yield, X[:rows], 5)
+            compiled_ms = _time_predict(lambda X_rows: compiled.predict(X_rows, predictor.ensemble_weights),
+                                        X[:rows], 5)
+            print(f"  {rows:>6} rows: native {native_ms:.2f} ms, compiled {compiled_ms:.2f} ms")
+            if crossover is None and native_ms < compiled_ms:
+                crossover = rows
+        if crossover is not None:
+            print(f"  Native models are faster from about {crossover} rows "
+                  f"(--compiled-max-rows, default {COMPILED_MAX_ROWS})")
+
+
+if __name__ == "__main__":
+    main()
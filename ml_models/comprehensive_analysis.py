@@ -21,7 +21,7 @@ def main():
         input_data = json.loads(sys.stdin.read())
         
         # Initialize inference
-        inference = AgriculturalMLInference()
+        inference = AgriculturalMLInference(compiled_max_rows=None)
         
         # Load models
         if not inference.load_models():
@@ -250,5 +250,17 @@ def generate_crop_reasons(crop, input_data):
     
     return reasons[:3]  # Limit to 3 reasons
 
+def run_worker_mode():
+    """Serve comprehensive analysis requests line by line with models loaded once"""
+    from inference_worker import run_worker
+
+    run_worker(
+        lambda inference, input_data: inference.get_comprehensive_analysis(input_data),
+        generate_mock_comprehensive_analysis
+    )
+
 if __name__ == "__main__":
-    main()
+    if "--worker" in sys.argv[1:]:
+        run_worker_mode()
+    else:
+        main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Concurrency Check Script
+Hammers one AgriculturalMLInference from many threads and compares every result with serial execution
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from model_inference import AgriculturalMLInference, WARMUP_RANGES
+from thread_config import InferenceThreadPolicy
+
+CHECKED_TASKS = ('predict_yield', 'recommend_crops', 'comprehensive_analysis')
+
+
+def make_inputs(n_inputs: int, seed: int = 0) -> List[Dict]:
+    """Distinct farms with soil and weather values drawn from their valid ranges"""
+    rng = random.Random(seed)
+    states = ['punjab', 'haryana', 'uttar_pradesh', 'maharashtra', 'karnataka', 'tamil_nadu', 'rajasthan']
+    return [
+        {'state': rng.choice(states),
+         **{col: round(rng.uniform(low, high), 2) for col, (low, high) in WARMUP_RANGES.items()}}
+        for _ in range(n_inputs)
+    ]
+
+
+def make_calls(inference: AgriculturalMLInference, inputs: List[Dict],
+               batch_rows: int = 32) -> List[Tuple[str, Callable[[], Dict]]]:
+    """(label, zero-argument call) for every available task and input, plus batch calls over the inputs.
+
+    Tasks whose models are missing are left out, so the check runs on
+    whatever subset of components the models directory provides.
+    """
+    available = [task for task in CHECKED_TASKS if inference.is_available(task)]
+    single = {
+        'predict_yield': lambda d: inference.predict_yield(d),
+        'recommend_crops': lambda d: inference.recommend_crops(d, top_k=5),
+        'comprehensive_analysis': lambda d: inference.get_comprehensive_analysis(d),
+    }
+    batch = {
+        'predict_yield': lambda rows: inference.predict_yield_batch(rows),
+        'recommend_crops': lambda rows: inference.recommend_crops_batch(rows, top_k=5),
+        'comprehensive_analysis': lambda rows: inference.get_comprehensive_analysis_batch(rows),
+    }
+
+    calls = []
+    for i, input_data in enumerate(inputs):
+        for task in available:
+            calls.append((f"{task}[{i}]", lambda d=input_data, call=single[task]: call(d)))
+        if 'recommend_crops' in available:
+            calls.append((f"crop_suitability_factors[{i}]",
+                          lambda d=input_data: inference.get_crop_suitability_factors(d, 'Rice')))
+
+    # Four batches at staggered offsets, each overlapping the single-row calls on the same farms
+    if batch_rows > 0 and inputs:
+        for i in sorted({k * len(inputs) // 4 for k in range(4)}):
+            rows = [inputs[(i + j) % len(inputs)] for j in range(batch_rows)]
+            for task in available:
+                calls.append((f"{task}_batch[{i}]", lambda r=rows, call=batch[task]: call(r)))
+    return calls
+
+
+def _succeeded(result) -> bool:
+    if isinstance(result, list):
+        return all(_succeeded(item) for item in result)
+    return bool(result.get("success"))
+
+
+def same_result(a, b, rel_tol: float = 1e-9) -> bool:
+    """Structural equality, with floats compared to a relative tolerance.
+
+    Forests with n_jobs > 1 may sum their trees in a different order, so
+    results are compared to rounding error rather than bit for bit.
+    """
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(same_result(a[k], b[k], rel_tol) for k in a)
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(same_result(x, y, rel_tol) for x, y in zip(a, b))
+    if isinstance(a, float) or isinstance(b, float):
+        try:
+            return math.isclose(float(a), float(b), rel_tol=rel_tol, abs_tol=1e-12)
+        except (TypeError, ValueError):
+            return False
+    return a == b
+
+
+def run_check(inference: AgriculturalMLInference, n_inputs: int = 50, threads: int = 16,
+              repeats: int = 5, seed: int = 0, concurrent_first: bool = False, batch_rows: int = 32) -> Dict:
+    """Run every call serially once and `repeats` times shuffled across `threads` threads.
+
+    Single-row and batch calls are interleaved, so models configured with
+    several threads each are entered by several callers at once. With
+    concurrent_first the threaded phase runs on a cold instance, so deferred
+    components are loaded while requests race for them.
+    """
+    calls = make_calls(inference, make_inputs(n_inputs, seed), batch_rows)
+    if not calls:
+        raise RuntimeError("No task has its models available")
+    schedule = calls * repeats
+    random.Random(seed).shuffle(schedule)
+
+    def run_serial():
+        start = time.perf_counter()
+        results = {label: call() for label, call in calls}
+        return results, time.perf_counter() - start
+
+    def run_concurrent():
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            futures = [(label, executor.submit(call)) for label, call in schedule]
+            results = []
+            for label, future in futures:
+                try:
+                    results.append((label, future.result(), None))
+                except Exception as e:
+                    results.append((label, None, repr(e)))
+        return results, time.perf_counter() - start
+
+    if concurrent_first:
+        outcomes, concurrent_seconds = run_concurrent()
+        expected, serial_seconds = run_serial()
+    else:
+        expected, serial_seconds = run_serial()
+        outcomes, concurrent_seconds = run_concurrent()
+
+    mismatches = []
+    for label, result, error in outcomes:
+        if error is not None or not same_result(result, expected[label]):
+            mismatches.append({"call": label, "error": error, "expected": expected[label], "got": result})
+
+    failed_serial = [label for label, result in expected.items() if not _succeeded(result)]
+    return {
+        "calls": len(schedule),
+        "threads": threads,
+        "tasks": [task for task in CHECKED_TASKS if inference.is_available(task)],
+        "mismatches": len(mismatches),
+        "first_mismatches": mismatches[:3],
+        "serial_failures": failed_serial[:10],
+        "serial_calls_per_second": len(calls) / serial_seconds if serial_seconds > 0 else 0.0,
+        "concurrent_calls_per_second": len(schedule) / concurrent_seconds if concurrent_seconds > 0 else 0.0
+    }
+
+
+def main():
+    """Check that concurrent predictions match serial ones"""
+    parser = argparse.ArgumentParser(description="Stress AgriculturalMLInference from many threads")
+    parser.add_argument("--models-dir", default="trained_models")
+    parser.add_argument("--inputs", type=int, default=50, help="Distinct farm inputs")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--repeats", type=int, default=5, help="Times each call is repeated concurrently")
+    parser.add_argument("--batch-rows", type=int, default=32,
+                        help="Rows per batch call mixed in with the single-row calls (0 leaves them out)")
+    parser.add_argument("--model-threads", type=int, default=2,
+                        help="Threads per model, so concurrent callers share multi-threaded estimators")
+    parser.add_argument("--lazy", action="store_true",
+                        help="Leave components deferred so the first concurrent calls race to load them")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    inference = AgriculturalMLInference(args.models_dir)
+    policy = InferenceThreadPolicy(args.model_threads, args.model_threads, args.model_threads)
+    inference.configure_threads(policy, policy.tier(max(args.batch_rows, 1)))
+    with contextlib.redirect_stdout(sys.stderr):
+        # Missing components only drop their tasks from the check
+        inference.load_models(lazy=args.lazy)
+        if not any(inference.is_available(task) for task in CHECKED_TASKS):
+            print("❌ Models are not available")
+            sys.exit(1)
+        if not args.lazy:
+            inference.freeze()
+
+    report = run_check(inference, args.inputs, args.threads, args.repeats, concurrent_first=args.lazy,
+                       batch_rows=args.batch_rows)
+
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        print(f"{report['calls']} calls to {', '.join(report['tasks'])} on {report['threads']} threads: "
+              f"{report['mismatches']} mismatches")
+        print(f"Serial {report['serial_calls_per_second']:.0f} calls/s, "
+              f"concurrent {report['concurrent_calls_per_second']:.0f} calls/s")
+        if report['serial_failures']:
+            print(f"⚠️ Failing serially: {', '.join(report['serial_failures'])}")
+        for mismatch in report['first_mismatches']:
+            print(f"❌ {mismatch['call']}: {mismatch['error'] or 'result differs from serial execution'}")
+
+    sys.exit(1 if report['mismatches'] else 0)
+
+
+if __name__ == "__main__":
+    main()
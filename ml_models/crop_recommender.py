@@ -5,21 +5,18 @@ Uses classification and ranking algorithms to recommend optimal crops
 
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.svm import SVC
-from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
-from sklearn.model_selection import cross_val_score, GridSearchCV
-from sklearn.preprocessing import StandardScaler
-import xgboost as xgb
-import lightgbm as lgb
 import joblib
 from typing import Dict, List, Tuple, Any
+import logging
 import warnings
 warnings.filterwarnings('ignore')
 
+logger = logging.getLogger(__name__)
+
 class CropRecommender:
     def __init__(self):
+        from sklearn.preprocessing import StandardScaler
+        
         self.models = {}
         self.scaler = StandardScaler()
         self.crop_rankings = {}
@@ -27,6 +24,13 @@ class CropRecommender:
         
     def initialize_models(self):
         """Initialize various classification models"""
+        # Imported here so inference, which only unpickles, skips these modules
+        from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.svm import SVC
+        import xgboost as xgb
+        import lightgbm as lgb
+        
         self.models = {
             'random_forest': RandomForestClassifier(
                 n_estimators=100,
@@ -73,6 +77,9 @@ class CropRecommender:
     def train_models(self, X_train: pd.DataFrame, y_train: pd.Series,
                      X_val: pd.DataFrame = None, y_val: pd.Series = None) -> Dict:
         """Train all models and return performance metrics"""
+        from sklearn.metrics import accuracy_score
+        from sklearn.model_selection import cross_val_score
+        
         if not self.models:
             self.initialize_models()
         
@@ -129,6 +136,8 @@ class CropRecommender:
     
     def optimize_hyperparameters(self, X_train: pd.DataFrame, y_train: pd.Series) -> Dict:
         """Optimize hyperparameters for key models"""
+        from sklearn.model_selection import GridSearchCV
+        
         param_grids = {
             'random_forest': {
                 'n_estimators': [50, 100, 200],
@@ -219,8 +228,8 @@ class CropRecommender:
         
         return self.crop_rankings
     
-    def recommend_crops(self, X: pd.DataFrame, top_k: int = 5) -> List[Dict]:
-        """Recommend top-k crops for given conditions"""
+    def score_crops(self, X: pd.DataFrame) -> Tuple[List[str], np.ndarray]:
+        """Average class probabilities across models, keeping one row per sample"""
         if not self.is_trained:
             raise ValueError("Models must be trained before making recommendations")
         
@@ -228,36 +237,48 @@ class CropRecommender:
         X_scaled = self.scaler.transform(X)
         X_scaled = pd.DataFrame(X_scaled, columns=X.columns, index=X.index)
         
-        all_predictions = {}
+        return self.score_scaled_crops(X_scaled)
+    
+    def score_scaled_crops(self, X_scaled) -> Tuple[List[str], np.ndarray]:
+        """Score features already scaled with self.scaler, as a DataFrame or numpy array"""
+        if not self.is_trained:
+            raise ValueError("Models must be trained before making recommendations")
+        
+        model_probabilities = []
         
         for name, model in self.models.items():
             try:
                 if hasattr(model, 'predict_proba'):
-                    proba = model.predict_proba(X_scaled)
-                    classes = model.classes_
+                    model_probabilities.append((model.classes_, model.predict_proba(X_scaled)))
                     
-                    for i, crop in enumerate(classes):
-                        if crop not in all_predictions:
-                            all_predictions[crop] = []
-                        all_predictions[crop].extend(proba[:, i])
-                        
             except Exception as e:
-                print(f"Error getting predictions from {name}: {e}")
+                # Logged, not printed: this runs on serving threads
+                logger.warning("Error getting predictions from %s: %s", name, e)
         
-        # Calculate average probabilities
-        crop_scores = {}
-        for crop, probs in all_predictions.items():
-            if probs:
-                avg_score = np.mean(probs)
-                crop_scores[crop] = avg_score
+        # Each crop is averaged over the models that know it
+        classes = sorted({crop for model_classes, _ in model_probabilities for crop in model_classes})
+        class_index = {crop: i for i, crop in enumerate(classes)}
+        score_sums = np.zeros((len(X_scaled), len(classes)))
+        model_counts = np.zeros(len(classes))
+        
+        for model_classes, proba in model_probabilities:
+            columns = [class_index[crop] for crop in model_classes]
+            score_sums[:, columns] += proba
+            model_counts[columns] += 1
         
-        # Sort by score and return top-k
-        sorted_crops = sorted(crop_scores.items(), key=lambda x: x[1], reverse=True)
+        return classes, score_sums / np.maximum(model_counts, 1)
+    
+    def _rank_crops(self, classes: List[str], scores: np.ndarray, top_k: int,
+                    order: np.ndarray = None) -> List[Dict]:
+        """Turn one row of crop scores into ranked recommendations"""
+        if order is None:
+            order = np.argsort(-scores, kind='stable')[:top_k]
         
         recommendations = []
-        for i, (crop, score) in enumerate(sorted_crops[:top_k]):
+        for i, index in enumerate(order):
+            score = scores[index]
             recommendations.append({
-                'crop': crop,
+                'crop': classes[index],
                 'score': score,
                 'rank': i + 1,
                 'confidence': 'High' if score > 0.7 else 'Medium' if score > 0.4 else 'Low'
@@ -265,8 +286,33 @@ class CropRecommender:
         
         return recommendations
     
+    def recommend_crops(self, X: pd.DataFrame, top_k: int = 5) -> List[Dict]:
+        """Recommend top-k crops for given conditions"""
+        classes, scores = self.score_crops(X)
+        
+        # Multiple rows are scored as one combined set of conditions
+        return self._rank_crops(classes, scores.mean(axis=0), top_k)
+    
+    def recommend_crops_batch(self, X: pd.DataFrame, top_k: int = 5) -> List[List[Dict]]:
+        """Recommend top-k crops separately for every row of X"""
+        classes, scores = self.score_crops(X)
+        
+        return self._rank_rows(classes, scores, top_k)
+    
+    def _rank_rows(self, classes: List[str], scores: np.ndarray, top_k: int) -> List[List[Dict]]:
+        orders = np.argsort(-scores, axis=1, kind='stable')[:, :top_k]
+        
+        return [
+            self._rank_crops(classes, row_scores, top_k, order)
+            for row_scores, order in zip(scores, orders)
+        ]
+    
     def get_crop_suitability_factors(self, X: pd.DataFrame, crop: str) -> Dict:
         """Analyze factors that make a crop suitable for given conditions"""
+        return self._suitability_factors(crop, self._sorted_feature_importance(X.columns))
+    
+    def _sorted_feature_importance(self, columns: List[str]) -> List[Tuple]:
+        """Average tree-model feature importance, most important first"""
         if not self.is_trained:
             raise ValueError("Models must be trained before analyzing factors")
         
@@ -275,7 +321,7 @@ class CropRecommender:
         
         for name, model in self.models.items():
             if hasattr(model, 'feature_importances_'):
-                importance = dict(zip(X.columns, model.feature_importances_))
+                importance = dict(zip(columns, model.feature_importances_))
                 for feature, imp in importance.items():
                     if feature not in feature_importance:
                         feature_importance[feature] = []
@@ -287,8 +333,9 @@ class CropRecommender:
             avg_importance[feature] = np.mean(importances)
         
         # Sort by importance
-        sorted_features = sorted(avg_importance.items(), key=lambda x: x[1], reverse=True)
-        
+        return sorted(avg_importance.items(), key=lambda x: x[1], reverse=True)
+    
+    def _suitability_factors(self, crop: str, sorted_features: List[Tuple]) -> Dict:
         return {
             'crop': crop,
             'top_factors': dict(sorted_features[:10]),
@@ -313,6 +360,8 @@ class CropRecommender:
     
     def evaluate_model(self, X_test: pd.DataFrame, y_test: pd.Series) -> Dict:
         """Evaluate model performance on test set"""
+        from sklearn.metrics import classification_report, accuracy_score
+        
         if not self.is_trained:
             raise ValueError("Models must be trained before evaluation")
         
@@ -344,9 +393,36 @@ class CropRecommender:
         """Get crop recommendations with detailed reasoning"""
         recommendations = self.recommend_crops(X, top_k)
         
+        return self._add_recommendation_reasons(recommendations, self._sorted_feature_importance(X.columns), {})
+    
+    def get_crop_recommendations_with_reasons_batch(self, X: pd.DataFrame, top_k: int = 5) -> List[List[Dict]]:
+        """Get crop recommendations with detailed reasoning for every row of X"""
+        return self._with_reasons(self.recommend_crops_batch(X, top_k), X.columns)
+    
+    def recommendations_with_reasons_from_scaled(self, X_scaled: np.ndarray, feature_columns: List[str],
+                                                 top_k: int = 5) -> List[List[Dict]]:
+        """Per-row recommendations with reasoning for features already scaled with self.scaler"""
+        classes, scores = self.score_scaled_crops(X_scaled)
+        
+        return self._with_reasons(self._rank_rows(classes, scores, top_k), feature_columns)
+    
+    def _with_reasons(self, batch_recommendations: List[List[Dict]], feature_columns: List[str]) -> List[List[Dict]]:
+        sorted_features = self._sorted_feature_importance(feature_columns)
+        factors_by_crop = {}
+        
+        return [
+            self._add_recommendation_reasons(recommendations, sorted_features, factors_by_crop)
+            for recommendations in batch_recommendations
+        ]
+    
+    def _add_recommendation_reasons(self, recommendations: List[Dict], sorted_features: List[Tuple],
+                                    factors_by_crop: Dict) -> List[Dict]:
+        """Attach suitability factors and reasons, computing them once per crop"""
         for rec in recommendations:
             crop = rec['crop']
-            factors = self.get_crop_suitability_factors(X, crop)
+            if crop not in factors_by_crop:
+                factors_by_crop[crop] = self._suitability_factors(crop, sorted_features)
+            factors = factors_by_crop[crop]
             
             rec['suitability_factors'] = factors['top_factors']
             rec['analysis'] = factors['analysis']
@@ -399,4 +475,18 @@ class CropRecommender:
         self.scaler = model_data['scaler']
         self.crop_rankings = model_data['crop_rankings']
         self.is_trained = model_data['is_trained']
-        print(f"Model loaded from {filepath}")
+        logger.info("Model loaded from %s", filepath)
+    
+    def artifact_parts(self) -> Tuple[Dict, Dict]:
+        """Each model and the scaler as separate parts, plus the metadata kept in the manifest"""
+        parts = {f"models.{name}": model for name, model in self.models.items()}
+        parts['scaler'] = self.scaler
+        metadata = {'crop_rankings': self.crop_rankings, 'is_trained': self.is_trained}
+        return parts, metadata
+    
+    def load_artifact_parts(self, parts: Dict, metadata: Dict):
+        """Restore from split artifact parts"""
+        self.models = {key.split('.', 1)[1]: model for key, model in parts.items() if key.startswith('models.')}
+        self.scaler = parts['scaler']
+        self.crop_rankings = metadata['crop_rankings']
+        self.is_trained = metadata['is_trained']
@@ -7,13 +7,51 @@ import pandas as pd
 import numpy as np
 import json
 from typing import Dict, List, Tuple, Any
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.model_selection import train_test_split
 import warnings
 warnings.filterwarnings('ignore')
 
+# Soil and climate metadata per state, also the keys regional model sets are grouped by
+STATE_METADATA = {
+    'punjab': {'soilType': 'alluvial', 'climateZone': 'north-western-plains', 
+              'climateFactor': 1.2, 'soilHealthFactor': 1.1},
+    'haryana': {'soilType': 'alluvial', 'climateZone': 'north-western-plains', 
+               'climateFactor': 1.2, 'soilHealthFactor': 1.1},
+    'uttar_pradesh': {'soilType': 'alluvial', 'climateZone': 'north-central-plains', 
+                     'climateFactor': 1.1, 'soilHealthFactor': 1.1},
+    'maharashtra': {'soilType': 'black', 'climateZone': 'west-central', 
+                   'climateFactor': 1.08, 'soilHealthFactor': 1.05},
+    'karnataka': {'soilType': 'red', 'climateZone': 'south-central', 
+                 'climateFactor': 1.05, 'soilHealthFactor': 1.0},
+    'tamil_nadu': {'soilType': 'alluvial', 'climateZone': 'south-coastal', 
+                  'climateFactor': 1.18, 'soilHealthFactor': 1.15},
+    'gujarat': {'soilType': 'alluvial', 'climateZone': 'west-coastal', 
+               'climateFactor': 1.12, 'soilHealthFactor': 1.08},
+    'rajasthan': {'soilType': 'desert', 'climateZone': 'arid-western', 
+                 'climateFactor': 0.85, 'soilHealthFactor': 0.8},
+    'bihar': {'soilType': 'alluvial', 'climateZone': 'east-central-plains', 
+              'climateFactor': 1.0, 'soilHealthFactor': 1.0},
+    'west_bengal': {'soilType': 'alluvial', 'climateZone': 'east-coastal', 
+                   'climateFactor': 1.15, 'soilHealthFactor': 1.12},
+    'madhya_pradesh': {'soilType': 'black', 'climateZone': 'central-plateau', 
+                      'climateFactor': 1.0, 'soilHealthFactor': 1.0},
+    'andhra_pradesh': {'soilType': 'alluvial', 'climateZone': 'south-coastal', 
+                      'climateFactor': 1.15, 'soilHealthFactor': 1.12},
+    'telangana': {'soilType': 'red', 'climateZone': 'south-central', 
+                 'climateFactor': 1.05, 'soilHealthFactor': 1.0},
+    'odisha': {'soilType': 'lateritic', 'climateZone': 'east-coastal', 
+              'climateFactor': 1.15, 'soilHealthFactor': 1.0}
+}
+
+DEFAULT_STATE_METADATA = {
+    'soilType': 'alluvial', 'climateZone': 'north-western-plains',
+    'climateFactor': 1.0, 'soilHealthFactor': 1.0
+}
+
 class AgriculturalDataPreprocessor:
     def __init__(self):
+        # Imported here so importing this module for inference stays cheap
+        from sklearn.preprocessing import StandardScaler
+        
         self.scaler = StandardScaler()
         self.label_encoders = {}
         self.feature_columns = []
@@ -72,42 +110,7 @@ class AgriculturalDataPreprocessor:
     
     def _get_state_metadata(self, state: str, data: Dict) -> Dict:
         """Extract state metadata"""
-        # Map states to their metadata
-        state_metadata = {
-            'punjab': {'soilType': 'alluvial', 'climateZone': 'north-western-plains', 
-                      'climateFactor': 1.2, 'soilHealthFactor': 1.1},
-            'haryana': {'soilType': 'alluvial', 'climateZone': 'north-western-plains', 
-                       'climateFactor': 1.2, 'soilHealthFactor': 1.1},
-            'uttar_pradesh': {'soilType': 'alluvial', 'climateZone': 'north-central-plains', 
-                             'climateFactor': 1.1, 'soilHealthFactor': 1.1},
-            'maharashtra': {'soilType': 'black', 'climateZone': 'west-central', 
-                           'climateFactor': 1.08, 'soilHealthFactor': 1.05},
-            'karnataka': {'soilType': 'red', 'climateZone': 'south-central', 
-                         'climateFactor': 1.05, 'soilHealthFactor': 1.0},
-            'tamil_nadu': {'soilType': 'alluvial', 'climateZone': 'south-coastal', 
-                          'climateFactor': 1.18, 'soilHealthFactor': 1.15},
-            'gujarat': {'soilType': 'alluvial', 'climateZone': 'west-coastal', 
-                       'climateFactor': 1.12, 'soilHealthFactor': 1.08},
-            'rajasthan': {'soilType': 'desert', 'climateZone': 'arid-western', 
-                         'climateFactor': 0.85, 'soilHealthFactor': 0.8},
-            'bihar': {'soilType': 'alluvial', 'climateZone': 'east-central-plains', 
-                      'climateFactor': 1.0, 'soilHealthFactor': 1.0},
-            'west_bengal': {'soilType': 'alluvial', 'climateZone': 'east-coastal', 
-                           'climateFactor': 1.15, 'soilHealthFactor': 1.12},
-            'madhya_pradesh': {'soilType': 'black', 'climateZone': 'central-plateau', 
-                              'climateFactor': 1.0, 'soilHealthFactor': 1.0},
-            'andhra_pradesh': {'soilType': 'alluvial', 'climateZone': 'south-coastal', 
-                              'climateFactor': 1.15, 'soilHealthFactor': 1.12},
-            'telangana': {'soilType': 'red', 'climateZone': 'south-central', 
-                         'climateFactor': 1.05, 'soilHealthFactor': 1.0},
-            'odisha': {'soilType': 'lateritic', 'climateZone': 'east-coastal', 
-                      'climateFactor': 1.15, 'soilHealthFactor': 1.0}
-        }
-        
-        return state_metadata.get(state, {
-            'soilType': 'alluvial', 'climateZone': 'north-western-plains', 
-            'climateFactor': 1.0, 'soilHealthFactor': 1.0
-        })
+        return STATE_METADATA.get(state, DEFAULT_STATE_METADATA)
     
     def _get_crop_optimal_ph(self, crop: str) -> float:
         """Get optimal pH for crop"""
@@ -253,6 +256,8 @@ class AgriculturalDataPreprocessor:
     
     def prepare_features(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
         """Prepare features for ML models"""
+        from sklearn.preprocessing import LabelEncoder
+        
         # Encode categorical variables
         categorical_columns = ['state', 'crop', 'district', 'soil_type', 'climate_zone', 
                              'water_requirement', 'season', 'trend']
@@ -295,6 +300,8 @@ class AgriculturalDataPreprocessor:
     
     def split_data(self, X: pd.DataFrame, y: pd.Series, test_size: float = 0.2) -> Tuple:
         """Split data into train and test sets"""
+        from sklearn.model_selection import train_test_split
+        
         return train_test_split(X, y, test_size=test_size, random_state=42)
     
     def scale_features(self, X_train: pd.DataFrame, X_test: pd.DataFrame = None) -> Tuple:
@@ -332,3 +339,14 @@ class AgriculturalDataPreprocessor:
         self.scaler = preprocessor_state['scaler']
         self.label_encoders = preprocessor_state['label_encoders']
         self.feature_columns = preprocessor_state['feature_columns']
+    
+    def artifact_parts(self) -> Tuple[Dict, Dict]:
+        """Scaler and label encoders as separate parts, with the feature columns in the manifest"""
+        parts = {'scaler': self.scaler, 'label_encoders': self.label_encoders}
+        return parts, {'feature_columns': self.feature_columns}
+    
+    def load_artifact_parts(self, parts: Dict, metadata: Dict):
+        """Restore from split artifact parts"""
+        self.scaler = parts['scaler']
+        self.label_encoders = parts['label_encoders']
+        self.feature_columns = metadata['feature_columns']
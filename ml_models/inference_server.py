@@ -0,0 +1,592 @@
+#!/usr/bin/env python3
+"""
+Local Inference Server
+Serves one loaded AgriculturalMLInference over HTTP on a TCP or Unix-domain socket
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import logging
+import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from model_inference import AgriculturalMLInference
+from yield_predictor import COMPILED_MAX_ROWS
+from request_batcher import MicroBatcher
+from model_reloader import ModelReloader
+from model_versions import ModelVersions, VERSION_HEADER, parse_model_versions
+from regional_models import RegionalModelSets, REGION_KEYS
+from admission_control import AdmissionController
+from prediction_cache import parse_precision
+from thread_config import InferenceThreadPolicy
+from predict_yield import generate_mock_yield_prediction
+from predict_crops import generate_mock_crop_recommendation
+from comprehensive_analysis import generate_mock_comprehensive_analysis
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 1024 * 1024
+
+# Heuristic answers for each prediction task, used when its models are missing or load is shed
+TASK_FALLBACKS = {
+    "predict_yield": generate_mock_yield_prediction,
+    "recommend_crops": generate_mock_crop_recommendation,
+    "comprehensive_analysis": generate_mock_comprehensive_analysis,
+}
+
+HTTP_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class InferenceServer:
+    def __init__(self, inference: AgriculturalMLInference, max_workers: int = 4,
+                 batcher: Optional[MicroBatcher] = None):
+        self.inference = inference
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="inference")
+        self.max_workers = max_workers
+        self.batcher = batcher
+        # Set by create_server when hot reload or several model versions are enabled
+        self.reloader = None
+        self.versions = None
+        self.regional = None
+        self.admission = None
+
+        # Routes the micro-batcher can coalesce, mapped to its task names
+        self.batched_routes = {
+            "/predict_yield": "predict_yield",
+            "/recommend_crops": "recommend_crops",
+            "/comprehensive_analysis": "comprehensive_analysis",
+        }
+
+        # path -> (HTTP method, blocking handler taking the decoded JSON body)
+        self.routes = {
+            "/predict_yield": ("POST", self._predict_yield),
+            "/recommend_crops": ("POST", self._recommend_crops),
+            "/comprehensive_analysis": ("POST", self._comprehensive_analysis),
+            "/validate_input": ("POST", self._validate_input),
+            "/feature_importance": ("GET", self._feature_importance),
+            "/yield_operating_point": ("POST", self._yield_operating_point),
+            "/health": ("GET", self._health),
+            "/ready": ("GET", self._ready),
+            "/reload": ("POST", self._reload),
+            "/versions": ("GET", self._versions),
+        }
+
+    # Prediction handlers take the routed model version's inference, or read self.inference
+    # once, so a request swapped mid-way still uses one model set
+
+    def _predict_yield(self, payload: Dict, inference: Optional[AgriculturalMLInference] = None) -> Dict:
+        input_data = payload.get("input", {})
+        inference = inference or self.inference
+        if not inference.is_available("predict_yield"):
+            return generate_mock_yield_prediction(input_data)
+        return inference.predict_yield(input_data)
+
+    def _recommend_crops(self, payload: Dict, inference: Optional[AgriculturalMLInference] = None) -> Dict:
+        input_data = payload.get("input", {})
+        inference = inference or self.inference
+        if not inference.is_available("recommend_crops"):
+            return generate_mock_crop_recommendation(input_data)
+        return inference.recommend_crops(input_data, top_k=int(payload.get("top_k", 5)))
+
+    def _comprehensive_analysis(self, payload: Dict, inference: Optional[AgriculturalMLInference] = None) -> Dict:
+        input_data = payload.get("input", {})
+        inference = inference or self.inference
+        if not inference.is_available("comprehensive_analysis"):
+            return generate_mock_comprehensive_analysis(input_data)
+        return inference.get_comprehensive_analysis(input_data)
+
+    def _validate_input(self, payload: Dict) -> Dict:
+        return self.inference.validate_input(payload.get("input", {}))
+
+    def _feature_importance(self, payload: Dict) -> Dict:
+        return self.inference.get_feature_importance()
+
+    def _yield_operating_point(self, payload: Dict) -> Dict:
+        budget = payload.get("latency_budget_ms")
+        return self.inference.set_yield_operating_point(
+            payload.get("name"), float(budget) if budget is not None else None
+        )
+
+    def _reload(self, payload: Dict) -> Dict:
+        if self.reloader is None:
+            return {"success": False, "error": "Hot reload is not enabled (--reload-poll-seconds)"}
+        return self.reloader.reload()
+
+    def _versions(self, payload: Dict) -> Dict:
+        if self.versions is None:
+            return {"success": False, "error": "Only one model version is resident (--model-version)"}
+        return {"success": True, **self.versions.get_stats()}
+
+    def _health(self, payload: Dict) -> Dict:
+        inference = self.inference
+        health = {
+            "success": True,
+            "models_loaded": inference.is_loaded,
+            "available_tasks": [task for task in self.batched_routes.values() if inference.is_available(task)],
+            "workers": self.max_workers,
+            "warm": inference.is_warm,
+        }
+        if inference.thread_policy is not None:
+            health["threads"] = dict(inference.thread_policy.to_dict(), tier=inference.thread_tier)
+        if self.batcher is not None:
+            health["batching"] = self.batcher.get_stats()
+        if self.reloader is not None:
+            health["reload"] = self.reloader.get_stats()
+        if self.versions is not None:
+            health["versions"] = {label: version.weight for label, version in self.versions.versions.items()}
+        if self.regional is not None:
+            health["regional"] = self.regional.get_stats()
+        if self.admission is not None:
+            health["admission"] = self.admission.get_stats()
+        if inference.yield_surrogate is not None:
+            health["yield_surrogate"] = inference.yield_surrogate.metadata
+        single_flight_stats = inference.get_single_flight_stats()
+        if single_flight_stats is not None:
+            health["single_flight"] = single_flight_stats
+        cache_stats = inference.get_cache_stats()
+        if cache_stats is not None:
+            health["cache"] = cache_stats
+        return health
+
+    def _ready(self, payload: Dict) -> Tuple[int, Dict]:
+        """200 once the models have been warmed up, so deploys can gate traffic on it"""
+        inference = self.inference
+        body = {
+            "success": inference.is_warm,
+            "warm": inference.is_warm,
+            "warmup": inference.warmup_report,
+        }
+        return (200 if inference.is_warm else 503), body
+
+    def swap_inference(self, inference: AgriculturalMLInference):
+        """Serve new requests from another model set; requests already running keep theirs"""
+        # Published to the executor threads read-only, even when loaded with --lazy
+        inference.freeze()
+        previous, self.inference = self.inference, inference
+        if self.batcher is not None:
+            self.batcher.inference = inference
+        if self.versions is not None:
+            for version in self.versions.versions.values():
+                if version.inference is previous:
+                    version.inference = inference
+        if self.regional is not None and self.regional.fallback is previous:
+            self.regional.fallback = inference
+
+    def _batchers(self) -> List[MicroBatcher]:
+        batchers = [self.batcher] if self.batcher is not None else []
+        if self.versions is not None:
+            batchers.extend(version.batcher for version in self.versions.versions.values()
+                            if version.batcher is not None and version.batcher is not self.batcher)
+        return batchers
+
+    async def run_blocking(self, func, *args):
+        """Run a CPU-bound model call on the thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def dispatch(self, method: str, path: str, headers: Dict, payload: Dict) -> Tuple[int, Dict]:
+        """Route one decoded request to its handler"""
+        route = self.routes.get(path)
+        if route is None:
+            return 404, {"success": False, "error": f"Unknown endpoint: {path}"}
+
+        allowed_method, handler = route
+        if method != allowed_method:
+            return 405, {"success": False, "error": f"{path} expects {allowed_method}"}
+
+        task = self.batched_routes.get(path)
+        if task is None:
+            try:
+                result = await self.run_blocking(handler, payload)
+                # Handlers may pick their own status as (status, body)
+                return result if isinstance(result, tuple) else (200, result)
+            except Exception as e:
+                return 500, {"success": False, "error": str(e)}
+
+        if self.admission is not None:
+            return await self._dispatch_admitted(task, handler, headers, payload)
+        return await self._dispatch_prediction(task, handler, headers, payload)
+
+    def _degraded(self, task: str, payload: Dict, reason: str) -> Dict:
+        """Heuristic answer for a shed request, flagged so callers can tell it from a model prediction"""
+        return {**TASK_FALLBACKS[task](payload.get("input", {})), "degraded": True, "degraded_reason": reason}
+
+    async def _dispatch_admitted(self, task: str, handler, headers: Dict, payload: Dict) -> Tuple[int, Dict]:
+        """Run a prediction only if it can meet its deadline, otherwise answer from the fallback"""
+        deadline = self.admission.deadline_for(headers, payload)
+        reason = self.admission.try_admit(deadline)
+        if reason is not None:
+            return 200, self._degraded(task, payload, reason)
+
+        guarded = self.admission.guard(handler, deadline, lambda: self._degraded(task, payload, "deadline_expired"))
+        try:
+            # The batcher sheds batched requests at dequeue and times each batch itself
+            return await self._dispatch_prediction(task, guarded, headers, payload, deadline)
+        finally:
+            self.admission.release()
+
+    async def _dispatch_prediction(self, task: str, handler, headers: Dict, payload: Dict,
+                                   deadline: Optional[float] = None) -> Tuple[int, Dict]:
+        """Serve one prediction from the routed model version, the request's region, or the main set"""
+        if self.versions is not None:
+            try:
+                version = self.versions.choose(headers)
+            except KeyError as e:
+                return 400, {"success": False, "error": f"Unknown model version: {e.args[0]}"}
+            return await self._dispatch_version(version, task, handler, payload, deadline)
+        if self.regional is not None:
+            return await self._dispatch_regional(handler, payload)
+
+        try:
+            if self.batcher is not None and self.inference.is_available(task):
+                return 200, await self._submit_batched(self.batcher, task, payload, deadline)
+
+            return 200, await self.run_blocking(handler, payload)
+        except Exception as e:
+            return 500, {"success": False, "error": str(e)}
+
+    async def _submit_batched(self, batcher: MicroBatcher, task: str, payload: Dict,
+                              deadline: Optional[float]) -> Dict:
+        """Queue a prediction on a micro-batcher, answering from the fallback if its deadline passes first"""
+        future = batcher.submit(task, payload.get("input", {}), int(payload.get("top_k", 5)), deadline,
+                                lambda: self._degraded(task, payload, "deadline_expired"))
+        return await asyncio.wrap_future(future)
+
+    async def _dispatch_version(self, version, task: str, handler, payload: Dict,
+                                deadline: Optional[float] = None) -> Tuple[int, Dict]:
+        """Serve a prediction from one resident model version, recording its latency and output"""
+        inference = version.inference
+        start = time.perf_counter()
+        try:
+            if version.batcher is not None and inference.is_available(task):
+                result = await self._submit_batched(version.batcher, task, payload, deadline)
+            else:
+                result = await self.run_blocking(handler, payload, inference)
+            status = 200
+        except Exception as e:
+            status, result = 500, {"success": False, "error": str(e)}
+
+        version.record(task, time.perf_counter() - start, result)
+        return status, {**result, "model_version": version.label}
+
+    async def _dispatch_regional(self, handler, payload: Dict) -> Tuple[int, Dict]:
+        """Serve a prediction from the model set of the request's region, loading it if needed"""
+        def call():
+            region, inference = self.regional.for_input(payload.get("input", {}))
+            return region, handler(payload, inference)
+
+        try:
+            region, result = await self.run_blocking(call)
+        except Exception as e:
+            return 500, {"success": False, "error": str(e)}
+        return 200, {**result, "region": region}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve HTTP/1.1 requests on one connection until it is closed"""
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+
+                status, method, path, headers, payload = request
+                if status == 200:
+                    status, body = await self.dispatch(method, path, headers, payload)
+                else:
+                    body = payload
+
+                keep_alive = headers.get("connection", "keep-alive").lower() != "close"
+                self._write_response(writer, status, body, keep_alive)
+                await writer.drain()
+
+                if not keep_alive:
+                    break
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(Exception):
+                await writer.wait_closed()
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[Tuple]:
+        """Parse one request; returns None when the peer closed the connection"""
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+
+        parts = request_line.decode("latin-1").split()
+        if len(parts) != 3:
+            return 400, "", "", {"connection": "close"}, {"success": False, "error": "Malformed request line"}
+        method, target, version = parts
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if version == "HTTP/1.0" and "connection" not in headers:
+            headers["connection"] = "close"
+
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            # The body cannot be skipped without a valid length, so the connection is unusable
+            headers["connection"] = "close"
+            return 400, method, target, headers, {"success": False, "error": "Invalid Content-Length"}
+        if length > MAX_BODY_BYTES:
+            headers["connection"] = "close"
+            return 413, method, target, headers, {"success": False, "error": "Request body too large"}
+
+        payload = {}
+        if length:
+            body = await reader.readexactly(length)
+            try:
+                payload = json.loads(body)
+            except json.JSONDecodeError as e:
+                return 400, method, target, headers, {"success": False, "error": f"Invalid JSON body: {e}"}
+            if not isinstance(payload, dict):
+                return 400, method, target, headers, {"success": False, "error": "JSON body must be an object"}
+
+        path = target.split("?", 1)[0]
+        return 200, method, path, headers, payload
+
+    def _write_response(self, writer: asyncio.StreamWriter, status: int, body: Dict, keep_alive: bool):
+        data = json.dumps(body).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, 'OK')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            f"\r\n"
+        )
+        writer.write(head.encode("latin-1") + data)
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765, unix_socket: Optional[str] = None,
+                    sock: Optional[socket.socket] = None):
+        """Listen until cancelled, on an already bound socket if one is given"""
+        if sock is not None:
+            if sock.family == socket.AF_UNIX:
+                server = await asyncio.start_unix_server(self.handle_connection, sock=sock)
+            else:
+                server = await asyncio.start_server(self.handle_connection, sock=sock)
+        elif unix_socket:
+            if os.path.exists(unix_socket):
+                os.unlink(unix_socket)
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix_socket)
+            print(f"🚀 Inference server listening on unix:{unix_socket}", file=sys.stderr)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host=host, port=port)
+            print(f"🚀 Inference server listening on http://{host}:{port}", file=sys.stderr)
+
+        for batcher in self._batchers():
+            batcher.start()
+        if self.reloader is not None:
+            self.reloader.start()
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if self.reloader is not None:
+                self.reloader.stop()
+            for batcher in self._batchers():
+                batcher.stop()
+            self.executor.shutdown(wait=False)
+
+
+def _compiled_max_rows(value: str) -> Optional[int]:
+    return None if value == "all" else int(value)
+
+
+def build_arg_parser(description: str = "Serve AgriculturalMLInference over local HTTP") -> argparse.ArgumentParser:
+    """Flags shared by every way of running the server"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix-socket", help="Listen on a Unix-domain socket instead of TCP")
+    parser.add_argument("--models-dir", default="trained_models")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4,
+                        help="Threads for CPU-bound model calls")
+    parser.add_argument("--batch-window-ms", type=float, default=0.0,
+                        help="Coalesce predictions arriving within this window (0 disables batching)")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--lazy", action="store_true",
+                        help="Unpickle each model artifact on first use instead of at startup "
+                             "(the model set is then not frozen)")
+    parser.add_argument("--single-row-threads", type=int, default=1,
+                        help="Threads per model for one-row predictions (training pickles n_jobs=-1)")
+    parser.add_argument("--small-batch-threads", type=int, default=1)
+    parser.add_argument("--small-batch-rows", type=int, default=256,
+                        help="Largest batch still scored with --small-batch-threads")
+    parser.add_argument("--bulk-threads", type=int,
+                        help="Threads per model when --max-batch-size exceeds --small-batch-rows "
+                             "(default: all cores)")
+    parser.add_argument("--native-threads", type=int,
+                        help="Cap BLAS/OpenMP threads for the whole process")
+    parser.add_argument("--warmup", action="store_true",
+                        help="Score a synthetic batch through every model before serving; /ready reports it")
+    parser.add_argument("--compiled-max-rows", type=_compiled_max_rows, default=COMPILED_MAX_ROWS,
+                        help="Largest batch scored by the compiled yield ensemble; larger ones use the native "
+                             "models ('all' serves every size compiled and skips loading them)")
+    parser.add_argument("--yield-operating-point",
+                        help="Stored yield operating point to serve instead of the trained default")
+    parser.add_argument("--yield-latency-budget-ms", type=float,
+                        help="Serve the most accurate yield operating point within this per-row budget")
+    parser.add_argument("--yield-surrogate", nargs="?", const="",
+                        help="Answer covered yield requests from a surrogate grid "
+                             "(default: <models-dir>/yield_surrogate.npz)")
+    parser.add_argument("--single-flight", action="store_true",
+                        help="Share one computation between identical requests that are in flight together")
+    parser.add_argument("--cache-size", type=int, default=0,
+                        help="Memoize up to this many predictions (0 disables the cache)")
+    parser.add_argument("--cache-ttl-seconds", type=float, default=300.0)
+    parser.add_argument("--cache-precision",
+                        help="Quantize numeric inputs before caching, e.g. soil_ph=0.1,rainfall=0.5")
+    parser.add_argument("--cache-db",
+                        help="SQLite file shared by every worker on the host, keyed by the model fingerprint")
+    parser.add_argument("--model-version", action="append", metavar="LABEL=MODELS_DIR[:PERCENT]",
+                        help="Keep another model set resident and route this share of traffic to it; "
+                             "repeat per version, the first is the baseline (default: one set from --models-dir)")
+    parser.add_argument("--version-header", default=VERSION_HEADER,
+                        help="Request header pinning a request to one --model-version label")
+    parser.add_argument("--regional-models-dir",
+                        help="Directory of per-region model sets (<dir>/<region>/), loaded on first use; "
+                             "regions without one use --models-dir")
+    parser.add_argument("--region-by", choices=REGION_KEYS, default="state",
+                        help="Group regional model sets by state or by the state's climate zone")
+    parser.add_argument("--regional-memory-mb", type=float, default=1024.0,
+                        help="Evict least recently used regional sets beyond this estimated size")
+    parser.add_argument("--max-queue", type=int, default=0,
+                        help="Predictions queued or running before new ones are answered by the heuristic "
+                             "fallback and flagged degraded (0 disables admission control)")
+    parser.add_argument("--deadline-ms", type=float, default=1000.0,
+                        help="Default per-request deadline for admission control; "
+                             "requests may set their own with X-Deadline-Ms or deadline_ms")
+    parser.add_argument("--reload-poll-seconds", type=float, default=0.0,
+                        help="Watch --models-dir and hot-swap retrained models after a warmup (0 disables it)")
+    return parser
+
+
+def load_inference(args: argparse.Namespace) -> AgriculturalMLInference:
+    """Configure and load an AgriculturalMLInference from parsed server flags"""
+    inference = AgriculturalMLInference(args.models_dir, args.compiled_max_rows)
+    policy = InferenceThreadPolicy(args.single_row_threads, args.small_batch_threads, args.bulk_threads,
+                                   args.small_batch_rows, args.native_threads)
+    # Pinned for the largest call the server makes: one row, or one micro-batch
+    inference.configure_threads(policy, policy.tier(args.max_batch_size if args.batch_window_ms > 0 else 1))
+    if args.single_flight:
+        inference.enable_single_flight()
+    # Also called from the reloader and regional loads, so progress goes to the log, not stdout
+    if not inference.load_models(lazy=args.lazy):
+        logger.warning("⚠️ Some models are not available, serving heuristic fallbacks for them")
+    # After loading, so the disk cache is keyed by the fingerprint of the files actually read
+    if args.cache_size > 0 or args.cache_db:
+        inference.enable_prediction_cache(args.cache_size, args.cache_ttl_seconds,
+                                          parse_precision(args.cache_precision), args.cache_db)
+    if args.yield_operating_point or args.yield_latency_budget_ms is not None:
+        result = inference.set_yield_operating_point(args.yield_operating_point,
+                                                     args.yield_latency_budget_ms)
+        logger.info("Yield operating point: %s", result.get('operating_point', result.get('error')))
+    if args.yield_surrogate is not None:
+        result = inference.load_yield_surrogate(args.yield_surrogate or None)
+        logger.info("Yield surrogate: %s", result.get('interpolation_error', result.get('error')))
+    # Last, so the operating point actually served is the one warmed
+    if args.warmup:
+        inference.warmup()
+    # Read-only from here on, so executor threads never see a component or setting change
+    if not args.lazy:
+        inference.freeze()
+    return inference
+
+
+def load_versions(args: argparse.Namespace,
+                  inference: AgriculturalMLInference) -> List[Tuple[str, AgriculturalMLInference, Optional[float]]]:
+    """(label, inference, percent) for every --model-version, reusing the --models-dir set when listed"""
+    versions = []
+    for label, models_dir, percent in parse_model_versions(args.model_version):
+        if os.path.abspath(models_dir) == os.path.abspath(args.models_dir):
+            versions.append((label, inference, percent))
+        else:
+            versions.append((label, load_inference(argparse.Namespace(**dict(vars(args), models_dir=models_dir))),
+                             percent))
+    return versions
+
+
+def create_server(inference: AgriculturalMLInference, args: argparse.Namespace,
+                  server_class: type = InferenceServer,
+                  versions: Optional[List[Tuple[str, AgriculturalMLInference, Optional[float]]]] = None
+                  ) -> InferenceServer:
+    """Build the server, and its micro-batchers if enabled, around loaded inferences"""
+    admission = None
+    if args.max_queue > 0:
+        # Batched predictions are served a batch at a time by one thread, not by the worker pool
+        batched = args.batch_window_ms > 0 and not args.regional_models_dir
+        admission = AdmissionController(args.max_queue, args.max_batch_size if batched else args.workers,
+                                        args.deadline_ms)
+
+    def make_batcher(version_inference):
+        if args.batch_window_ms <= 0:
+            return None
+        return MicroBatcher(version_inference, max_batch_size=args.max_batch_size,
+                            max_wait_ms=args.batch_window_ms, admission=admission)
+
+    batcher = make_batcher(inference)
+    server = server_class(inference, max_workers=args.workers, batcher=batcher)
+    server.admission = admission
+    if versions and args.regional_models_dir:
+        raise ValueError("--model-version and --regional-models-dir cannot be combined")
+    if args.regional_models_dir:
+        server.regional = RegionalModelSets(
+            args.regional_models_dir, inference,
+            lambda models_dir: load_inference(argparse.Namespace(**dict(vars(args), models_dir=models_dir))),
+            args.region_by, args.regional_memory_mb
+        )
+    if versions:
+        server.versions = ModelVersions(args.version_header)
+        for label, version_inference, percent in versions:
+            version_batcher = batcher if version_inference is inference else make_batcher(version_inference)
+            server.versions.add(label, version_inference, percent, version_batcher)
+    if args.reload_poll_seconds > 0:
+        server.reloader = ModelReloader(lambda: load_inference(args), inference, server.swap_inference,
+                                        args.reload_poll_seconds)
+    return server
+
+
+def main():
+    """Start the inference server"""
+    args = build_arg_parser().parse_args()
+    # Model loading and reload messages go to stderr from whichever thread logs them
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    inference = load_inference(args)
+    server = create_server(inference, args, versions=load_versions(args, inference))
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix_socket))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
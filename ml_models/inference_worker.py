@@ -0,0 +1,66 @@
+"""
+Persistent Inference Worker
+Serves newline-delimited JSON requests from stdin with models loaded once
+"""
+
+import sys
+import json
+import contextlib
+from typing import Callable, Dict, List, Optional, TextIO
+
+from model_inference import AgriculturalMLInference
+from thread_config import InferenceThreadPolicy
+
+
+def run_worker(handler: Callable[[AgriculturalMLInference, Dict], Dict],
+               fallback: Callable[[Dict], Dict],
+               models_dir: str = "trained_models",
+               components: Optional[List[str]] = None,
+               stdin: Optional[TextIO] = None,
+               stdout: Optional[TextIO] = None) -> int:
+    """Load models once, then answer one JSON line per request line.
+
+    Each request line is ``{"id": ..., "input": {...}}``; each response line is
+    ``{"id": ..., "result": {...}}`` with the id echoed back so callers can
+    pipeline several requests. Anything the models print is sent to stderr so
+    stdout only ever carries protocol lines. Only the listed model components
+    are loaded (all of them by default), and they predict single rows on one
+    thread each.
+    """
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+
+    # One row per request, so the native yield models are not loaded next to the compiled export
+    inference = AgriculturalMLInference(models_dir, compiled_max_rows=None)
+    inference.configure_threads(InferenceThreadPolicy())
+    with contextlib.redirect_stdout(sys.stderr):
+        models_loaded = inference.load_models(components)
+
+    handled = 0
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            input_data = request.get("input", {})
+
+            with contextlib.redirect_stdout(sys.stderr):
+                if models_loaded:
+                    result = handler(inference, input_data)
+                else:
+                    result = fallback(input_data)
+
+        except json.JSONDecodeError as e:
+            result = {"success": False, "error": f"Invalid JSON request: {e}"}
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+
+        stdout.write(json.dumps({"id": request_id, "result": result}) + "\n")
+        stdout.flush()
+        handled += 1
+
+    return handled
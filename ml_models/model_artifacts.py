@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Split Model Artifacts
+One memory-mappable file per model under a JSON manifest, instead of one pickle per component
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import platform
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+MANIFEST_FILE = 'manifest.json'
+ARTIFACT_FORMAT_VERSION = 1
+
+# Distributions whose versions must match for the pickled models to load identically
+LIBRARY_PACKAGES = ('numpy', 'pandas', 'scikit-learn', 'xgboost', 'lightgbm', 'joblib')
+
+
+def library_versions() -> Dict[str, Optional[str]]:
+    """Installed versions of the libraries the artifacts were pickled with"""
+    from importlib import metadata
+
+    versions = {'python': platform.python_version()}
+    for package in LIBRARY_PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+def file_checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _json_value(value):
+    # numpy scalars and arrays in weights, importances and operating points
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def read_manifest(artifact_dir: str) -> Optional[Dict]:
+    """The manifest of a split artifact directory, or None if there is none"""
+    path = os.path.join(artifact_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_part(artifact_dir: str, component: str, part: str, value) -> Dict:
+    """Dump one part uncompressed, so joblib can memory-map its arrays, under a content-addressed name"""
+    import joblib
+
+    component_dir = os.path.join(artifact_dir, component)
+    os.makedirs(component_dir, exist_ok=True)
+    tmp_path = os.path.join(component_dir, f".{part}.{os.getpid()}.tmp")
+    joblib.dump(value, tmp_path)
+
+    checksum = file_checksum(tmp_path)
+    # A new name per content leaves files behind the previous manifest untouched for running readers
+    filename = f"{component}/{part}-{checksum[:16]}.joblib"
+    os.replace(tmp_path, os.path.join(artifact_dir, filename))
+    return {"file": filename, "sha256": checksum, "bytes": os.path.getsize(os.path.join(artifact_dir, filename))}
+
+
+def _referenced_files(manifest: Optional[Dict]) -> set:
+    if not manifest:
+        return set()
+    return {
+        part["file"]
+        for component in manifest["components"].values()
+        for part in component["parts"].values()
+    }
+
+
+def save_artifacts(artifact_dir: str, components: Dict[str, object],
+                   feature_columns: Optional[List[str]] = None) -> Dict:
+    """Write each component's artifact_parts() as separate files and publish them with a new manifest.
+
+    Parts are written first and the manifest is replaced last in one rename,
+    so a reader sees either the previous model set or the complete new one.
+    Part files referenced by neither manifest are removed afterwards.
+    """
+    os.makedirs(artifact_dir, exist_ok=True)
+    previous = read_manifest(artifact_dir)
+
+    manifest = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "created": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        "library_versions": library_versions(),
+        "feature_columns": list(feature_columns) if feature_columns is not None else None,
+        "components": {}
+    }
+
+    for name, component in components.items():
+        parts, metadata = component.artifact_parts()
+        manifest["components"][name] = {
+            "parts": {part: _write_part(artifact_dir, name, part, value) for part, value in parts.items()},
+            "metadata": metadata
+        }
+
+    # Identifies the model set by content, whatever the file timestamps
+    checksums = sorted(part["sha256"] for part in
+                       (p for c in manifest["components"].values() for p in c["parts"].values()))
+    manifest["artifact_id"] = hashlib.sha256(''.join(checksums).encode()).hexdigest()[:16]
+
+    manifest_path = os.path.join(artifact_dir, MANIFEST_FILE)
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, default=_json_value)
+    os.replace(tmp_path, manifest_path)
+
+    keep = _referenced_files(manifest) | _referenced_files(previous)
+    for name in manifest["components"]:
+        component_dir = os.path.join(artifact_dir, name)
+        for filename in os.listdir(component_dir):
+            if filename.endswith('.joblib') and f"{name}/{filename}" not in keep:
+                os.remove(os.path.join(component_dir, filename))
+
+    return manifest
+
+
+def load_parts(artifact_dir: str, component: str, parts: Optional[Iterable[str]] = None,
+               mmap_mode: Optional[str] = 'r', verify: bool = False,
+               manifest: Optional[Dict] = None) -> Tuple[Dict, Dict]:
+    """(parts, metadata) of one component, loading only the named parts when given.
+
+    With mmap_mode the numpy buffers inside each part are mapped read-only
+    from the page cache instead of copied into the process.
+    """
+    import joblib
+
+    manifest = manifest or read_manifest(artifact_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No {MANIFEST_FILE} in {artifact_dir}")
+    entry = manifest["components"][component]
+
+    loaded = {}
+    for part in (parts if parts is not None else entry["parts"]):
+        info = entry["parts"][part]
+        path = os.path.join(artifact_dir, info["file"])
+        if verify and file_checksum(path) != info["sha256"]:
+            raise ValueError(f"Checksum mismatch for {info['file']}")
+        loaded[part] = joblib.load(path, mmap_mode=mmap_mode)
+
+    return loaded, entry["metadata"]
+
+
+def verify_artifacts(artifact_dir: str) -> List[str]:
+    """Problems with a split artifact directory: missing or corrupted parts and library drift"""
+    manifest = read_manifest(artifact_dir)
+    if manifest is None:
+        return [f"No {MANIFEST_FILE} in {artifact_dir}"]
+
+    problems = []
+    for info in (p for c in manifest["components"].values() for p in c["parts"].values()):
+        path = os.path.join(artifact_dir, info["file"])
+        if not os.path.exists(path):
+            problems.append(f"{info['file']} is missing")
+        elif file_checksum(path) != info["sha256"]:
+            problems.append(f"{info['file']} does not match its checksum")
+
+    problems.extend(library_mismatches(manifest))
+    return problems
+
+
+def library_mismatches(manifest: Dict) -> List[str]:
+    """Libraries installed at a different version than the artifacts were saved with"""
+    current = library_versions()
+    return [
+        f"{package} {saved} saved, {current.get(package)} installed"
+        for package, saved in manifest.get("library_versions", {}).items()
+        if package != 'python' and saved != current.get(package)
+    ]
+
+
+def convert_pickles(models_dir: str, output_dir: Optional[str] = None) -> Dict:
+    """Write the split format next to (or away from) an existing set of pickled artifacts"""
+    from data_preprocessor import AgriculturalDataPreprocessor
+    from yield_predictor import CropYieldPredictor
+    from crop_recommender import CropRecommender
+
+    preprocessor = AgriculturalDataPreprocessor()
+    preprocessor.load_preprocessor(os.path.join(models_dir, 'preprocessor.pkl'))
+
+    yield_predictor = CropYieldPredictor()
+    yield_predictor.load_model(os.path.join(models_dir, 'yield_predictor.pkl'))
+    compiled_path = os.path.join(models_dir, 'yield_predictor_compiled.pkl')
+    if os.path.exists(compiled_path):
+        compiled = CropYieldPredictor()
+        compiled.load_compiled(compiled_path)
+        yield_predictor.compiled = compiled.compiled
+
+    components = {'preprocessor': preprocessor, 'yield_predictor': yield_predictor}
+    crop_path = os.path.join(models_dir, 'crop_recommender.pkl')
+    if os.path.exists(crop_path):
+        crop_recommender = CropRecommender()
+        crop_recommender.load_model(crop_path)
+        components['crop_recommender'] = crop_recommender
+
+    return save_artifacts(output_dir or models_dir, components, preprocessor.feature_columns)
+
+
+def main():
+    """Convert pickled artifacts to the split format, or verify a split directory"""
+    parser = argparse.ArgumentParser(description="Manage split, memory-mappable model artifacts")
+    parser.add_argument("--models-dir", default="trained_models")
+    parser.add_argument("--convert", action="store_true",
+                        help="Write the split format from the pickled artifacts in --models-dir")
+    parser.add_argument("--output-dir", help="Where to write the split format (default: --models-dir)")
+    parser.add_argument("--verify", action="store_true", help="Check every part against its checksum")
+    args = parser.parse_args()
+
+    artifact_dir = args.output_dir or args.models_dir
+    if args.convert:
+        convert_pickles(args.models_dir, artifact_dir)
+
+    manifest = read_manifest(artifact_dir)
+    if manifest is None:
+        print(f"❌ No {MANIFEST_FILE} in {artifact_dir}; run with --convert first")
+        sys.exit(1)
+
+    print(f"Artifact set {manifest['artifact_id']} ({manifest['created']})")
+    for name, component in manifest["components"].items():
+        total = sum(part["bytes"] for part in component["parts"].values())
+        print(f"  {name}: {len(component['parts'])} parts, {total / 1e6:.1f} MB")
+        for part, info in component["parts"].items():
+            print(f"    {part:<28} {info['bytes'] / 1e6:8.2f} MB")
+
+    if args.verify:
+        problems = verify_artifacts(artifact_dir)
+        for problem in problems:
+            print(f"⚠️ {problem}")
+        if not problems:
+            print("✅ Every part matches its checksum")
+        sys.exit(1 if any('checksum' in p or 'missing' in p for p in problems) else 0)
+
+
+if __name__ == "__main__":
+    main()
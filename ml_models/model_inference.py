@@ -4,95 +4,610 @@ Provides easy-to-use interface for making predictions with trained models
 """
 
 import os
+import copy
 import json
+import time
+import threading
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
 from data_preprocessor import AgriculturalDataPreprocessor
-from yield_predictor import CropYieldPredictor
+from yield_predictor import CropYieldPredictor, COMPILED_MAX_ROWS
 from crop_recommender import CropRecommender
+from row_encoder import RowEncoder
+from prediction_cache import (PredictionCache, SingleFlight, SQLitePredictionStore,
+                              canonicalize_input, fingerprint_files, make_key)
+from yield_surrogate import YieldSurrogate, SURROGATE_ARTIFACT
+from thread_config import InferenceThreadPolicy, cap_native_threads
+from model_artifacts import MANIFEST_FILE, library_mismatches, load_parts, read_manifest
+import logging
 import warnings
 warnings.filterwarnings('ignore')
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_INPUT_VALUES = {
+    'state': 'punjab',
+    'crop': 'Rice',
+    'district': 'ludhiana',
+    'average_yield': 4.0,
+    'trend': 'stable',
+    'variability': 0.08,
+    'district_factor': 1.2,
+    'soil_type': 'alluvial',
+    'climate_zone': 'north-western-plains',
+    'climate_factor': 1.2,
+    'soil_health_factor': 1.1,
+    'ph_optimal': 6.0,
+    'moisture_optimal': 80,
+    'temp_optimal': 28,
+    'water_requirement': 'High',
+    'season': 'kharif',
+    'duration_days': 135,
+    'seasonal_factor_kharif': 1.2,
+    'seasonal_factor_rabi': 1.0,
+    'seasonal_factor_zaid': 1.0,
+    'soil_ph': 6.8,
+    'soil_moisture': 60,
+    'soil_nitrogen': 70,
+    'soil_phosphorus': 50,
+    'soil_potassium': 180,
+    'soil_organic_matter': 3.0,
+    'avg_temperature': 28,
+    'humidity': 60,
+    'rainfall': 4,
+    'wind_speed': 8
+}
+
+# Artifact file behind each lazily loaded component
+COMPONENT_ARTIFACTS = {
+    'preprocessor': 'preprocessor.pkl',
+    'yield_predictor': 'yield_predictor.pkl',
+    'crop_recommender': 'crop_recommender.pkl'
+}
+
+# Flattened exports preferred over the original artifact when at least as new
+COMPILED_ARTIFACTS = {
+    'yield_predictor': 'yield_predictor_compiled.pkl'
+}
+
+# Numeric inputs varied across the synthetic warmup batch, over validate_input's ranges
+WARMUP_RANGES = {
+    'soil_ph': (5.0, 8.5),
+    'soil_moisture': (20, 90),
+    'soil_nitrogen': (20, 100),
+    'soil_phosphorus': (15, 80),
+    'soil_potassium': (50, 250),
+    'avg_temperature': (15, 45),
+    'humidity': (30, 95),
+    'rainfall': (0, 20)
+}
+
+# Components each public task needs before it can run
+TASK_COMPONENTS = {
+    'predict_yield': ('preprocessor', 'yield_predictor'),
+    'recommend_crops': ('preprocessor', 'crop_recommender'),
+    'comprehensive_analysis': ('preprocessor', 'yield_predictor', 'crop_recommender'),
+    'feature_importance': ('yield_predictor',),
+    'yield_operating_point': ('yield_predictor',)
+}
+
 class AgriculturalMLInference:
-    def __init__(self, models_dir: str = "trained_models"):
+    """Yield prediction and crop recommendation over the trained artifacts.
+    
+    Prediction methods only read the loaded components and build a fresh
+    result per call, so they may run concurrently from many threads. Loading
+    is serialised by a lock. After freeze() nothing the predictions read
+    changes any more, except set_yield_operating_point, which swaps the
+    ensemble weights in one assignment.
+    """
+    
+    def __init__(self, models_dir: str = "trained_models", compiled_max_rows: Optional[int] = COMPILED_MAX_ROWS):
         self.models_dir = models_dir
+        # Batches up to this size use the compiled yield ensemble, larger ones the native models.
+        # None serves every size compiled and skips loading the native models.
+        self.compiled_max_rows = compiled_max_rows
         self.preprocessor = None
         self.yield_predictor = None
         self.crop_recommender = None
         self.is_loaded = False
+        self._label_lookups = {}
+        self.row_encoder = None
+        self._load_lock = threading.RLock()
+        self._deferred_components = set()
+        self._missing_components = set()
+        self.prediction_cache = None
+        self.yield_surrogate = None
+        self.single_flight = None
+        self.load_times_ms = {}
+        self.warmup_report = None
+        self.is_warm = False
+        self.thread_policy = None
+        self._thread_tier = None
+        self._frozen = False
+        self.artifact_manifest = None
+        # Snapshot of the artifacts taken by the first load_models call
+        self._model_fingerprint = None
+        self._model_version = None
+        self._artifact_stats = None
+        self._cache_disk_path = None
         
-    def load_models(self):
-        """Load all trained models"""
-        try:
-            # Load preprocessor
-            preprocessor_path = os.path.join(self.models_dir, "preprocessor.pkl")
-            if os.path.exists(preprocessor_path):
-                self.preprocessor = AgriculturalDataPreprocessor()
-                self.preprocessor.load_preprocessor(preprocessor_path)
-                print("✅ Preprocessor loaded successfully")
-            else:
-                print("❌ Preprocessor not found")
-                return False
+    def enable_prediction_cache(self, max_entries: int = 4096, ttl_seconds: Optional[float] = 300.0,
+                                precision: Optional[Dict[str, float]] = None,
+                                disk_path: Optional[str] = None) -> PredictionCache:
+        """Memoize single and batch predictions under canonicalized inputs.
+        
+        Inputs are merged over DEFAULT_INPUT_VALUES and numeric fields listed in
+        precision are rounded to their step (e.g. {'soil_ph': 0.1}) before both
+        the lookup and the prediction, so near-identical farms share one entry.
+        With disk_path, results are also kept in a SQLite file shared by every
+        worker on the host and tied to model_fingerprint(). Before load_models
+        the file is only opened once the models have been read.
+        """
+        self._cache_disk_path = disk_path
+        self.prediction_cache = PredictionCache(max_entries, ttl_seconds, precision)
+        if self._model_fingerprint is not None:
+            self._open_cache_store()
+        return self.prediction_cache
+    
+    def _open_cache_store(self):
+        if self._cache_disk_path and self.prediction_cache is not None and self.prediction_cache.store is None:
+            self.prediction_cache.store = SQLitePredictionStore(self._cache_disk_path, self._model_fingerprint)
+    
+    def _artifact_paths(self) -> List[str]:
+        filenames = list(COMPONENT_ARTIFACTS.values()) + list(COMPILED_ARTIFACTS.values()) + [MANIFEST_FILE]
+        return [os.path.join(self.models_dir, filename) for filename in filenames]
+    
+    def _stat_artifacts(self) -> tuple:
+        """(inode, mtime, size) of every artifact, to notice files replaced while they are read"""
+        stats = []
+        for path in self._artifact_paths():
+            try:
+                stat = os.stat(path)
+                stats.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stats.append(None)
+        return tuple(stats)
+    
+    def model_fingerprint(self) -> str:
+        """Content hash of every model artifact in models_dir, changing whenever one is retrained.
+        
+        Once load_models has run this is the hash of the files it read, even
+        after the files on disk are replaced.
+        """
+        if self._model_fingerprint is not None:
+            return self._model_fingerprint
+        return fingerprint_files(self._artifact_paths())
+    
+    def model_version(self) -> str:
+        """Short identifier of the loaded model set: the manifest's artifact_id, else a content hash.
+        
+        Taken by load_models from the files it read, so it keeps naming the
+        models in memory after the files on disk are replaced.
+        """
+        with self._load_lock:
+            return self._model_version or self._read_model_version(self.model_fingerprint())
+    
+    def _read_model_version(self, fingerprint: str) -> str:
+        manifest = self._split_manifest()
+        return (manifest.get('artifact_id') if manifest else None) or fingerprint[:16]
+    
+    def _snapshot_artifacts(self):
+        """Fingerprint the artifacts before the first load; later loads must see the same files"""
+        stats = self._stat_artifacts()
+        if self._model_fingerprint is None:
+            self._model_fingerprint = fingerprint_files(self._artifact_paths())
+            self._model_version = self._read_model_version(self._model_fingerprint)
+            self._artifact_stats = stats
+        elif stats != self._artifact_stats:
+            raise RuntimeError(f"Model artifacts in {self.models_dir} changed since they were first loaded")
+    
+    def _check_artifacts_unchanged(self):
+        if self._stat_artifacts() != self._artifact_stats:
+            raise RuntimeError(f"Model artifacts in {self.models_dir} changed while they were loaded")
+    
+    def artifact_bytes(self, components: Optional[List[str]] = None) -> int:
+        """On-disk size of the artifacts load_models would read, a proxy for the memory they take"""
+        total = 0
+        for name in components or COMPONENT_ARTIFACTS:
+            path = self._artifact_path(name)
+            if os.path.basename(path) == MANIFEST_FILE:
+                parts = self._split_manifest()['components'][name]['parts']
+                if name == 'yield_predictor' and 'compiled' in parts and self.compiled_max_rows is None:
+                    parts = {'compiled': parts['compiled']}
+                total += sum(part['bytes'] for part in parts.values())
+            elif os.path.exists(path):
+                total += os.path.getsize(path)
+                native_path = os.path.join(self.models_dir, COMPONENT_ARTIFACTS[name])
+                if path != native_path and os.path.exists(native_path):
+                    total += os.path.getsize(native_path)
+        return total
+    
+    def get_cache_stats(self) -> Optional[Dict]:
+        return self.prediction_cache.get_stats() if self.prediction_cache is not None else None
+    
+    def enable_single_flight(self) -> SingleFlight:
+        """Let concurrent identical single requests share one computation.
+        
+        Requests are identical when their canonical inputs (see
+        enable_prediction_cache) and arguments match; callers arriving while
+        one is being scored wait for it instead of running the models again.
+        """
+        self.single_flight = SingleFlight()
+        return self.single_flight
+    
+    def get_single_flight_stats(self) -> Optional[Dict]:
+        return self.single_flight.get_stats() if self.single_flight is not None else None
+    
+    def configure_threads(self, policy: Optional[InferenceThreadPolicy] = None,
+                          tier: str = 'single_row') -> Dict:
+        """Replace the n_jobs pickled at training time with one tier of an inference thread policy.
+        
+        The tier is pinned for the life of the instance: pick the one matching
+        the largest request it will serve (policy.tier(n_rows)). Models are
+        never reconfigured while predicting, since another thread may be
+        inside them. Call before load_models so the native thread cap also
+        reaches libraries loaded by unpickling.
+        """
+        self._check_not_frozen()
+        policy = policy or InferenceThreadPolicy()
+        if tier not in policy.TIERS:
+            raise ValueError(f"Unknown thread tier {tier!r}, expected one of {policy.TIERS}")
+        self.thread_policy = policy
+        applied = cap_native_threads(policy.native_threads) if policy.native_threads else None
+        
+        with self._load_lock:
+            self._thread_tier = tier
+            policy.apply(self._thread_configurable_models(), tier)
+        return {"policy": policy.to_dict(), "tier": tier, "native": applied}
+    
+    @property
+    def thread_tier(self) -> Optional[str]:
+        return self._thread_tier
+    
+    def _thread_configurable_models(self, components: Optional[List[str]] = None) -> List:
+        components = components or list(COMPONENT_ARTIFACTS)
+        models = []
+        for name in components:
+            models.extend(self._component_models(name, getattr(self, name)))
+        return models
+    
+    @staticmethod
+    def _component_models(name: str, component) -> List:
+        """Fitted models of one component whose thread count can be set"""
+        if component is None or name == 'preprocessor':
+            return []
+        models = list(component.models.values())
+        if name == 'yield_predictor' and component.compiled is not None:
+            models.extend(component.compiled.native_models.values())
+        return models
+    
+    def load_models(self, components: Optional[List[str]] = None, lazy: bool = False,
+                    warmup: bool = False) -> bool:
+        """Load trained models.
+        
+        Only the requested components are touched (all three by default). With
+        lazy=True the artifacts are just checked for existence and unpickled on
+        first use, so a yield-only caller never pays for the crop recommender.
+        With warmup=True every loaded model then scores a synthetic batch, see
+        warmup(). Returns True when every requested component is available.
+        
+        The artifacts are fingerprinted on the first call, which fixes
+        model_fingerprint() and model_version(). RuntimeError is raised when
+        the files change during the load or between calls.
+        """
+        self._check_not_frozen()
+        components = list(components or COMPONENT_ARTIFACTS)
+        all_available = True
+        
+        with self._load_lock:
+            self._snapshot_artifacts()
+            for name in components:
+                if lazy:
+                    if os.path.exists(self._artifact_path(name)):
+                        if getattr(self, name) is None:
+                            self._deferred_components.add(name)
+                    else:
+                        logger.warning("❌ %s not found", self._component_label(name))
+                        self._missing_components.add(name)
+                        all_available = False
+                elif not self._load_component(name):
+                    all_available = False
+            # A retrain landing mid-load would mix two model sets under one fingerprint
+            self._check_artifacts_unchanged()
+            self._open_cache_store()
+        
+        self.is_loaded = all_available
+        if all_available and not lazy:
+            logger.info("🎉 All models loaded successfully!")
+        if warmup:
+            self.warmup()
+        return all_available
+    
+    def warmup(self, n_rows: int = 16) -> Dict:
+        """Push a synthetic batch through every model and task so the first real request is warm.
+        
+        The first predict on a freshly unpickled booster or forest pays for lazy
+        initialisation, thread-pool start-up and page faults. Each model is
+        called twice on the batch and each available task once, and the report
+        compares those first calls with the unpickling time per component.
+        Deferred components are loaded here. Caches are bypassed and left empty.
+        """
+        report = {"components": {}, "models": {}, "tasks": {}}
+        
+        for name in COMPONENT_ARTIFACTS:
+            if name in self._deferred_components:
+                self._load_component(name)
+            if getattr(self, name) is not None:
+                report["components"][name] = {"load_ms": self.load_times_ms.get(name)}
+        
+        if self.preprocessor is None:
+            self.warmup_report = report
+            return report
+        
+        records = self._warmup_records(n_rows)
+        X = np.vstack([self.row_encoder.encode(record) for record in records])
+        
+        if self.yield_predictor is not None:
+            X_yield = self.row_encoder.scale(X, 'yield')
+            models = dict(self.yield_predictor.models)
+            if self.yield_predictor.compiled is not None:
+                models['compiled'] = self.yield_predictor.compiled
+            for name, model in models.items():
+                report["models"][f"yield_predictor.{name}"] = self._time_first_calls(model.predict, X_yield)
+        
+        if self.crop_recommender is not None and 'crop' in self.row_encoder.scalers:
+            X_crop = self.row_encoder.scale(X, 'crop')
+            for name, model in self.crop_recommender.models.items():
+                if hasattr(model, 'predict_proba'):
+                    report["models"][f"crop_recommender.{name}"] = self._time_first_calls(model.predict_proba, X_crop)
+        
+        # Single and batch paths for each task, without touching the caches
+        tasks = {
+            'predict_yield': (self._predict_yield_one, self._predict_yield_batch),
+            'recommend_crops': (self._recommend_crops_one, self._recommend_crops_batch),
+            'comprehensive_analysis': (self._comprehensive_analysis_one, self._comprehensive_analysis_batch)
+        }
+        for task, (single, batch) in tasks.items():
+            if not all(getattr(self, name) is not None for name in TASK_COMPONENTS[task]):
+                continue
+            start = time.perf_counter()
+            result = single(records[0])
+            first_ms = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            batch(records)
+            report["tasks"][task] = {
+                "first_call_ms": first_ms,
+                "batch_ms": (time.perf_counter() - start) * 1000,
+                "success": bool(result.get("success"))
+            }
+        
+        for component, entry in report["components"].items():
+            first_calls = [timing["first_call_ms"] for model, timing in report["models"].items()
+                           if model.startswith(f"{component}.") and "first_call_ms" in timing]
+            entry["first_call_ms"] = sum(first_calls) if first_calls else None
+        report["load_ms"] = sum(entry["load_ms"] or 0 for entry in report["components"].values())
+        report["first_prediction_ms"] = sum(timing["first_call_ms"] for timing in report["tasks"].values())
+        
+        self.warmup_report = report
+        self.is_warm = bool(report["tasks"]) and all(timing["success"] for timing in report["tasks"].values())
+        logger.info("🔥 Warmed up %d models in %.1f ms after %.1f ms of loading",
+                    len(report['models']), report['first_prediction_ms'], report['load_ms'])
+        return report
+    
+    def _warmup_records(self, n_rows: int) -> List[Dict]:
+        """Defaults with numeric inputs spread over their valid ranges and states cycled"""
+        states = list(self.row_encoder.categorical_columns.get('state', (None, {}))[1]) or \
+            [DEFAULT_INPUT_VALUES['state']]
+        records = []
+        for i in range(n_rows):
+            fraction = i / max(n_rows - 1, 1)
+            record = dict(DEFAULT_INPUT_VALUES, state=states[i % len(states)])
+            for col, (low, high) in WARMUP_RANGES.items():
+                record[col] = low + (high - low) * fraction
+            records.append(record)
+        return records
+    
+    def _time_first_calls(self, predict, X: np.ndarray) -> Dict:
+        timings = {}
+        for label in ("first_call_ms", "second_call_ms"):
+            start = time.perf_counter()
+            try:
+                predict(X)
+            except Exception as e:
+                return {**timings, "error": str(e)}
+            timings[label] = (time.perf_counter() - start) * 1000
+        return timings
+    
+    def freeze(self, thread_tier: Optional[str] = None) -> 'AgriculturalMLInference':
+        """Finish loading and make the instance read-only for concurrent serving.
+        
+        Deferred components are loaded now, so no request ever unpickles.
+        thread_tier re-pins the models to another tier of the thread policy
+        before they are shared (default: keep the configured one). Later
+        load_models or configure_threads calls raise; load a new instance
+        instead. Freezing a frozen instance does nothing.
+        """
+        with self._load_lock:
+            if self._frozen:
+                return self
+            for name in list(self._deferred_components):
+                self._load_component(name)
+            if self.thread_policy is not None and thread_tier is not None:
+                self.thread_policy.apply(self._thread_configurable_models(), thread_tier)
+                self._thread_tier = thread_tier
+            self._frozen = True
+        return self
+    
+    @property
+    def is_frozen(self) -> bool:
+        return self._frozen
+    
+    def _check_not_frozen(self):
+        if self._frozen:
+            raise RuntimeError("AgriculturalMLInference is frozen; load models into a new instance")
+    
+    def is_available(self, task: str) -> bool:
+        """Whether every component a task needs is loaded or can be loaded on demand"""
+        return all(
+            getattr(self, name) is not None or name in self._deferred_components
+            for name in TASK_COMPONENTS[task]
+        )
+    
+    def _ensure_components(self, task: str) -> bool:
+        """Load any deferred components a task needs; False if one is unavailable"""
+        for name in TASK_COMPONENTS[task]:
+            if getattr(self, name) is None:
+                if name not in self._deferred_components or not self._load_component(name):
+                    return False
+        return True
+    
+    def _artifact_path(self, name: str) -> str:
+        path = os.path.join(self.models_dir, COMPONENT_ARTIFACTS[name])
+        manifest_path = os.path.join(self.models_dir, MANIFEST_FILE)
+        # The split format wins unless the pickle was saved after it
+        if name in (self._split_manifest() or {}).get('components', {}) and os.path.exists(manifest_path) and (
+                not os.path.exists(path) or os.path.getmtime(manifest_path) >= os.path.getmtime(path)):
+            return manifest_path
+        if name in COMPILED_ARTIFACTS:
+            compiled_path = os.path.join(self.models_dir, COMPILED_ARTIFACTS[name])
+            # A model saved after its export would be shadowed by stale arrays
+            if os.path.exists(compiled_path) and (
+                    not os.path.exists(path) or os.path.getmtime(compiled_path) >= os.path.getmtime(path)):
+                return compiled_path
+        return path
+    
+    def _split_manifest(self) -> Optional[Dict]:
+        """Manifest of the split artifacts in models_dir, read once so every component loads from the same set"""
+        with self._load_lock:
+            if self.artifact_manifest is None:
+                try:
+                    self.artifact_manifest = read_manifest(self.models_dir)
+                except (OSError, ValueError):
+                    self.artifact_manifest = None
+                if self.artifact_manifest is not None:
+                    for mismatch in library_mismatches(self.artifact_manifest):
+                        logger.warning("⚠️ Artifact library version differs: %s", mismatch)
+            return self.artifact_manifest
+    
+    def _load_split_component(self, name: str, component):
+        """Restore one component from its memory-mapped parts.
+        
+        The yield predictor skips its native models when every batch is
+        served compiled (compiled_max_rows=None).
+        """
+        manifest = self._split_manifest()
+        parts = None
+        if name == 'yield_predictor' and 'compiled' in manifest['components'][name]['parts'] \
+                and self.compiled_max_rows is None:
+            parts = ['compiled']
+        component.load_artifact_parts(*load_parts(self.models_dir, name, parts, manifest=manifest))
+        logger.info("Model loaded from %s/%s (%s)", self.models_dir, MANIFEST_FILE, name)
+        return component
+    
+    def _pin_threads(self, name: str, component):
+        if self.thread_policy is not None:
+            self.thread_policy.apply(self._component_models(name, component), self._thread_tier)
+    
+    def _component_label(self, name: str) -> str:
+        return name.replace('_', ' ').capitalize()
+    
+    def _load_component(self, name: str) -> bool:
+        """Unpickle one artifact, at most once even when called from several threads"""
+        with self._load_lock:
+            if getattr(self, name) is not None:
+                return True
             
-            # Load yield predictor
-            yield_model_path = os.path.join(self.models_dir, "yield_predictor.pkl")
-            if os.path.exists(yield_model_path):
-                self.yield_predictor = CropYieldPredictor()
-                self.yield_predictor.load_model(yield_model_path)
-                print("✅ Yield predictor loaded successfully")
-            else:
-                print("❌ Yield predictor not found")
+            path = self._artifact_path(name)
+            start = time.perf_counter()
+            if not os.path.exists(path):
+                logger.warning("❌ %s not found", self._component_label(name))
+                self._deferred_components.discard(name)
+                self._missing_components.add(name)
+                return False
+            if name in self._deferred_components and self._stat_artifacts() != self._artifact_stats:
+                # Deferred loads must read the set fingerprinted by load_models
+                logger.warning("❌ %s changed on disk since the models were loaded", self._component_label(name))
+                self._deferred_components.discard(name)
+                self._missing_components.add(name)
                 return False
             
-            # Load crop recommender
-            crop_model_path = os.path.join(self.models_dir, "crop_recommender.pkl")
-            if os.path.exists(crop_model_path):
-                self.crop_recommender = CropRecommender()
-                self.crop_recommender.load_model(crop_model_path)
-                print("✅ Crop recommender loaded successfully")
-            else:
-                print("❌ Crop recommender not found")
+            split = os.path.basename(path) == MANIFEST_FILE
+            try:
+                if name == 'preprocessor':
+                    preprocessor = AgriculturalDataPreprocessor()
+                    if split:
+                        self._load_split_component(name, preprocessor)
+                    else:
+                        preprocessor.load_preprocessor(path)
+                    self._label_lookups = {
+                        col: {label: code for code, label in enumerate(encoder.classes_)}
+                        for col, encoder in preprocessor.label_encoders.items()
+                    }
+                    # Compile the single-request encoder once the scalers are known
+                    self.row_encoder = RowEncoder.from_preprocessor(
+                        preprocessor, DEFAULT_INPUT_VALUES,
+                        self.crop_recommender.scaler if self.crop_recommender is not None else None
+                    )
+                    self.preprocessor = preprocessor
+                elif name == 'yield_predictor':
+                    yield_predictor = CropYieldPredictor()
+                    if split:
+                        self._load_split_component(name, yield_predictor)
+                    elif os.path.basename(path) == COMPILED_ARTIFACTS[name]:
+                        # Large batches still go to the native models, which beat the flat arrays there
+                        native_path = os.path.join(self.models_dir, COMPONENT_ARTIFACTS[name])
+                        keep_models = self.compiled_max_rows is not None and os.path.exists(native_path)
+                        if keep_models:
+                            yield_predictor.load_model(native_path)
+                        yield_predictor.load_compiled(path, keep_models=keep_models)
+                    else:
+                        yield_predictor.load_model(path)
+                    yield_predictor.compiled_max_rows = self.compiled_max_rows
+                    # Thread counts are set before other threads can reach the models
+                    self._pin_threads(name, yield_predictor)
+                    self.yield_predictor = yield_predictor
+                else:
+                    crop_recommender = CropRecommender()
+                    if split:
+                        self._load_split_component(name, crop_recommender)
+                    else:
+                        crop_recommender.load_model(path)
+                    if self.row_encoder is not None:
+                        self.row_encoder.add_scaler('crop', crop_recommender.scaler)
+                    self._pin_threads(name, crop_recommender)
+                    self.crop_recommender = crop_recommender
+                
+            except Exception as e:
+                logger.error("❌ Error loading %s: %s", os.path.basename(path), e)
+                self._deferred_components.discard(name)
+                self._missing_components.add(name)
                 return False
             
-            self.is_loaded = True
-            print("🎉 All models loaded successfully!")
+            self._deferred_components.discard(name)
+            self.load_times_ms[name] = (time.perf_counter() - start) * 1000
+            logger.info("✅ %s loaded successfully", self._component_label(name))
             return True
-            
-        except Exception as e:
-            print(f"❌ Error loading models: {e}")
-            return False
     
     def predict_yield(self, input_data: Dict) -> Dict:
         """Predict crop yield for given conditions"""
-        if not self.is_loaded:
+        return self._cached('predict_yield', input_data, self._predict_yield_one)
+    
+    def _predict_yield_one(self, input_data: Dict) -> Dict:
+        surrogate_result = self._predict_yield_surrogate(input_data)
+        if surrogate_result is not None:
+            return surrogate_result
+        
+        if not self._ensure_components('predict_yield'):
             return {"error": "Models not loaded"}
         
         try:
-            # Create input DataFrame
-            input_df = self._create_input_dataframe(input_data)
-            
-            # Scale features
-            X_scaled = self.preprocessor.scaler.transform(input_df)
-            X_scaled = pd.DataFrame(X_scaled, columns=input_df.columns, index=input_df.index)
-            
-            # Get predictions
-            predictions = self.yield_predictor.predict_yield(X_scaled)
-            
-            # Get confidence intervals
-            confidence_pred = self.yield_predictor.predict_with_confidence(input_df)
+            # Encode straight into a scaled feature row
+            X_scaled = self.row_encoder.scale(self.row_encoder.encode(input_data), 'yield')
             
             return {
                 "success": True,
-                "predictions": {
-                    "ensemble_yield": float(predictions.get('ensemble', [0])[0]),
-                    "individual_models": {k: float(v[0]) for k, v in predictions.items() if k != 'ensemble'},
-                    "confidence_interval": {
-                        "lower": float(confidence_pred['confidence_lower'][0]) if confidence_pred['confidence_lower'] is not None else None,
-                        "upper": float(confidence_pred['confidence_upper'][0]) if confidence_pred['confidence_upper'] is not None else None,
-                        "uncertainty": float(confidence_pred['uncertainty'][0]) if confidence_pred['uncertainty'] is not None else None
-                    }
-                },
+                "predictions": self._predict_yield_scaled(X_scaled)[0],
                 "input_conditions": input_data
             }
             
@@ -101,102 +616,374 @@ class AgriculturalMLInference:
     
     def recommend_crops(self, input_data: Dict, top_k: int = 5) -> Dict:
         """Recommend crops for given conditions"""
-        if not self.is_loaded:
+        return self._cached('recommend_crops', input_data, self._recommend_crops_one, top_k)
+    
+    def _recommend_crops_one(self, input_data: Dict, top_k: int = 5) -> Dict:
+        if not self._ensure_components('recommend_crops'):
             return {"error": "Models not loaded"}
         
         try:
-            # Create input DataFrame
-            input_df = self._create_input_dataframe(input_data)
-            
-            # Get recommendations
-            recommendations = self.crop_recommender.get_crop_recommendations_with_reasons(input_df, top_k)
+            # Encode straight into a scaled feature row
+            X_scaled = self.row_encoder.scale(self.row_encoder.encode(input_data), 'crop')
             
             return {
                 "success": True,
-                "recommendations": recommendations,
+                "recommendations": self._recommend_crops_scaled(X_scaled, top_k)[0],
                 "input_conditions": input_data
             }
             
         except Exception as e:
             return {"error": f"Recommendation failed: {str(e)}"}
     
-    def get_comprehensive_analysis(self, input_data: Dict) -> Dict:
+    def load_yield_surrogate(self, path: Optional[str] = None) -> Dict:
+        """Answer covered yield requests from a precomputed grid instead of the ensemble.
+        
+        The grid is refused when it was built from different model artifacts
+        or at another operating point than the one being served; the yield
+        predictor is loaded now, even when deferred, to check. Single and
+        batch yield predictions both read it. Requests it does not cover
+        (other state/crop pairs, values outside the grid, non-default inputs
+        off its axes) still run the full ensemble.
+        """
+        path = path or os.path.join(self.models_dir, SURROGATE_ARTIFACT)
+        if not os.path.exists(path):
+            return {"error": f"Yield surrogate not found: {path}"}
+        if not self._ensure_components('yield_operating_point'):
+            return {"error": "Yield models not loaded"}
+        
+        try:
+            surrogate = YieldSurrogate.load(path)
+            if surrogate.metadata.get('model_fingerprint') != self.model_fingerprint():
+                return {"error": "Yield surrogate was built from different model artifacts"}
+            if surrogate.metadata.get('operating_point') != self.yield_predictor.operating_point:
+                return {"error": f"Yield surrogate was built at operating point "
+                                 f"{surrogate.metadata.get('operating_point')}, "
+                                 f"not {self.yield_predictor.operating_point}"}
+        except Exception as e:
+            return {"error": f"Failed to load yield surrogate: {str(e)}"}
+        
+        self.yield_surrogate = surrogate
+        return {"success": True, "axes": surrogate.axis_names, **surrogate.metadata}
+    
+    def _predict_yield_surrogate(self, input_data: Dict) -> Optional[Dict]:
+        """Interpolated yield result, or None when the surrogate cannot answer exactly this input"""
+        surrogate = self.yield_surrogate
+        if surrogate is None:
+            return None
+        # set_yield_operating_point may have moved off the grid's operating point since it was loaded
+        if self.yield_predictor is None or \
+                surrogate.metadata.get('operating_point') != self.yield_predictor.operating_point:
+            return None
+        
+        merged = dict(DEFAULT_INPUT_VALUES)
+        # None and NaN (missing cells of a DataFrame row) fall back to the default
+        merged.update({col: value for col, value in input_data.items() if value is not None and value == value})
+        try:
+            if not surrogate.covers(merged):
+                return None
+            predictions = surrogate.predict(merged)
+        except Exception:
+            return None
+        
+        return {"success": True, "predictions": predictions, "input_conditions": input_data}
+    
+    def get_comprehensive_analysis(self, input_data: Dict, top_k: int = 5) -> Dict:
         """Get comprehensive agricultural analysis"""
-        if not self.is_loaded:
+        return self._cached('comprehensive_analysis', input_data, self._comprehensive_analysis_one, top_k)
+    
+    def _comprehensive_analysis_one(self, input_data: Dict, top_k: int = 5) -> Dict:
+        if not self._ensure_components('comprehensive_analysis'):
             return {"error": "Models not loaded"}
         
         try:
-            # Get yield prediction
-            yield_result = self.predict_yield(input_data)
+            # Encode the input once for both tasks
+            row = self.row_encoder.encode(input_data)
             
-            # Get crop recommendations
-            crop_result = self.recommend_crops(input_data, top_k=5)
+            return self._analyze_scaled(
+                self.row_encoder.scale(row, 'yield'),
+                self.row_encoder.scale(row, 'crop'),
+                [input_data],
+                top_k
+            )[0]
             
-            # Combine results
-            analysis = {
-                "success": True,
-                "yield_prediction": yield_result.get("predictions", {}),
-                "crop_recommendations": crop_result.get("recommendations", []),
-                "input_conditions": input_data,
-                "analysis_summary": self._generate_analysis_summary(yield_result, crop_result)
-            }
+        except Exception as e:
+            return {"error": f"Analysis failed: {str(e)}"}
+    
+    def predict_yield_batch(self, records: Union[List[Dict], pd.DataFrame]) -> List[Dict]:
+        """Predict crop yield for many farms, running each model once over the batch"""
+        return self._cached_batch('predict_yield', records, self._predict_yield_batch)
+    
+    def _predict_yield_batch(self, records: Union[List[Dict], pd.DataFrame]) -> List[Dict]:
+        input_records = self._input_records(records)
+        # Rows the surrogate covers get the same answer they would get one at a time
+        results = [self._predict_yield_surrogate(input_data) for input_data in input_records] \
+            if self.yield_surrogate is not None else [None] * len(input_records)
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+        if not self._ensure_components('predict_yield'):
+            return [result or {"error": "Models not loaded"} for result in results]
+        
+        try:
+            if len(pending) < len(input_records):
+                records = [input_records[i] for i in pending]
+            input_df = self._create_input_frame(records)
+            predictions = self._predict_yield_frame(input_df)
             
-            return analysis
+            for i, prediction in zip(pending, predictions):
+                results[i] = {"success": True, "predictions": prediction, "input_conditions": input_records[i]}
+            return results
             
         except Exception as e:
-            return {"error": f"Analysis failed: {str(e)}"}
+            return [result or {"error": f"Prediction failed: {str(e)}"} for result in results]
+    
+    def recommend_crops_batch(self, records: Union[List[Dict], pd.DataFrame], top_k: int = 5) -> List[Dict]:
+        """Recommend crops for many farms, running each classifier once over the batch"""
+        return self._cached_batch('recommend_crops', records, self._recommend_crops_batch, top_k)
+    
+    def _recommend_crops_batch(self, records: Union[List[Dict], pd.DataFrame], top_k: int = 5) -> List[Dict]:
+        input_records = self._input_records(records)
+        if not self._ensure_components('recommend_crops'):
+            return [{"error": "Models not loaded"} for _ in input_records]
+        
+        try:
+            input_df = self._create_input_frame(records)
+            recommendations = self._recommend_crops_frame(input_df, top_k)
+            
+            return [
+                {"success": True, "recommendations": row_recommendations, "input_conditions": input_data}
+                for row_recommendations, input_data in zip(recommendations, input_records)
+            ]
+            
+        except Exception as e:
+            return [{"error": f"Recommendation failed: {str(e)}"} for _ in input_records]
+    
+    def get_comprehensive_analysis_batch(self, records: Union[List[Dict], pd.DataFrame],
+                                         top_k: int = 5) -> List[Dict]:
+        """Get comprehensive analysis for many farms from one encoded batch"""
+        return self._cached_batch('comprehensive_analysis', records, self._comprehensive_analysis_batch, top_k)
+    
+    def _comprehensive_analysis_batch(self, records: Union[List[Dict], pd.DataFrame],
+                                      top_k: int = 5) -> List[Dict]:
+        input_records = self._input_records(records)
+        if not self._ensure_components('comprehensive_analysis'):
+            return [{"error": "Models not loaded"} for _ in input_records]
+        
+        try:
+            input_df = self._create_input_frame(records)
+            
+            return self._analyze_frame(input_df, input_records, top_k)
+            
+        except Exception as e:
+            return [{"error": f"Analysis failed: {str(e)}"} for _ in input_records]
+    
+    def _cache_input(self, input_data: Dict) -> Dict:
+        """Canonical form of an input: defaults merged, quantized, model fields only"""
+        fields = None
+        if self.row_encoder is not None:
+            fields = list(self.row_encoder.numeric_columns) + list(self.row_encoder.categorical_columns)
+        precision = self.prediction_cache.precision if self.prediction_cache is not None else None
+        return canonicalize_input(input_data, DEFAULT_INPUT_VALUES, fields, precision)
+    
+    def _cache_namespace(self, task: str) -> Optional[str]:
+        """Yield results depend on the active operating point as well as the input"""
+        if 'yield_predictor' in TASK_COMPONENTS[task] and self.yield_predictor is not None:
+            return self.yield_predictor.operating_point
+        return None
+    
+    def _cached(self, task: str, input_data: Dict, compute, *extra) -> Dict:
+        """Serve one request from the prediction cache or an identical in-flight request.
+        
+        On a miss the result is computed once per canonical key, even when
+        several threads ask for it at the same moment, and then stored.
+        """
+        cache = self.prediction_cache
+        flights = self.single_flight
+        # Load first so keys are always built from the model's fields
+        if (cache is None and flights is None) or not self._ensure_components(task):
+            return compute(input_data, *extra)
+        
+        canonical = self._cache_input(input_data)
+        key = make_key(task, canonical, self._cache_namespace(task), *extra)
+        result = cache.get(key) if cache is not None else None
+        if result is None:
+            def compute_and_store():
+                computed = compute(canonical, *extra)
+                if cache is not None and computed.get("success"):
+                    cache.put(key, computed)
+                return computed
+            
+            result = flights.do(key, compute_and_store) if flights is not None else compute_and_store()
+        
+        if "input_conditions" in result:
+            result["input_conditions"] = input_data
+        return result
+    
+    def _cached_batch(self, task: str, records: Union[List[Dict], pd.DataFrame], compute, *extra) -> List[Dict]:
+        """Serve cached rows of a batch and score only the misses, as one smaller batch.
+        
+        With single flight enabled, identical rows within the batch are scored
+        once, and rows whose key another request or batch is already scoring
+        wait for that result instead of being scored again.
+        """
+        cache = self.prediction_cache
+        flights = self.single_flight
+        if (cache is None and flights is None) or not self._ensure_components(task):
+            return compute(records, *extra)
+        
+        input_records = self._input_records(records)
+        canonical = [self._cache_input(input_data) for input_data in input_records]
+        namespace = self._cache_namespace(task)
+        keys = [make_key(task, row, namespace, *extra) for row in canonical]
+        results = [cache.get(key) if cache is not None else None for key in keys]
+        
+        # key -> rows waiting for it; only the first row of each key is scored
+        misses = {}
+        for i, result in enumerate(results):
+            if result is None:
+                misses.setdefault(keys[i], []).append(i)
+        
+        if misses:
+            # Keys in flight elsewhere are awaited; only the rest are scored here
+            leading, following = flights.claim(misses) if flights is not None else (list(misses), {})
+            finished = set()
+            try:
+                computed = compute([canonical[misses[key][0]] for key in leading], *extra) if leading else []
+                for key, result in zip(leading, computed):
+                    if cache is not None and result.get("success"):
+                        cache.put(key, result)
+                    if flights is not None:
+                        flights.complete(key, copy.deepcopy(result))
+                    finished.add(key)
+                    self._fill_rows(results, misses[key], result)
+            except BaseException as e:
+                if flights is not None:
+                    for key in leading:
+                        if key not in finished:
+                            flights.complete(key, error=e)
+                raise
+            
+            # Waited on only after this batch's own keys are published
+            for key, future in following.items():
+                self._fill_rows(results, misses[key], copy.deepcopy(future.result()))
+            if flights is not None:
+                flights.record_coalesced(sum(len(rows) - 1 for rows in misses.values()))
+        
+        for result, input_data in zip(results, input_records):
+            if "input_conditions" in result:
+                result["input_conditions"] = input_data
+        return results
+    
+    @staticmethod
+    def _fill_rows(results: List, rows: List[int], result: Dict):
+        """Give the first row the result and every duplicate its own copy"""
+        results[rows[0]] = result
+        for i in rows[1:]:
+            results[i] = copy.deepcopy(result)
+    
+    def _input_records(self, records: Union[List[Dict], pd.DataFrame]) -> List[Dict]:
+        """Per-row input dicts echoed back as input_conditions"""
+        if isinstance(records, pd.DataFrame):
+            return records.to_dict('records')
+        return list(records)
+    
+    def _predict_yield_frame(self, input_df: pd.DataFrame) -> List[Dict]:
+        """Run the yield ensemble once over every row of an encoded input frame"""
+        return self._predict_yield_scaled(self.preprocessor.scaler.transform(input_df))
+    
+    def _predict_yield_scaled(self, X_scaled: np.ndarray) -> List[Dict]:
+        """Run the yield ensemble once over rows already scaled for the yield models"""
+        n_rows = len(X_scaled)
+        
+        # Get predictions, running every model exactly once
+        predictions = self.yield_predictor.predict_yield(X_scaled)
+        
+        # Derive confidence intervals from the same predictions
+        confidence_pred = self.yield_predictor.confidence_from_predictions(predictions, n_rows)
+        
+        ensemble = np.asarray(predictions.get('ensemble', np.zeros(n_rows))).tolist()
+        individual = {k: np.asarray(v, dtype=float).tolist() for k, v in predictions.items() if k != 'ensemble'}
+        interval = {
+            key: np.asarray(confidence_pred[source], dtype=float).tolist()
+            if confidence_pred[source] is not None else [None] * n_rows
+            for key, source in (("lower", 'confidence_lower'), ("upper", 'confidence_upper'),
+                                ("uncertainty", 'uncertainty'))
+        }
+        
+        return [
+            {
+                "ensemble_yield": float(ensemble[i]),
+                "individual_models": {k: v[i] for k, v in individual.items()},
+                "confidence_interval": {key: values[i] for key, values in interval.items()}
+            }
+            for i in range(n_rows)
+        ]
+    
+    def _recommend_crops_frame(self, input_df: pd.DataFrame, top_k: int = 5) -> List[List[Dict]]:
+        """Run the crop classifiers once over every row of an encoded input frame"""
+        return self._recommend_crops_scaled(self.crop_recommender.scaler.transform(input_df), top_k)
+    
+    def _recommend_crops_scaled(self, X_scaled: np.ndarray, top_k: int = 5) -> List[List[Dict]]:
+        """Run the crop classifiers once over rows already scaled for the recommender"""
+        return self.crop_recommender.recommendations_with_reasons_from_scaled(
+            X_scaled, self.preprocessor.feature_columns, top_k
+        )
+    
+    def _analyze_frame(self, input_df: pd.DataFrame, input_records: List[Dict], top_k: int = 5) -> List[Dict]:
+        """Comprehensive analysis from one encoded frame, evaluating each model once"""
+        return self._analyze_scaled(
+            self.preprocessor.scaler.transform(input_df),
+            self.crop_recommender.scaler.transform(input_df),
+            input_records,
+            top_k
+        )
+    
+    def _analyze_scaled(self, X_yield: np.ndarray, X_crop: np.ndarray, input_records: List[Dict],
+                        top_k: int = 5) -> List[Dict]:
+        """Comprehensive analysis from scaled rows, evaluating each model once"""
+        predictions = self._predict_yield_scaled(X_yield)
+        recommendations = self._recommend_crops_scaled(X_crop, top_k)
+        
+        return [
+            self._combine_analysis(
+                input_data,
+                {"success": True, "predictions": prediction},
+                {"success": True, "recommendations": row_recommendations}
+            )
+            for input_data, prediction, row_recommendations
+            in zip(input_records, predictions, recommendations)
+        ]
+    
+    def _combine_analysis(self, input_data: Dict, yield_result: Dict, crop_result: Dict) -> Dict:
+        """Combine yield and crop results into one analysis response"""
+        return {
+            "success": True,
+            "yield_prediction": yield_result.get("predictions", {}),
+            "crop_recommendations": crop_result.get("recommendations", []),
+            "input_conditions": input_data,
+            "analysis_summary": self._generate_analysis_summary(yield_result, crop_result)
+        }
     
     def _create_input_dataframe(self, input_data: Dict) -> pd.DataFrame:
         """Create input DataFrame from user input"""
-        # Default values
-        default_values = {
-            'state': 'punjab',
-            'crop': 'Rice',
-            'district': 'ludhiana',
-            'average_yield': 4.0,
-            'trend': 'stable',
-            'variability': 0.08,
-            'district_factor': 1.2,
-            'soil_type': 'alluvial',
-            'climate_zone': 'north-western-plains',
-            'climate_factor': 1.2,
-            'soil_health_factor': 1.1,
-            'ph_optimal': 6.0,
-            'moisture_optimal': 80,
-            'temp_optimal': 28,
-            'water_requirement': 'High',
-            'season': 'kharif',
-            'duration_days': 135,
-            'seasonal_factor_kharif': 1.2,
-            'seasonal_factor_rabi': 1.0,
-            'seasonal_factor_zaid': 1.0,
-            'soil_ph': 6.8,
-            'soil_moisture': 60,
-            'soil_nitrogen': 70,
-            'soil_phosphorus': 50,
-            'soil_potassium': 180,
-            'soil_organic_matter': 3.0,
-            'avg_temperature': 28,
-            'humidity': 60,
-            'rainfall': 4,
-            'wind_speed': 8
-        }
+        return self._create_input_frame([input_data])
+    
+    def _create_input_frame(self, records: Union[List[Dict], pd.DataFrame]) -> pd.DataFrame:
+        """Create an encoded input frame for many farms, working column by column"""
+        df = records.copy() if isinstance(records, pd.DataFrame) else pd.DataFrame(list(records))
+        df = df.reset_index(drop=True)
         
         # Merge user input with defaults
-        merged_data = {**default_values, **input_data}
-        
-        # Create DataFrame
-        df = pd.DataFrame([merged_data])
+        for col, default in DEFAULT_INPUT_VALUES.items():
+            if col in df.columns:
+                df[col] = df[col].fillna(default)
+            else:
+                df[col] = default
         
-        # Encode categorical variables if encoders are available
-        if hasattr(self.preprocessor, 'label_encoders'):
-            for col, encoder in self.preprocessor.label_encoders.items():
-                if col in df.columns:
-                    try:
-                        df[f'{col}_encoded'] = encoder.transform(df[col].astype(str))
-                    except:
-                        # If encoding fails, use a default value
-                        df[f'{col}_encoded'] = 0
+        # Encode categorical variables, unseen labels fall back to 0
+        for col, lookup in self._label_lookups.items():
+            if col in df.columns:
+                df[f'{col}_encoded'] = df[col].astype(str).map(lookup).fillna(0).astype(int)
         
         # Select only the features used in training
         if hasattr(self.preprocessor, 'feature_columns'):
@@ -223,9 +1010,25 @@ class AgriculturalMLInference:
         
         return ". ".join(summary_parts) + "."
     
+    def get_crop_suitability_factors(self, input_data: Dict, crop: str) -> Dict:
+        """Factors that make a crop suitable for given conditions"""
+        if not self._ensure_components('recommend_crops'):
+            return {"error": "Models not loaded"}
+        
+        try:
+            input_df = self._create_input_dataframe(input_data)
+            
+            return {
+                "success": True,
+                "suitability": self.crop_recommender.get_crop_suitability_factors(input_df, crop)
+            }
+            
+        except Exception as e:
+            return {"error": f"Failed to get suitability factors: {str(e)}"}
+    
     def get_feature_importance(self) -> Dict:
         """Get feature importance from trained models"""
-        if not self.is_loaded:
+        if not self._ensure_components('feature_importance'):
             return {"error": "Models not loaded"}
         
         try:
@@ -239,6 +1042,29 @@ class AgriculturalMLInference:
         except Exception as e:
             return {"error": f"Failed to get feature importance: {str(e)}"}
     
+    def set_yield_operating_point(self, name: Optional[str] = None,
+                                  latency_budget_ms: Optional[float] = None) -> Dict:
+        """Switch the yield ensemble to a stored operating point without retraining"""
+        if not self._ensure_components('yield_operating_point'):
+            return {"error": "Models not loaded"}
+        
+        try:
+            if name is not None or latency_budget_ms is not None:
+                self.yield_predictor.select_operating_point(name, latency_budget_ms)
+            
+            return {
+                "success": True,
+                "operating_point": self.yield_predictor.operating_point,
+                "ensemble_weights": self.yield_predictor.ensemble_weights,
+                "operating_points": [
+                    {key: point[key] for key in ('name', 'models', 'latency_ms', 'r2')}
+                    for point in self.yield_predictor.operating_points
+                ]
+            }
+            
+        except Exception as e:
+            return {"error": f"Failed to set operating point: {str(e)}"}
+    
     def validate_input(self, input_data: Dict) -> Dict:
         """Validate input data for predictions"""
         required_fields = [
@@ -0,0 +1,153 @@
+"""
+Model Hot Reload
+Watches the artifact directory and swaps a validated new model set into a running process
+"""
+
+import os
+import time
+import threading
+import logging
+from typing import Callable, Dict, Optional, Tuple
+
+from model_inference import AgriculturalMLInference, COMPONENT_ARTIFACTS, COMPILED_ARTIFACTS
+from model_artifacts import MANIFEST_FILE
+
+logger = logging.getLogger(__name__)
+
+# Files whose change means a retrained model set
+WATCHED_ARTIFACTS = tuple(COMPONENT_ARTIFACTS.values()) + tuple(COMPILED_ARTIFACTS.values()) + (MANIFEST_FILE,)
+
+
+def artifact_stamp(models_dir: str) -> Tuple:
+    """(file, mtime, size) of every watched artifact; cheap enough to poll every few seconds"""
+    stamp = []
+    for filename in WATCHED_ARTIFACTS:
+        try:
+            stat = os.stat(os.path.join(models_dir, filename))
+            stamp.append((filename, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stamp.append((filename, None, None))
+    return tuple(stamp)
+
+
+class ModelReloader:
+    """Loads a retrained model set in the background and swaps it in once it passes a warmup batch.
+
+    The swap is one reference assignment made by on_swap. Requests that
+    already hold the old instance finish on it, and it is freed when the
+    last of them returns. A set that fails to load or warm up is discarded
+    and the old one keeps serving.
+
+    ModelTrainer.save_models rewrites several files one after another, so a
+    change is only acted on once the files have looked the same for two
+    polls in a row.
+    """
+
+    def __init__(self, load: Callable[[], AgriculturalMLInference], current: AgriculturalMLInference,
+                 on_swap: Callable[[AgriculturalMLInference], None], poll_seconds: float = 5.0):
+        self.load = load
+        self.current = current
+        self.on_swap = on_swap
+        self.poll_seconds = poll_seconds
+        self.models_dir = current.models_dir
+
+        self._loaded_stamp = artifact_stamp(self.models_dir)
+        self._last_seen = self._loaded_stamp
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {
+            "version": current.model_version(),
+            "reloads": 0,
+            "failed_reloads": 0,
+            "last_reload_seconds": None,
+            "last_reloaded_at": None,
+            "last_error": None
+        }
+
+    def start(self):
+        """Start polling the artifact directory"""
+        if self._thread is None and self.poll_seconds > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="model-reloader", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.check()
+            except Exception as e:
+                self.stats["last_error"] = str(e)
+
+    def check(self) -> Optional[Dict]:
+        """One poll: reload when the artifacts changed and have settled; None when nothing happened"""
+        stamp = artifact_stamp(self.models_dir)
+        settled = stamp == self._last_seen
+        self._last_seen = stamp
+        if stamp == self._loaded_stamp or not settled:
+            return None
+        return self.reload()
+
+    def reload(self) -> Dict:
+        """Load, validate and swap in the model set now on disk"""
+        with self._reload_lock:
+            stamp = artifact_stamp(self.models_dir)
+            start = time.perf_counter()
+            try:
+                candidate = self.load()
+                error = self.validate(candidate)
+            except Exception as e:
+                candidate, error = None, f"Loading failed: {e}"
+            # Retried only once the files change again
+            self._loaded_stamp = stamp
+
+            if error is None and candidate.model_version() == self.current.model_version():
+                return {"success": True, "swapped": False, "version": self.current.model_version()}
+
+            if error is not None:
+                self.stats["failed_reloads"] += 1
+                self.stats["last_error"] = error
+                logger.warning("⚠️ Model reload rejected, still serving %s: %s",
+                               self.current.model_version(), error)
+                return {"success": False, "swapped": False, "error": error,
+                        "version": self.current.model_version()}
+
+            previous = self.current.model_version()
+            self.on_swap(candidate)
+            self.current = candidate
+            self.stats.update({
+                "version": candidate.model_version(),
+                "reloads": self.stats["reloads"] + 1,
+                "last_reload_seconds": time.perf_counter() - start,
+                "last_reloaded_at": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                "last_error": None
+            })
+            logger.info("🔄 Swapped model set %s for %s", previous, candidate.model_version())
+            return {"success": True, "swapped": True, "previous_version": previous,
+                    "version": candidate.model_version()}
+
+    def validate(self, candidate: AgriculturalMLInference) -> Optional[str]:
+        """Why a loaded model set must not replace the current one, or None if it may"""
+        tasks = [task for task in ('predict_yield', 'recommend_crops', 'comprehensive_analysis')
+                 if self.current.is_available(task)]
+        missing = [task for task in tasks if not candidate.is_available(task)]
+        if missing:
+            return f"New models cannot serve {', '.join(missing)}"
+
+        report = candidate.warmup() if not candidate.is_warm else candidate.warmup_report
+        failed = [model for model, timing in report["models"].items() if "error" in timing]
+        if failed:
+            return f"Warmup failed for {', '.join(failed)}"
+        if tasks and not candidate.is_warm:
+            return "Warmup predictions did not succeed"
+        return None
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats, poll_seconds=self.poll_seconds)
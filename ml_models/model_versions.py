@@ -0,0 +1,214 @@
+"""
+Resident Model Versions
+Several loaded model sets served side by side, routed by weight or header, with per-version statistics
+"""
+
+import random
+import threading
+from collections import Counter, deque
+from typing import Dict, List, Optional, Tuple
+
+from model_inference import AgriculturalMLInference
+
+VERSION_HEADER = 'X-Model-Version'
+
+# Most recent latencies and outputs kept per version and task for percentiles
+DISTRIBUTION_SAMPLES = 4096
+
+
+def parse_model_versions(specs: List[str]) -> List[Tuple[str, str, Optional[float]]]:
+    """Parse "label=models_dir[:percent]" flags into (label, models_dir, percent or None).
+
+    The text after the last colon is a percent only when it is a number, so
+    directories such as /mnt/a:b/models or C:\\models are kept whole.
+    """
+    versions = []
+    for spec in specs or []:
+        label, sep, target = spec.partition('=')
+        if not sep or not label.strip() or not target:
+            raise ValueError(f"Expected label=models_dir[:percent], got {spec!r}")
+        models_dir, percent = target, None
+        head, colon, tail = target.rpartition(':')
+        if colon and head:
+            try:
+                models_dir, percent = head, float(tail)
+            except ValueError:
+                pass
+        versions.append((label.strip(), models_dir, percent))
+    return versions
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(int(q * len(sorted_values)), len(sorted_values) - 1)]
+
+
+class _Distribution:
+    """Exact count and mean, with percentiles over the most recent samples"""
+
+    def __init__(self, max_samples: int = DISTRIBUTION_SAMPLES):
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def summary(self) -> Optional[Dict]:
+        if not self.count:
+            return None
+        values = sorted(self.samples)
+        return {
+            "count": self.count,
+            "mean": self.total / self.count,
+            "p50": _percentile(values, 0.50),
+            "p90": _percentile(values, 0.90),
+            "p99": _percentile(values, 0.99),
+            "min": values[0],
+            "max": values[-1]
+        }
+
+
+def _output_value(task: str, result: Dict) -> Optional[float]:
+    """The number compared across versions: ensemble yield, or the top recommendation's score"""
+    if task == 'predict_yield':
+        return result.get('predictions', {}).get('ensemble_yield')
+    if task == 'recommend_crops':
+        recommendations = result.get('recommendations') or [{}]
+        return recommendations[0].get('score')
+    return result.get('yield_prediction', {}).get('ensemble_yield')
+
+
+def _top_crop(task: str, result: Dict) -> Optional[str]:
+    key = 'recommendations' if task == 'recommend_crops' else 'crop_recommendations'
+    recommendations = result.get(key) or [{}]
+    return recommendations[0].get('crop')
+
+
+class ResidentVersion:
+    """One loaded model set with its routing weight, micro-batcher and statistics"""
+
+    def __init__(self, label: str, inference: AgriculturalMLInference, weight: float, batcher=None):
+        self.label = label
+        self.inference = inference
+        self.weight = weight
+        self.batcher = batcher
+        self._lock = threading.Lock()
+        # task -> {"requests", "errors", "latency_ms", "output", "top_crops"}
+        self._tasks = {}
+
+    def record(self, task: str, seconds: float, result: Dict):
+        with self._lock:
+            stats = self._tasks.setdefault(task, {
+                "requests": 0, "errors": 0, "degraded": 0, "latency_ms": _Distribution(),
+                "output": _Distribution(), "top_crops": Counter()
+            })
+            stats["requests"] += 1
+            if result.get("degraded"):
+                # Shed to the heuristic fallback: neither the models' latency nor their output
+                stats["degraded"] += 1
+                return
+            stats["latency_ms"].add(seconds * 1000)
+            if not result.get("success"):
+                stats["errors"] += 1
+                return
+            value = _output_value(task, result)
+            if isinstance(value, (int, float)):
+                stats["output"].add(float(value))
+            if task != 'predict_yield':
+                crop = _top_crop(task, result)
+                if crop is not None:
+                    stats["top_crops"][crop] += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            tasks = {
+                task: {
+                    "requests": stats["requests"],
+                    "errors": stats["errors"],
+                    "degraded": stats["degraded"],
+                    "latency_ms": stats["latency_ms"].summary(),
+                    "output": stats["output"].summary(),
+                    **({"top_crops": dict(stats["top_crops"].most_common(10))} if stats["top_crops"] else {})
+                }
+                for task, stats in self._tasks.items()
+            }
+        return {"weight": self.weight, "model_version": self.inference.model_version(), "tasks": tasks}
+
+
+class ModelVersions:
+    """Routes each request to one resident model set.
+
+    A request naming a version in the version header is pinned to it; every
+    other request picks a version at random in proportion to the weights.
+    The first version added is the baseline the others are compared with.
+    """
+
+    def __init__(self, header: str = VERSION_HEADER, seed: Optional[int] = None):
+        self.header = header.lower()
+        self.versions = {}
+        self._random = random.Random(seed)
+        self._labels = []
+        self._cumulative = []
+
+    def add(self, label: str, inference: AgriculturalMLInference, weight: Optional[float] = None,
+            batcher=None) -> ResidentVersion:
+        if label in self.versions:
+            raise ValueError(f"Duplicate model version: {label}")
+        self.versions[label] = ResidentVersion(label, inference, weight, batcher)
+        self._normalize_weights()
+        return self.versions[label]
+
+    def _normalize_weights(self):
+        """Versions without a weight share whatever the weighted ones leave over"""
+        versions = list(self.versions.values())
+        given = sum(v.weight for v in versions if v.weight is not None)
+        unweighted = [v for v in versions if v.weight is None]
+        share = max(100.0 - given, 0.0) / len(unweighted) if unweighted else 0.0
+
+        weights = [v.weight if v.weight is not None else share for v in versions]
+        total = sum(weights)
+        if total <= 0:
+            raise ValueError("Model version weights must add up to more than zero")
+
+        self._labels = [v.label for v in versions]
+        self._cumulative = []
+        running = 0.0
+        for weight in weights:
+            running += weight / total
+            self._cumulative.append(running)
+
+    @property
+    def baseline(self) -> ResidentVersion:
+        return next(iter(self.versions.values()))
+
+    def choose(self, headers: Dict) -> ResidentVersion:
+        """The version serving a request; KeyError for a pinned version that is not resident"""
+        pinned = headers.get(self.header)
+        if pinned:
+            return self.versions[pinned]
+        draw = self._random.random()
+        for label, bound in zip(self._labels, self._cumulative):
+            if draw < bound:
+                return self.versions[label]
+        return self.versions[self._labels[-1]]
+
+    def get_stats(self) -> Dict:
+        stats = {label: version.get_stats() for label, version in self.versions.items()}
+        for label, entry in stats.items():
+            entry["traffic_share"] = self._share(label)
+
+        # Median latency of every version relative to the baseline, per task
+        baseline = stats[self.baseline.label]["tasks"]
+        for label, entry in stats.items():
+            for task, task_stats in entry["tasks"].items():
+                base_latency = (baseline.get(task) or {}).get("latency_ms")
+                if task_stats["latency_ms"] and base_latency and base_latency["p50"] > 0:
+                    task_stats["p50_vs_baseline"] = task_stats["latency_ms"]["p50"] / base_latency["p50"]
+
+        return {"header": self.header, "baseline": self.baseline.label, "versions": stats}
+
+    def _share(self, label: str) -> float:
+        index = self._labels.index(label)
+        return self._cumulative[index] - (self._cumulative[index - 1] if index else 0.0)
@@ -21,10 +21,10 @@ def main():
         input_data = json.loads(sys.stdin.read())
         
         # Initialize inference
-        inference = AgriculturalMLInference()
+        inference = AgriculturalMLInference(compiled_max_rows=None)
         
-        # Load models
-        if not inference.load_models():
+        # Load only the models this task needs
+        if not inference.load_models(['preprocessor', 'crop_recommender']):
             # Return mock recommendation if models not available
             result = generate_mock_crop_recommendation(input_data)
         else:
@@ -160,5 +160,18 @@ def generate_crop_reasons(crop, input_data):
     
     return reasons[:3]  # Limit to 3 reasons
 
+def run_worker_mode():
+    """Serve crop recommendation requests line by line with models loaded once"""
+    from inference_worker import run_worker
+
+    run_worker(
+        lambda inference, input_data: inference.recommend_crops(input_data, top_k=5),
+        generate_mock_crop_recommendation,
+        components=['preprocessor', 'crop_recommender']
+    )
+
 if __name__ == "__main__":
-    main()
+    if "--worker" in sys.argv[1:]:
+        run_worker_mode()
+    else:
+        main()
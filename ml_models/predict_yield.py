@@ -21,10 +21,10 @@ def main():
         input_data = json.loads(sys.stdin.read())
         
         # Initialize inference
-        inference = AgriculturalMLInference()
+        inference = AgriculturalMLInference(compiled_max_rows=None)
         
-        # Load models
-        if not inference.load_models():
+        # Load only the models this task needs
+        if not inference.load_models(['preprocessor', 'yield_predictor']):
             # Return mock prediction if models not available
             result = generate_mock_yield_prediction(input_data)
         else:
@@ -111,5 +111,18 @@ def generate_mock_yield_prediction(input_data):
         "input_conditions": input_data
     }
 
+def run_worker_mode():
+    """Serve yield prediction requests line by line with models loaded once"""
+    from inference_worker import run_worker
+
+    run_worker(
+        lambda inference, input_data: inference.predict_yield(input_data),
+        generate_mock_yield_prediction,
+        components=['preprocessor', 'yield_predictor']
+    )
+
 if __name__ == "__main__":
-    main()
+    if "--worker" in sys.argv[1:]:
+        run_worker_mode()
+    else:
+        main()
@@ -0,0 +1,328 @@
+"""
+Prediction Cache
+Memoizes and deduplicates prediction results under a canonical, optionally quantized form of the input
+"""
+
+import os
+import copy
+import json
+import time
+import sqlite3
+import hashlib
+import numbers
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+# Rows of the SQLite tier not rewritten for this long are dropped when a store opens the file
+STALE_ROW_SECONDS = 7 * 24 * 3600.0
+
+
+class PredictionCache:
+    def __init__(self, max_entries: int = 4096, ttl_seconds: Optional[float] = 300.0,
+                 precision: Optional[Dict[str, float]] = None,
+                 store: Optional['SQLitePredictionStore'] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # field -> quantization step, e.g. {'soil_ph': 0.1}
+        self.precision = dict(precision or {})
+        # Optional on-disk tier consulted on memory misses and written through
+        self.store = store
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "disk_hits": 0}
+
+    def canonicalize(self, input_data: Dict, defaults: Dict,
+                     fields: Optional[Iterable[str]] = None) -> Dict:
+        """Canonical input under this cache's precision, see canonicalize_input"""
+        return canonicalize_input(input_data, defaults, fields, self.precision)
+
+    def make_key(self, task: str, canonical_input: Dict, *extra: Hashable) -> Tuple:
+        return make_key(task, canonical_input, *extra)
+
+    def get(self, key: Tuple) -> Optional[Dict]:
+        """Return a copy of a live entry, or None on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds is not None and entry[0] <= now:
+                del self._entries[key]
+                self.stats["expirations"] += 1
+                entry = None
+
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                # Callers may mutate their result, never the cached one
+                return copy.deepcopy(entry[1])
+
+        value = self.store.get(key, self.ttl_seconds) if self.store is not None else None
+        with self._lock:
+            if value is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            self.stats["disk_hits"] += 1
+
+        # Promote to memory; the loaded copy is already private to this caller
+        self._remember(key, copy.deepcopy(value))
+        return value
+
+    def put(self, key: Tuple, value: Dict):
+        """Store a result, evicting the least recently used entries past max_entries"""
+        if self.store is not None:
+            self.store.put(key, value)
+        self._remember(key, copy.deepcopy(value))
+
+    def _remember(self, key: Tuple, value: Dict):
+        if self.max_entries <= 0:
+            return
+
+        expires = time.monotonic() + self.ttl_seconds if self.ttl_seconds is not None else None
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        stats["ttl_seconds"] = self.ttl_seconds
+        if self.store is not None:
+            stats["disk"] = self.store.get_stats()
+        return stats
+
+
+class SingleFlight:
+    """Runs one computation per key at a time; callers arriving meanwhile share its result"""
+
+    def __init__(self):
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.stats = {"executions": 0, "coalesced": 0}
+
+    def do(self, key: Hashable, compute: Callable[[], Dict]) -> Dict:
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.stats["executions"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            # Each follower gets its own copy to mutate
+            return copy.deepcopy(future.result())
+
+        try:
+            result = compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return copy.deepcopy(result)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def claim(self, keys: Iterable[Hashable]) -> Tuple[List[Hashable], Dict[Hashable, Future]]:
+        """Batch form of do(): (keys the caller must compute, futures of keys already in flight).
+
+        Every claimed key must be finished with complete(), even on failure,
+        and before the caller waits on any of the returned futures, so two
+        batches waiting on each other's keys cannot deadlock.
+        """
+        leading, following = [], {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                future = self._in_flight.get(key)
+                if future is None:
+                    self._in_flight[key] = Future()
+                    self.stats["executions"] += 1
+                    leading.append(key)
+                else:
+                    following[key] = future
+                    self.stats["coalesced"] += 1
+        return leading, following
+
+    def complete(self, key: Hashable, result: Optional[Dict] = None, error: Optional[BaseException] = None):
+        """Publish the result (or error) of a key taken with claim() to the callers waiting on it"""
+        with self._lock:
+            future = self._in_flight.pop(key)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def record_coalesced(self, count: int):
+        """Count duplicates that were deduplicated outside do(), e.g. within one batch"""
+        with self._lock:
+            self.stats["coalesced"] += count
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["in_flight"] = len(self._in_flight)
+        return stats
+
+
+class SQLitePredictionStore:
+    """Prediction results shared by every worker on a host through one SQLite file.
+
+    Rows are keyed by a hash of the cache key and the model fingerprint, so a
+    retrained model set never reads results from the previous one, and model
+    sets resident side by side (versions, regions, a reload in progress) can
+    share one file. Rows of any fingerprint older than max_age_seconds are
+    dropped when the store is opened.
+    """
+
+    def __init__(self, path: str, fingerprint: str, timeout: float = 5.0,
+                 max_age_seconds: Optional[float] = STALE_ROW_SECONDS):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.timeout = timeout
+        self.max_age_seconds = max_age_seconds
+        self._local = threading.local()
+
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                "key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, "
+                "created REAL NOT NULL, value TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS predictions_created ON predictions (created)")
+            if max_age_seconds is not None:
+                conn.execute("DELETE FROM predictions WHERE created < ?", (time.time() - max_age_seconds,))
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread and per process, so forked workers never share one"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            # WAL lets readers in other workers proceed while one worker writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _row_key(self, key: Tuple) -> str:
+        data = json.dumps([self.fingerprint, key], sort_keys=True, default=str)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def get(self, key: Tuple, ttl_seconds: Optional[float] = None) -> Optional[Dict]:
+        try:
+            row = self._connection().execute(
+                "SELECT created, value FROM predictions WHERE key = ?", (self._row_key(key),)
+            ).fetchone()
+        except sqlite3.Error:
+            # A locked or unreadable cache is a miss, never a failed prediction
+            return None
+
+        if row is None or (ttl_seconds is not None and row[0] + ttl_seconds <= time.time()):
+            return None
+        return json.loads(row[1])
+
+    def put(self, key: Tuple, value: Dict):
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO predictions (key, fingerprint, created, value) VALUES (?, ?, ?, ?)",
+                (self._row_key(key), self.fingerprint, time.time(), json.dumps(value, default=_json_default))
+            )
+        except (sqlite3.Error, TypeError, ValueError):
+            pass
+
+    def get_stats(self) -> Dict:
+        try:
+            (entries,) = self._connection().execute("SELECT COUNT(*) FROM predictions").fetchone()
+        except sqlite3.Error:
+            entries = None
+        return {"path": self.path, "fingerprint": self.fingerprint, "entries": entries,
+                "max_age_seconds": self.max_age_seconds}
+
+
+def _json_default(value):
+    # numpy scalars left in a result
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def fingerprint_files(paths: Iterable[str], chunk_size: int = 1 << 20) -> str:
+    """Content hash over the given files; missing files are recorded as absent"""
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(path).encode("utf-8"))
+        if not os.path.exists(path):
+            digest.update(b"\0missing")
+            continue
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(chunk_size), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def canonicalize_input(input_data: Dict, defaults: Dict, fields: Optional[Iterable[str]] = None,
+                       precision: Optional[Dict[str, float]] = None) -> Dict:
+    """Merge input over defaults, quantize numeric fields and keep only the given fields.
+
+    The result is what the models are asked to score, so every request that
+    shares a key also shares an answer.
+    """
+    merged = dict(defaults)
+    # None and NaN (missing cells of a DataFrame row) fall back to the default
+    merged.update({col: value for col, value in input_data.items()
+                   if value is not None and value == value})
+    if fields is not None:
+        fields = set(fields)
+        merged = {col: value for col, value in merged.items() if col in fields}
+
+    for col, step in (precision or {}).items():
+        value = merged.get(col)
+        if step and _is_number(value):
+            # Rounding again drops the float noise left by the multiplication
+            merged[col] = round(round(value / step) * step, 10)
+
+    return merged
+
+
+def make_key(task: str, canonical_input: Dict, *extra: Hashable) -> Tuple:
+    """Hashable key for a task, its canonical input and any extra arguments"""
+    items = tuple(sorted(
+        (col, float(value) if _is_number(value) else str(value))
+        for col, value in canonical_input.items()
+    ))
+    return (task, extra, items)
+
+
+def _is_number(value) -> bool:
+    # numbers.Real also covers the numpy scalars in DataFrame rows
+    return isinstance(value, numbers.Real) and not isinstance(value, bool)
+
+
+def parse_precision(spec: Optional[str]) -> Dict[str, float]:
+    """Parse 'soil_ph=0.1,humidity=1' into a field -> step mapping"""
+    precision = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        field, _, step = part.partition("=")
+        if not step:
+            raise ValueError(f"Expected field=step, got {part!r}")
+        precision[field.strip()] = float(step)
+    return precision
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Pre-fork Inference Server
+Loads the models once in a parent process and forks workers that share them copy-on-write
+"""
+
+import os
+import gc
+import sys
+import time
+import socket
+import signal
+import asyncio
+import logging
+import argparse
+from typing import Dict, List, Optional
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from inference_server import InferenceServer, build_arg_parser, create_server, load_inference, load_versions
+
+# smaps_rollup fields summed into the memory report, in kB
+SMAPS_FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def memory_usage(pid: int) -> Optional[Dict[str, float]]:
+    """RSS, PSS, USS and shared memory of a process in MB, from /proc (Linux only)"""
+    totals = dict.fromkeys(SMAPS_FIELDS, 0)
+    for filename in ('smaps_rollup', 'smaps'):
+        try:
+            with open(f'/proc/{pid}/{filename}') as f:
+                for line in f:
+                    field, _, value = line.partition(':')
+                    if field in totals:
+                        totals[field] += int(value.split()[0])
+            break
+        except (OSError, ValueError, IndexError):
+            continue
+    else:
+        return None
+
+    return {
+        "rss_mb": totals['Rss'] / 1024,
+        "pss_mb": totals['Pss'] / 1024,
+        # Unique set size: what the kernel frees if this process exits
+        "uss_mb": (totals['Private_Clean'] + totals['Private_Dirty']) / 1024,
+        "shared_mb": (totals['Shared_Clean'] + totals['Shared_Dirty']) / 1024
+    }
+
+
+class PreforkWorkerServer(InferenceServer):
+    """An InferenceServer running in a forked worker, reporting its own memory in /health"""
+
+    worker_index = None
+
+    def _health(self, payload: Dict) -> Dict:
+        health = super()._health(payload)
+        health["worker"] = {"index": self.worker_index, "pid": os.getpid(), "memory": memory_usage(os.getpid())}
+        return health
+
+
+def bind_socket(host: str, port: int, unix_socket: Optional[str] = None, backlog: int = 1024) -> socket.socket:
+    """Listening socket created before forking, so every worker accepts from the same queue"""
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(unix_socket)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+    sock.listen(backlog)
+    sock.setblocking(False)
+    return sock
+
+
+class PreforkPool:
+    def __init__(self, inference, args: argparse.Namespace, sock: socket.socket, processes: int,
+                 versions: Optional[List] = None):
+        self.inference = inference
+        self.versions = versions
+        self.args = args
+        self.sock = sock
+        self.processes = processes
+        # pid -> worker index
+        self.workers = {}
+        self.stopping = False
+
+    def spawn(self, index: int) -> int:
+        pid = os.fork()
+        if pid == 0:
+            os._exit(self._run_worker(index))
+        self.workers[pid] = index
+        return pid
+
+    def _run_worker(self, index: int) -> int:
+        """Child process: serve on the inherited socket with the parent's loaded models"""
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        try:
+            # Thread pools and the batcher thread do not survive fork, so they start here
+            server = create_server(self.inference, self.args, server_class=PreforkWorkerServer,
+                                   versions=self.versions)
+            server.worker_index = index
+            asyncio.run(server.serve(sock=self.sock))
+            return 0
+        except KeyboardInterrupt:
+            return 0
+        except Exception as e:
+            print(f"❌ Worker {index} failed: {e}", file=sys.stderr)
+            return 1
+
+    def stop(self, *_):
+        self.stopping = True
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def memory_report(self) -> Dict:
+        """Memory of the parent and every worker; shared pages are the models left untouched"""
+        workers = {index: memory_usage(pid) for pid, index in self.workers.items()}
+        return {"parent": memory_usage(os.getpid()), "workers": workers}
+
+    def print_memory_report(self):
+        report = self.memory_report()
+        for label, usage in [("parent", report["parent"])] + \
+                [(f"worker {index}", usage) for index, usage in sorted(report["workers"].items())]:
+            if usage is None:
+                print(f"  {label:<10} memory unavailable", file=sys.stderr)
+                continue
+            print(f"  {label:<10} RSS {usage['rss_mb']:7.1f} MB  PSS {usage['pss_mb']:7.1f} MB  "
+                  f"USS {usage['uss_mb']:7.1f} MB  shared {usage['shared_mb']:7.1f} MB", file=sys.stderr)
+
+    def run(self, report_interval: float = 60.0) -> int:
+        """Fork the workers, restart any that die and report memory until stopped"""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        for index in range(self.processes):
+            self.spawn(index)
+        print(f"🚀 {self.processes} pre-forked workers sharing one model load", file=sys.stderr)
+
+        next_report = time.monotonic() + min(report_interval, 5.0) if report_interval > 0 else None
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+
+            if pid:
+                index = self.workers.pop(pid)
+                if not self.stopping:
+                    print(f"⚠️ Worker {index} (pid {pid}) exited with status {status}, restarting",
+                          file=sys.stderr)
+                    self.spawn(index)
+                continue
+
+            if next_report is not None and time.monotonic() >= next_report:
+                self.print_memory_report()
+                next_report = time.monotonic() + report_interval
+            time.sleep(0.2)
+
+        self.sock.close()
+        if self.args.unix_socket and os.path.exists(self.args.unix_socket):
+            os.unlink(self.args.unix_socket)
+        return 0
+
+
+def main():
+    """Load once, then fork the inference server workers"""
+    parser = build_arg_parser("Serve AgriculturalMLInference from pre-forked workers sharing one model load")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 2,
+                        help="Forked worker processes")
+    parser.add_argument("--gc-freeze", action="store_true",
+                        help="Move everything loaded into the GC's permanent generation before forking, "
+                             "so collections in the workers do not dirty the shared pages")
+    parser.add_argument("--memory-report-interval", type=float, default=60.0,
+                        help="Seconds between RSS/PSS/USS reports on stderr (0 disables them)")
+    args = parser.parse_args()
+    if args.reload_poll_seconds > 0:
+        # Each worker would load its own private copy and lose the copy-on-write sharing
+        parser.error("--reload-poll-seconds is not supported with pre-forked workers; "
+                     "restart the pool to pick up retrained models")
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    inference = load_inference(args)
+    versions = load_versions(args, inference)
+    # Nothing may be unpickled after forking, or each worker would hold its own copy
+    for resident in [inference] + [v for _, v, _ in versions if v is not inference]:
+        resident.freeze()
+    sock = bind_socket(args.host, args.port, args.unix_socket)
+    where = f"unix:{args.unix_socket}" if args.unix_socket else f"http://{args.host}:{args.port}"
+    print(f"Listening on {where}", file=sys.stderr)
+
+    if args.gc_freeze:
+        gc.collect()
+        gc.freeze()
+
+    sys.exit(PreforkPool(inference, args, sock, args.processes, versions).run(args.memory_report_interval))
+
+
+if __name__ == "__main__":
+    main()
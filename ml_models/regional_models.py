@@ -0,0 +1,169 @@
+"""
+Regional Model Sets
+Per-state or per-climate-zone model sets loaded on demand and evicted least-recently-used under a memory budget
+"""
+
+import os
+import re
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+from model_inference import AgriculturalMLInference, DEFAULT_INPUT_VALUES
+from data_preprocessor import STATE_METADATA, DEFAULT_STATE_METADATA
+
+logger = logging.getLogger(__name__)
+
+REGION_KEYS = ('state', 'climate_zone')
+
+# Region keys double as directory names
+_VALID_KEY = re.compile(r'^[a-z0-9_-]+$')
+
+# Regions tracked individually even when they have no model set; other keys only count globally
+KNOWN_REGIONS = set(STATE_METADATA) | {metadata['climateZone'] for metadata in STATE_METADATA.values()}
+
+
+def region_key(input_data: Dict, by: str = 'state') -> str:
+    """The state, or its climate zone from the state metadata, a request belongs to"""
+    state = str(input_data.get('state') or DEFAULT_INPUT_VALUES['state']).strip().lower().replace(' ', '_')
+    if by == 'state':
+        return state
+    if by == 'climate_zone':
+        zone = input_data.get('climate_zone') or STATE_METADATA.get(state, DEFAULT_STATE_METADATA)['climateZone']
+        return str(zone).strip().lower()
+    raise ValueError(f"Unknown region key: {by}")
+
+
+class _RegionalSet:
+    __slots__ = ("inference", "bytes")
+
+    def __init__(self, inference: AgriculturalMLInference, size: int):
+        self.inference = inference
+        self.bytes = size
+
+
+class RegionalModelSets:
+    """Loads <root_dir>/<region>/ on first use and keeps the most recently used sets within a budget.
+
+    A set's footprint is estimated from the size of the artifacts it reads,
+    so room is made before loading rather than after. A set larger than the
+    whole budget is still loaded, alone. Regions without a directory are
+    served by the fallback set. Evicted sets are freed once the requests
+    still holding them return.
+    """
+
+    def __init__(self, root_dir: str, fallback: AgriculturalMLInference,
+                 load: Callable[[str], AgriculturalMLInference], by: str = 'state',
+                 memory_budget_mb: float = 1024.0):
+        if by not in REGION_KEYS:
+            raise ValueError(f"Regions are keyed by one of {REGION_KEYS}, not {by}")
+        self.root_dir = root_dir
+        self.fallback = fallback
+        self.load = load
+        self.by = by
+        self.budget_bytes = int(memory_budget_mb * 1024 * 1024)
+
+        self._sets = OrderedDict()
+        self._lock = threading.Lock()
+        # One lock per region so concurrent misses on a region load it once
+        self._load_locks = {}
+        self.stats = {"hits": 0, "misses": 0, "fallbacks": 0, "evictions": 0}
+        self.region_stats = {}
+
+    def region_dir(self, key: str) -> Optional[str]:
+        if not _VALID_KEY.match(key):
+            return None
+        path = os.path.join(self.root_dir, key)
+        return path if os.path.isdir(path) else None
+
+    def for_input(self, input_data: Dict) -> Tuple[str, AgriculturalMLInference]:
+        """(region, inference) serving a request, loading and evicting as needed"""
+        key = region_key(input_data, self.by)
+        return key, self.get(key)
+
+    def get(self, key: str) -> AgriculturalMLInference:
+        with self._lock:
+            entry = self._sets.get(key)
+            if entry is not None:
+                self._sets.move_to_end(key)
+                self._count(key, "hits")
+                return entry.inference
+
+        path = self.region_dir(key)
+        if path is None:
+            with self._lock:
+                self._count(key if key in KNOWN_REGIONS else None, "fallbacks")
+            return self.fallback
+
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        with load_lock:
+            # Another request may have loaded it while this one waited
+            with self._lock:
+                entry = self._sets.get(key)
+                if entry is not None:
+                    self._sets.move_to_end(key)
+                    self._count(key, "hits")
+                    return entry.inference
+            return self._load(key, path)
+
+    def _load(self, key: str, path: str) -> AgriculturalMLInference:
+        size = AgriculturalMLInference(path).artifact_bytes()
+        with self._lock:
+            self._evict_for(size)
+
+        start = time.perf_counter()
+        inference = self.load(path)
+        load_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            # Sets loaded concurrently for other regions may have used the room
+            self._evict_for(size)
+            self._sets[key] = _RegionalSet(inference, size)
+            self._count(key, "misses")
+            region = self.region_stats[key]
+            region["loads"] = region.get("loads", 0) + 1
+            region["last_load_ms"] = load_ms
+            region["total_load_ms"] = region.get("total_load_ms", 0.0) + load_ms
+            region["mb"] = size / (1024 * 1024)
+        return inference
+
+    def _evict_for(self, size: int):
+        """Drop least recently used sets until `size` more bytes fit the budget"""
+        used = sum(entry.bytes for entry in self._sets.values())
+        while self._sets and used + size > self.budget_bytes:
+            key, entry = self._sets.popitem(last=False)
+            used -= entry.bytes
+            self.stats["evictions"] += 1
+            self.region_stats[key]["evictions"] = self.region_stats[key].get("evictions", 0) + 1
+
+    def _count(self, key: Optional[str], outcome: str):
+        self.stats[outcome] += 1
+        if key is None:
+            return
+        region = self.region_stats.setdefault(key, {"hits": 0, "misses": 0, "fallbacks": 0})
+        region[outcome] += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            regions = {}
+            for key, region in self.region_stats.items():
+                region_lookups = region["hits"] + region["misses"]
+                regions[key] = dict(
+                    region,
+                    resident=key in self._sets,
+                    hit_rate=region["hits"] / region_lookups if region_lookups else 0.0,
+                    mean_load_ms=region["total_load_ms"] / region["loads"] if region.get("loads") else None
+                )
+            return {
+                **self.stats,
+                "by": self.by,
+                "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+                "resident": list(self._sets),
+                "used_mb": sum(entry.bytes for entry in self._sets.values()) / (1024 * 1024),
+                "budget_mb": self.budget_bytes / (1024 * 1024),
+                "regions": regions
+            }
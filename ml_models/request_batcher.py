@@ -0,0 +1,189 @@
+"""
+Request Micro-Batcher
+Coalesces concurrent single-farm requests so every model runs once per batch
+"""
+
+import time
+import queue
+import contextlib
+import threading
+from concurrent.futures import Future, InvalidStateError
+from typing import Callable, Dict, List, Optional
+
+from admission_control import AdmissionController
+from model_inference import AgriculturalMLInference
+
+TASK_ERROR_LABELS = {
+    "predict_yield": "Prediction failed",
+    "recommend_crops": "Recommendation failed",
+    "comprehensive_analysis": "Analysis failed",
+}
+
+
+class _PendingRequest:
+    __slots__ = ("task", "input_data", "top_k", "deadline", "on_expired", "future")
+
+    def __init__(self, task: str, input_data: Dict, top_k: int, deadline: Optional[float],
+                 on_expired: Optional[Callable[[], Dict]]):
+        self.task = task
+        self.input_data = input_data
+        self.top_k = top_k
+        self.deadline = deadline
+        self.on_expired = on_expired
+        self.future = Future()
+
+
+class MicroBatcher:
+    def __init__(self, inference: AgriculturalMLInference,
+                 max_batch_size: int = 64, max_wait_ms: float = 2.0,
+                 admission: Optional[AdmissionController] = None):
+        self.inference = inference
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        # Counts expired requests and receives one service time per batch
+        self.admission = admission
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "batches": 0, "largest_batch": 0, "expired": 0}
+
+    def start(self):
+        """Start the background batching thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the batching thread once queued requests are flushed"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, task: str, input_data: Dict, top_k: int = 5, deadline: Optional[float] = None,
+               on_expired: Optional[Callable[[], Dict]] = None) -> Future:
+        """Queue one request and return a future for its result.
+
+        A request still queued at its monotonic deadline is not scored; its
+        future gets on_expired() instead, or an error without one.
+        """
+        if task not in TASK_ERROR_LABELS:
+            raise ValueError(f"Unknown task: {task}")
+
+        request = _PendingRequest(task, input_data, top_k, deadline, on_expired)
+        self._queue.put(request)
+        return request.future
+
+    def predict_yield(self, input_data: Dict) -> Dict:
+        return self.submit("predict_yield", input_data).result()
+
+    def recommend_crops(self, input_data: Dict, top_k: int = 5) -> Dict:
+        return self.submit("recommend_crops", input_data, top_k).result()
+
+    def get_comprehensive_analysis(self, input_data: Dict) -> Dict:
+        return self.submit("comprehensive_analysis", input_data).result()
+
+    def get_stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["average_batch_size"] = stats["requests"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                return
+            self._process_batch(batch)
+
+    def _collect_batch(self) -> Optional[List[_PendingRequest]]:
+        """Block for one request, then gather more until the window or size limit is hit"""
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                # Finish this batch, then let _run see the stop marker
+                self._queue.put(None)
+                break
+            batch.append(request)
+
+        return batch
+
+    def _process_batch(self, batch: List[_PendingRequest]):
+        with self._stats_lock:
+            self.stats["requests"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+
+        groups = {}
+        for request in batch:
+            groups.setdefault((request.task, request.top_k), []).append(request)
+
+        start = time.perf_counter()
+        scored = 0
+        for (task, top_k), requests in groups.items():
+            scored += self._process_group(task, top_k, requests)
+        if scored and self.admission is not None:
+            self.admission.record_service(time.perf_counter() - start)
+
+    def _process_group(self, task: str, top_k: int, requests: List[_PendingRequest]) -> int:
+        """Score one task's requests as a single batch, scatter the results, and return how many ran"""
+        # Requests cancelled while queued are dropped; the rest can no longer be cancelled
+        requests = [request for request in requests if request.future.set_running_or_notify_cancel()]
+        now = time.monotonic()
+        expired = [request for request in requests if request.deadline is not None and now >= request.deadline]
+        if expired:
+            self._expire(task, expired)
+            requests = [request for request in requests if request not in expired]
+        if not requests:
+            return 0
+        inputs = [request.input_data for request in requests]
+
+        try:
+            if task == "predict_yield":
+                results = self.inference.predict_yield_batch(inputs)
+            elif task == "recommend_crops":
+                results = self.inference.recommend_crops_batch(inputs, top_k)
+            else:
+                results = self.inference.get_comprehensive_analysis_batch(inputs)
+        except Exception as e:
+            results = [{"error": f"{TASK_ERROR_LABELS[task]}: {str(e)}"} for _ in requests]
+
+        for request, result in zip(requests, results):
+            try:
+                request.future.set_result(result)
+            except InvalidStateError:
+                # Never let one future take down the only batching thread
+                pass
+        return len(requests)
+
+    def _expire(self, task: str, requests: List[_PendingRequest]):
+        """Answer requests whose deadline passed in the queue without scoring them"""
+        with self._stats_lock:
+            self.stats["expired"] += len(requests)
+        for request in requests:
+            if self.admission is not None:
+                self.admission.record_expired()
+            try:
+                if request.on_expired is not None:
+                    result = request.on_expired()
+                else:
+                    result = {"error": f"{TASK_ERROR_LABELS[task]}: deadline expired"}
+                request.future.set_result(result)
+            except Exception as e:
+                with contextlib.suppress(InvalidStateError):
+                    request.future.set_exception(e)
@@ -0,0 +1,83 @@
+"""
+Compiled Row Encoder
+Encodes a single request into a model-ready numpy row without building a DataFrame
+"""
+
+import numpy as np
+from typing import Dict, List, Optional
+
+
+class RowEncoder:
+    def __init__(self, feature_columns: List[str], label_encoders: Dict, default_values: Dict):
+        self.feature_columns = list(feature_columns)
+        column_index = {col: i for i, col in enumerate(self.feature_columns)}
+
+        # input key -> position of its value in the feature row
+        self.numeric_columns = {}
+        # input key -> (position of its encoded value, label -> code)
+        self.categorical_columns = {}
+
+        for col, encoder in label_encoders.items():
+            encoded_col = f'{col}_encoded'
+            if encoded_col in column_index:
+                lookup = {str(label): code for code, label in enumerate(encoder.classes_)}
+                self.categorical_columns[col] = (column_index[encoded_col], lookup)
+
+        for col in self.feature_columns:
+            if col in default_values and col not in self.categorical_columns:
+                self.numeric_columns[col] = column_index[col]
+
+        # Defaults are encoded once; each request only overwrites what it sends
+        self.template = np.zeros(len(self.feature_columns), dtype=np.float64)
+        for col, value in default_values.items():
+            self._set(self.template, col, value)
+
+        self.scalers = {}
+
+    def add_scaler(self, name: str, scaler) -> 'RowEncoder':
+        """Precompute a StandardScaler's mean and scale vectors under a name"""
+        n_features = len(self.feature_columns)
+        mean = getattr(scaler, 'mean_', None)
+        scale = getattr(scaler, 'scale_', None)
+        self.scalers[name] = (
+            np.asarray(mean, dtype=np.float64) if mean is not None else np.zeros(n_features),
+            np.asarray(scale, dtype=np.float64) if scale is not None else np.ones(n_features)
+        )
+        return self
+
+    def encode(self, input_data: Dict) -> np.ndarray:
+        """Encode one request as a 1 x n_features row in feature_columns order"""
+        row = self.template.copy()
+        for col, value in input_data.items():
+            self._set(row, col, value)
+        return row.reshape(1, -1)
+
+    def scale(self, rows: np.ndarray, name: str) -> np.ndarray:
+        """Apply a precomputed scaler to encoded rows"""
+        mean, scale = self.scalers[name]
+        return (rows - mean) / scale
+
+    def _set(self, row: np.ndarray, col: str, value):
+        if value is None:
+            return
+
+        index = self.numeric_columns.get(col)
+        if index is not None:
+            row[index] = float(value)
+            return
+
+        categorical = self.categorical_columns.get(col)
+        if categorical is not None:
+            index, lookup = categorical
+            # Unseen labels fall back to 0, as in the DataFrame path
+            row[index] = lookup.get(str(value), 0)
+
+    @classmethod
+    def from_preprocessor(cls, preprocessor, default_values: Dict,
+                          crop_scaler: Optional[object] = None) -> 'RowEncoder':
+        """Build an encoder with the yield scaler and, if given, the crop recommender scaler"""
+        encoder = cls(preprocessor.feature_columns, preprocessor.label_encoders, default_values)
+        encoder.add_scaler('yield', preprocessor.scaler)
+        if crop_scaler is not None:
+            encoder.add_scaler('crop', crop_scaler)
+        return encoder
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Startup Profile Script
+Breaks inference cold start into imports, unpickling and first predictions
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import subprocess
+import contextlib
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+# Add current directory to path
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(MODULE_DIR)
+
+SAMPLE_INPUT = {
+    'state': 'punjab',
+    'soil_ph': 6.8,
+    'soil_moisture': 60,
+    'soil_nitrogen': 70,
+    'soil_phosphorus': 50,
+    'soil_potassium': 180,
+    'avg_temperature': 28,
+    'humidity': 60,
+    'rainfall': 4
+}
+
+PROFILED_TASKS = ['predict_yield', 'recommend_crops', 'comprehensive_analysis']
+
+# Libraries an artifact may pull in when it is unpickled
+LIBRARY_PACKAGES = ('sklearn', 'scipy', 'xgboost', 'lightgbm', 'joblib')
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def profile_imports(module: str = "model_inference", top_n: int = 10) -> Dict:
+    """Run `python -X importtime` in a fresh process and total self time per top-level package"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=MODULE_DIR, capture_output=True, text=True
+    )
+
+    package_ms = defaultdict(float)
+    total_ms = 0.0
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, _, name = match.groups()
+        package_ms[name.split('.')[0]] += int(self_us) / 1000
+        if name == module:
+            total_ms = int(cumulative_us) / 1000
+
+    top_packages = sorted(package_ms.items(), key=lambda x: x[1], reverse=True)[:top_n]
+    return {
+        "module": module,
+        "total_ms": total_ms,
+        "top_packages": [{"package": name, "self_ms": ms} for name, ms in top_packages]
+    }
+
+
+def _loaded_libraries() -> set:
+    return {name.split('.')[0] for name in sys.modules} & set(LIBRARY_PACKAGES)
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def profile_startup(models_dir: str = "trained_models", tasks: Optional[List[str]] = None,
+                    importtime: bool = False) -> Dict:
+    """Time each cold-start phase of one inference process in order"""
+    tasks = tasks or PROFILED_TASKS
+    report = {"models_dir": models_dir}
+
+    # Only cold when model_inference has not been imported yet in this process
+    import_start = time.perf_counter()
+    from model_inference import AgriculturalMLInference, TASK_COMPONENTS
+    report["import_ms"] = (time.perf_counter() - import_start) * 1000
+
+    inference = AgriculturalMLInference(models_dir)
+    components = list(dict.fromkeys(name for task in tasks for name in TASK_COMPONENTS[task]))
+
+    # The module import loads none of the estimator libraries; unpickling does, and its time includes theirs
+    report["unpickle_ms"] = {}
+    report["unpickle_imports"] = {}
+    with contextlib.redirect_stdout(sys.stderr):
+        for name in components:
+            before = _loaded_libraries()
+            loaded, elapsed = _timed(inference._load_component, name)
+            report["unpickle_ms"][name] = elapsed if loaded else None
+            report["unpickle_imports"][name] = sorted(_loaded_libraries() - before)
+    inference.is_loaded = all(getattr(inference, name) is not None for name in components)
+
+    handlers = {
+        'predict_yield': inference.predict_yield,
+        'recommend_crops': inference.recommend_crops,
+        'comprehensive_analysis': inference.get_comprehensive_analysis
+    }
+
+    report["predictions_ms"] = {}
+    with contextlib.redirect_stdout(sys.stderr):
+        for task in tasks:
+            if not inference.is_available(task):
+                report["predictions_ms"][task] = None
+                continue
+            _, first_ms = _timed(handlers[task], SAMPLE_INPUT)
+            _, second_ms = _timed(handlers[task], SAMPLE_INPUT)
+            report["predictions_ms"][task] = {"first": first_ms, "second": second_ms}
+
+    first_predictions = sum(t["first"] for t in report["predictions_ms"].values() if t)
+    report["total_ms"] = (
+        report["import_ms"]
+        + sum(ms for ms in report["unpickle_ms"].values() if ms)
+        + first_predictions
+    )
+
+    if importtime:
+        report["imports"] = profile_imports()
+        # What those library imports alone cost, so unpickling can be told apart from importing
+        libraries = sorted({lib for libs in report["unpickle_imports"].values() for lib in libs})
+        report["library_imports_ms"] = {lib: profile_imports(lib)["total_ms"] for lib in libraries}
+
+    return report
+
+
+def format_report(report: Dict) -> str:
+    """Render a startup report as aligned text"""
+    lines = [f"Cold start for {report['models_dir']}: {report['total_ms']:.0f} ms", ""]
+
+    lines.append(f"  {'import model_inference':<36}{report['import_ms']:>10.1f} ms")
+    for name, ms in report["unpickle_ms"].items():
+        value = f"{ms:>10.1f} ms" if ms is not None else f"{'missing':>13}"
+        libraries = report.get("unpickle_imports", {}).get(name)
+        if libraries:
+            value += f"   (imports {', '.join(libraries)})"
+        lines.append(f"  {'unpickle ' + name:<36}{value}")
+    for task, times in report["predictions_ms"].items():
+        if times is None:
+            lines.append(f"  {'first ' + task:<36}{'unavailable':>13}")
+            continue
+        lines.append(f"  {'first ' + task:<36}{times['first']:>10.1f} ms"
+                     f"   (warm: {times['second']:.1f} ms)")
+
+    imports = report.get("imports")
+    if imports:
+        lines += ["", f"Import breakdown for {imports['module']} ({imports['total_ms']:.0f} ms, fresh process):"]
+        for entry in imports["top_packages"]:
+            lines.append(f"  {entry['package']:<36}{entry['self_ms']:>10.1f} ms")
+
+    library_imports = report.get("library_imports_ms")
+    if library_imports:
+        lines += ["", "Libraries first imported while unpickling (fresh process each):"]
+        for library, ms in library_imports.items():
+            lines.append(f"  {'import ' + library:<36}{ms:>10.1f} ms")
+
+    return "\n".join(lines)
+
+
+def main():
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Report where inference cold start time goes")
+    parser.add_argument("--models-dir", default="trained_models")
+    parser.add_argument("--task", action="append", choices=PROFILED_TASKS, dest="tasks",
+                        help="Task to profile (repeatable, default: all)")
+    parser.add_argument("--importtime", action="store_true",
+                        help="Also break imports down per package with python -X importtime")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = profile_startup(args.models_dir, args.tasks, args.importtime)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Micro-Batcher Tests
+Run with: python -m pytest ml_models/test_request_batcher.py
+"""
+
+import os
+import sys
+import time
+import threading
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from admission_control import AdmissionController
+from request_batcher import MicroBatcher
+
+
+class BlockingInference:
+    """Stands in for AgriculturalMLInference; the first batch waits for release"""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.scored = []
+
+    def predict_yield_batch(self, inputs):
+        self.started.set()
+        self.release.wait(5)
+        self.scored.extend(inputs)
+        return [{"success": True, "predictions": {"ensemble_yield": data["n"]}} for data in inputs]
+
+
+class MicroBatcherCancelTest(unittest.TestCase):
+    def setUp(self):
+        self.inference = BlockingInference()
+        self.batcher = MicroBatcher(self.inference, max_batch_size=1, max_wait_ms=0).start()
+
+    def tearDown(self):
+        self.inference.release.set()
+        self.batcher.stop()
+
+    def test_cancelled_request_does_not_stop_the_batcher(self):
+        first = self.batcher.submit("predict_yield", {"n": 1})
+        self.assertTrue(self.inference.started.wait(5))
+
+        # Queued behind the blocked batch, then cancelled by its caller
+        cancelled = self.batcher.submit("predict_yield", {"n": 2})
+        self.assertTrue(cancelled.cancel())
+        self.inference.release.set()
+
+        self.assertEqual(first.result(timeout=5)["predictions"]["ensemble_yield"], 1)
+        later = self.batcher.submit("predict_yield", {"n": 3})
+        self.assertEqual(later.result(timeout=5)["predictions"]["ensemble_yield"], 3)
+        self.assertNotIn({"n": 2}, self.inference.scored)
+
+    def test_running_request_can_no_longer_be_cancelled(self):
+        first = self.batcher.submit("predict_yield", {"n": 1})
+        self.assertTrue(self.inference.started.wait(5))
+
+        self.assertFalse(first.cancel())
+        self.inference.release.set()
+        self.assertEqual(first.result(timeout=5)["predictions"]["ensemble_yield"], 1)
+
+
+class MicroBatcherDeadlineTest(unittest.TestCase):
+    def setUp(self):
+        self.inference = BlockingInference()
+        self.admission = AdmissionController(max_queue=8, workers=1)
+        self.batcher = MicroBatcher(self.inference, max_batch_size=1, max_wait_ms=0,
+                                    admission=self.admission).start()
+
+    def tearDown(self):
+        self.inference.release.set()
+        self.batcher.stop()
+
+    def test_request_expired_in_queue_is_not_scored(self):
+        first = self.batcher.submit("predict_yield", {"n": 1})
+        self.assertTrue(self.inference.started.wait(5))
+
+        expired = self.batcher.submit("predict_yield", {"n": 2}, deadline=time.monotonic(),
+                                      on_expired=lambda: {"degraded": True})
+        self.inference.release.set()
+
+        self.assertEqual(expired.result(timeout=5), {"degraded": True})
+        self.assertEqual(first.result(timeout=5)["predictions"]["ensemble_yield"], 1)
+        self.assertNotIn({"n": 2}, self.inference.scored)
+        self.assertEqual(self.batcher.get_stats()["expired"], 1)
+        self.assertEqual(self.admission.get_stats()["deadline_expired"], 1)
+        # Only the batch that ran was timed
+        self.assertIsNotNone(self.admission.service_seconds)
+
+
+if __name__ == "__main__":
+    unittest.main()
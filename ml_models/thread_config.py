@@ -0,0 +1,116 @@
+"""
+Inference Thread Configuration
+Per-model and native library thread counts for serving, independent of the training settings
+"""
+
+import os
+from typing import Dict, Iterable, Optional
+
+# Read by OpenMP/BLAS runtimes when they are first loaded
+NATIVE_THREAD_ENV_VARS = (
+    'OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS'
+)
+
+
+def cap_native_threads(n_threads: int) -> Dict:
+    """Cap BLAS/OpenMP threads process-wide.
+
+    The environment variables cover runtimes loaded later (xgboost and lightgbm
+    are only imported when an artifact is unpickled); threadpoolctl, when
+    installed, also resizes the pools of runtimes that are already loaded.
+    """
+    for var in NATIVE_THREAD_ENV_VARS:
+        os.environ[var] = str(n_threads)
+
+    applied = {"env": list(NATIVE_THREAD_ENV_VARS), "threadpoolctl": False}
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return applied
+
+    threadpool_limits(limits=n_threads)
+    applied["threadpoolctl"] = True
+    return applied
+
+
+def set_model_threads(model, n_threads: int) -> bool:
+    """Set how many threads one fitted model predicts with; False if it has no such setting"""
+    kind = type(model).__name__
+
+    if kind.startswith('XGB'):
+        model.set_params(n_jobs=n_threads)
+        # The booster keeps its own copy of the setting from training
+        booster = model.get_booster()
+        booster.set_param({'nthread': n_threads})
+        return True
+
+    if kind.startswith('LGBM'):
+        # Passed to the booster as num_threads on every predict
+        model.set_params(n_jobs=n_threads)
+        return True
+
+    if hasattr(model, 'n_jobs'):
+        model.n_jobs = n_threads
+        return True
+
+    return False
+
+
+class InferenceThreadPolicy:
+    """Thread counts by request size: one thread for single rows and small batches, more for bulk.
+
+    Training pickles n_jobs=-1 into the forests and boosters, so every
+    one-row predict would otherwise fan out to a full-core pool, and several
+    workers per host oversubscribe the cores.
+
+    An AgriculturalMLInference is pinned to one tier, chosen for the largest
+    request it serves; thread counts are never changed under a prediction.
+    """
+
+    TIERS = ('single_row', 'small_batch', 'bulk')
+
+    def __init__(self, single_row_threads: int = 1, small_batch_threads: int = 1,
+                 bulk_threads: Optional[int] = None, small_batch_rows: int = 256,
+                 native_threads: Optional[int] = None):
+        self.single_row_threads = single_row_threads
+        self.small_batch_threads = small_batch_threads
+        self.bulk_threads = bulk_threads or os.cpu_count() or 1
+        self.small_batch_rows = small_batch_rows
+        # Process-wide BLAS/OpenMP cap, None leaves the runtimes alone
+        self.native_threads = native_threads
+
+    def tier(self, n_rows: int) -> str:
+        if n_rows <= 1:
+            return 'single_row'
+        if n_rows <= self.small_batch_rows:
+            return 'small_batch'
+        return 'bulk'
+
+    def threads_for(self, tier: str) -> int:
+        return {
+            'single_row': self.single_row_threads,
+            'small_batch': self.small_batch_threads,
+            'bulk': self.bulk_threads
+        }[tier]
+
+    def apply(self, models: Iterable, tier: str) -> int:
+        """Set the tier's thread count on every model; returns how many accepted it"""
+        n_threads = self.threads_for(tier)
+        applied = 0
+        for model in models:
+            try:
+                applied += set_model_threads(model, n_threads)
+            except Exception:
+                # A model that refuses keeps its pickled setting
+                pass
+        return applied
+
+    def to_dict(self) -> Dict:
+        return {
+            "single_row_threads": self.single_row_threads,
+            "small_batch_threads": self.small_batch_threads,
+            "bulk_threads": self.bulk_threads,
+            "small_batch_rows": self.small_batch_rows,
+            "native_threads": self.native_threads
+        }
@@ -14,12 +14,16 @@ import seaborn as sns
 from data_preprocessor import AgriculturalDataPreprocessor
 from yield_predictor import CropYieldPredictor
 from crop_recommender import CropRecommender
+from model_artifacts import save_artifacts, MANIFEST_FILE
 import warnings
 warnings.filterwarnings('ignore')
 
 class ModelTrainer:
-    def __init__(self, database_path: str = "../complete_agricultural_database.json"):
+    def __init__(self, database_path: str = "../complete_agricultural_database.json",
+                 yield_latency_budget_ms: float = None):
         self.database_path = database_path
+        # Per-row budget for the yield ensemble; None keeps every useful model
+        self.yield_latency_budget_ms = yield_latency_budget_ms
         self.preprocessor = AgriculturalDataPreprocessor()
         self.yield_predictor = CropYieldPredictor()
         self.crop_recommender = CropRecommender()
@@ -75,7 +79,9 @@ class ModelTrainer:
         
         # Create ensemble
         print("\nCreating ensemble model...")
-        ensemble_results = self.yield_predictor.create_ensemble(X_test_scaled, y_test)
+        ensemble_results = self.yield_predictor.create_ensemble(
+            X_test_scaled, y_test, latency_budget_ms=self.yield_latency_budget_ms
+        )
         
         # Evaluate on test set
         print("\nEvaluating on test set...")
@@ -148,10 +154,22 @@ class ModelTrainer:
         yield_model_path = os.path.join(output_dir, "yield_predictor.pkl")
         self.yield_predictor.save_model(yield_model_path)
         
+        # Export the ensemble as flat arrays for fast, dependency-light inference
+        compiled_yield_path = os.path.join(output_dir, "yield_predictor_compiled.pkl")
+        self.yield_predictor.export_compiled(compiled_yield_path)
+        
         # Save crop recommender
         crop_model_path = os.path.join(output_dir, "crop_recommender.pkl")
         self.crop_recommender.save_model(crop_model_path)
         
+        # Split, memory-mappable copy of the same models under a manifest
+        save_artifacts(output_dir, {
+            'preprocessor': self.preprocessor,
+            'yield_predictor': self.yield_predictor,
+            'crop_recommender': self.crop_recommender
+        }, self.preprocessor.feature_columns)
+        manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+        
         # Save training results
         results_path = os.path.join(output_dir, "training_results.json")
         with open(results_path, 'w') as f:
@@ -162,7 +180,9 @@ class ModelTrainer:
         print(f"\nModels saved to {output_dir}/")
         print(f"- Preprocessor: {preprocessor_path}")
         print(f"- Yield Predictor: {yield_model_path}")
+        print(f"- Compiled Yield Predictor: {compiled_yield_path}")
         print(f"- Crop Recommender: {crop_model_path}")
+        print(f"- Split Artifacts: {manifest_path}")
         print(f"- Training Results: {results_path}")
     
     def _make_serializable(self, obj):
@@ -320,7 +340,8 @@ def main():
         return False
     
     # Initialize trainer
-    trainer = ModelTrainer(database_path)
+    budget = os.environ.get("YIELD_LATENCY_BUDGET_MS")
+    trainer = ModelTrainer(database_path, float(budget) if budget else None)
     
     # Run training
     success = trainer.run_full_training()
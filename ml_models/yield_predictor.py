@@ -3,29 +3,45 @@ Crop Yield Prediction Model
 Uses ensemble methods to predict crop yields based on soil, weather, and location data
 """
 
+import time
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.linear_model import LinearRegression, Ridge, Lasso
-from sklearn.svm import SVR
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-from sklearn.model_selection import cross_val_score, GridSearchCV
-import xgboost as xgb
-import lightgbm as lgb
 import joblib
-from typing import Dict, List, Tuple, Any
+from itertools import combinations
+from typing import Dict, List, Tuple, Any, Optional
+import logging
 import warnings
 warnings.filterwarnings('ignore')
 
+logger = logging.getLogger(__name__)
+
+# Largest batch scored by the compiled ensemble when the native models are also loaded.
+# Compiled is ~20x faster on one row but ~2.3x slower at 2000 rows; the two meet near 75 rows.
+COMPILED_MAX_ROWS = 64
+
 class CropYieldPredictor:
     def __init__(self):
         self.models = {}
         self.ensemble_weights = {}
         self.feature_importance = {}
+        self.compiled = None
+        # None scores every batch with the compiled ensemble
+        self.compiled_max_rows = COMPILED_MAX_ROWS
+        self.model_latency_ms = {}
+        self.model_contributions = {}
+        self.operating_points = []
+        self.operating_point = None
         self.is_trained = False
         
     def initialize_models(self):
         """Initialize various regression models"""
+        # Imported here so inference, which only unpickles, skips these modules
+        from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+        from sklearn.linear_model import LinearRegression, Ridge, Lasso
+        from sklearn.svm import SVR
+        import xgboost as xgb
+        import lightgbm as lgb
+        
         self.models = {
             'random_forest': RandomForestRegressor(
                 n_estimators=100,
@@ -65,9 +81,14 @@ class CropYieldPredictor:
     def train_models(self, X_train: pd.DataFrame, y_train: pd.Series, 
                      X_val: pd.DataFrame = None, y_val: pd.Series = None) -> Dict:
         """Train all models and return performance metrics"""
+        from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+        from sklearn.model_selection import cross_val_score
+        
         if not self.models:
             self.initialize_models()
         
+        # A compiled export no longer matches the models once they are refit
+        self.compiled = None
         model_scores = {}
         
         for name, model in self.models.items():
@@ -123,6 +144,8 @@ class CropYieldPredictor:
     
     def optimize_hyperparameters(self, X_train: pd.DataFrame, y_train: pd.Series) -> Dict:
         """Optimize hyperparameters for key models"""
+        from sklearn.model_selection import GridSearchCV
+        
         param_grids = {
             'random_forest': {
                 'n_estimators': [50, 100, 200],
@@ -142,6 +165,7 @@ class CropYieldPredictor:
         }
         
         optimized_models = {}
+        self.compiled = None
         
         for name, param_grid in param_grids.items():
             if name in self.models:
@@ -175,8 +199,11 @@ class CropYieldPredictor:
         
         return optimized_models
     
-    def create_ensemble(self, X_val: pd.DataFrame, y_val: pd.Series) -> Dict:
-        """Create weighted ensemble of best performing models"""
+    def create_ensemble(self, X_val: pd.DataFrame, y_val: pd.Series,
+                        latency_budget_ms: Optional[float] = None) -> Dict:
+        """Create weighted ensemble of best performing models within an optional latency budget"""
+        from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+        
         if not self.is_trained:
             raise ValueError("Models must be trained before creating ensemble")
         
@@ -200,9 +227,16 @@ class CropYieldPredictor:
         if not predictions:
             raise ValueError("No valid model predictions available")
         
-        # Normalize weights
-        total_weight = sum(model_weights.values())
-        self.ensemble_weights = {name: weight/total_weight for name, weight in model_weights.items()}
+        # Score every subset so cheaper operating points can be chosen later
+        self.model_latency_ms = self.measure_model_latency(X_val)
+        self.operating_points, self.model_contributions = self._build_operating_points(
+            predictions, model_weights, y_val, self.measure_compiled_latency(X_val, list(predictions))
+        )
+        
+        if latency_budget_ms is None:
+            operating_point = self.select_operating_point(name='full')
+        else:
+            operating_point = self.select_operating_point(latency_budget_ms=latency_budget_ms)
         
         # Create ensemble prediction
         ensemble_pred = np.zeros(len(y_val))
@@ -214,6 +248,7 @@ class CropYieldPredictor:
         ensemble_rmse = np.sqrt(mean_squared_error(y_val, ensemble_pred))
         ensemble_mae = mean_absolute_error(y_val, ensemble_pred)
         
+        print(f"Operating point: {operating_point['name']} ({operating_point['latency_ms']:.2f} ms per row)")
         print(f"Ensemble R²: {ensemble_r2:.4f}")
         print(f"Ensemble RMSE: {ensemble_rmse:.4f}")
         print(f"Ensemble MAE: {ensemble_mae:.4f}")
@@ -222,28 +257,161 @@ class CropYieldPredictor:
             'ensemble_r2': ensemble_r2,
             'ensemble_rmse': ensemble_rmse,
             'ensemble_mae': ensemble_mae,
-            'model_weights': self.ensemble_weights
+            'model_weights': self.ensemble_weights,
+            'operating_point': operating_point['name'],
+            'model_latency_ms': self.model_latency_ms,
+            'model_contributions': self.model_contributions,
+            'operating_points': self.operating_points
         }
     
+    def measure_model_latency(self, X_sample: pd.DataFrame, repeats: int = 20) -> Dict[str, float]:
+        """Median single-row predict time of each model in milliseconds"""
+        row = X_sample.iloc[:1] if hasattr(X_sample, 'iloc') else X_sample[:1]
+        latency = {}
+        
+        for name, model in self.models.items():
+            try:
+                model.predict(row)
+                timings = []
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    model.predict(row)
+                    timings.append(time.perf_counter() - start)
+                latency[name] = float(np.median(timings) * 1000)
+            except Exception as e:
+                print(f"Error timing {name}: {e}")
+        
+        return latency
+    
+    def measure_compiled_latency(self, X_sample: pd.DataFrame, names: List[str],
+                                 repeats: int = 20) -> Optional[Dict[frozenset, float]]:
+        """Median single-row time of the compiled ensemble restricted to each subset of names, in ms.
+        
+        Single rows are served by the compiled arrays (up to compiled_max_rows),
+        where a subset's cost is one shared tree walk rather than the sum of its
+        native models. None if the models cannot be compiled.
+        """
+        from compiled_ensemble import CompiledEnsemble
+        
+        try:
+            compiled = CompiledEnsemble.from_models(self.models)
+        except Exception as e:
+            logger.warning("Could not compile the ensemble for timing: %s", e)
+            return None
+        
+        row = np.asarray(X_sample.iloc[:1] if hasattr(X_sample, 'iloc') else X_sample[:1], dtype=np.float64)
+        latency = {}
+        for size in range(1, len(names) + 1):
+            for subset in combinations(names, size):
+                weights = {name: 1.0 for name in subset}
+                compiled.predict(row, weights)
+                timings = []
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    compiled.predict(row, weights)
+                    timings.append(time.perf_counter() - start)
+                latency[frozenset(subset)] = float(np.median(timings) * 1000)
+        return latency
+    
+    def _build_operating_points(self, predictions: Dict, model_r2: Dict, y_val: pd.Series,
+                                subset_latency: Optional[Dict[frozenset, float]] = None) -> Tuple[List[Dict], Dict]:
+        """Cheapest-to-most-accurate ensembles, plus how much R² each model adds to the full one.
+        
+        Every subset of the candidate models is scored (255 for the default
+        eight), each re-weighted by its members' R² like the full ensemble.
+        Only subsets more accurate than every cheaper one are kept, along
+        with the full ensemble itself. A subset's latency is its compiled
+        single-row time from subset_latency when given, since that is the
+        path serving single rows, else the sum of its native models' times.
+        """
+        from sklearn.metrics import r2_score
+        
+        names = list(predictions)
+        scored = {}
+        
+        for size in range(1, len(names) + 1):
+            for subset in combinations(names, size):
+                total = sum(model_r2[name] for name in subset)
+                weights = {name: model_r2[name] / total for name in subset}
+                pred = sum(weight * predictions[name] for name, weight in weights.items())
+                native_ms = sum(self.model_latency_ms.get(name, 0.0) for name in subset)
+                scored[frozenset(subset)] = {
+                    'name': 'full' if size == len(names) else '+'.join(subset),
+                    'models': list(subset),
+                    'ensemble_weights': weights,
+                    'latency_ms': subset_latency[frozenset(subset)] if subset_latency else native_ms,
+                    'native_latency_ms': native_ms,
+                    'r2': float(r2_score(y_val, pred))
+                }
+        
+        full = scored[frozenset(names)]
+        contributions = {
+            name: full['r2'] - scored[frozenset(names) - {name}]['r2'] if len(names) > 1 else full['r2']
+            for name in names
+        }
+        
+        operating_points = []
+        for point in sorted(scored.values(), key=lambda p: (p['latency_ms'], -p['r2'])):
+            if point is full or not operating_points or point['r2'] > max(p['r2'] for p in operating_points):
+                operating_points.append(point)
+        
+        return operating_points, contributions
+    
+    def select_operating_point(self, name: Optional[str] = None,
+                               latency_budget_ms: Optional[float] = None) -> Dict:
+        """Switch ensemble_weights to a stored operating point, by name or as the most accurate within a budget"""
+        if not self.operating_points:
+            raise ValueError("No operating points stored; retrain to create them")
+        
+        if name is not None:
+            matches = [point for point in self.operating_points if point['name'] == name]
+            if not matches:
+                raise ValueError(f"Unknown operating point: {name}")
+            operating_point = matches[0]
+        else:
+            affordable = [point for point in self.operating_points
+                          if latency_budget_ms is None or point['latency_ms'] <= latency_budget_ms]
+            if affordable:
+                operating_point = max(affordable, key=lambda p: p['r2'])
+            else:
+                operating_point = min(self.operating_points, key=lambda p: p['latency_ms'])
+                logger.warning("No operating point fits %s ms, using the fastest", latency_budget_ms)
+        
+        # Replaced in one assignment so concurrent predictions see either set of weights
+        self.ensemble_weights = dict(operating_point['ensemble_weights'])
+        self.operating_point = operating_point['name']
+        return operating_point
+    
     def predict_yield(self, X: pd.DataFrame) -> Dict:
         """Predict yield using ensemble of models"""
         if not self.is_trained:
             raise ValueError("Models must be trained before making predictions")
         
+        ensemble_weights = self.ensemble_weights
+        
+        # Small batches walk the flat arrays; large ones amortise the native models' per-call overhead
+        if self.compiled is not None and (not self.models or self.compiled_max_rows is None
+                                          or len(X) <= self.compiled_max_rows):
+            return self.compiled.predict(X, ensemble_weights)
+        
         predictions = {}
         
         # Get predictions from individual models
         for name, model in self.models.items():
+            # Models outside the active operating point are not evaluated at all
+            if ensemble_weights and name not in ensemble_weights:
+                continue
             try:
                 pred = model.predict(X)
                 predictions[name] = pred
             except Exception as e:
-                print(f"Error getting prediction from {name}: {e}")
+                # Logged, not printed: this runs on serving threads
+                logger.warning("Error getting prediction from %s: %s", name, e)
         
         # Create ensemble prediction
-        if self.ensemble_weights:
+        if ensemble_weights:
             ensemble_pred = np.zeros(len(X))
-            for name, weight in self.ensemble_weights.items():
+            for name, weight in ensemble_weights.items():
                 if name in predictions:
                     ensemble_pred += weight * predictions[name]
             
@@ -278,6 +446,8 @@ class CropYieldPredictor:
     
     def evaluate_model(self, X_test: pd.DataFrame, y_test: pd.Series) -> Dict:
         """Evaluate model performance on test set"""
+        from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+        
         if not self.is_trained:
             raise ValueError("Models must be trained before evaluation")
         
@@ -304,7 +474,8 @@ class CropYieldPredictor:
             'models': self.models,
             'ensemble_weights': self.ensemble_weights,
             'feature_importance': self.feature_importance,
-            'is_trained': self.is_trained
+            'is_trained': self.is_trained,
+            **self._operating_point_data()
         }
         joblib.dump(model_data, filepath)
         print(f"Model saved to {filepath}")
@@ -316,12 +487,88 @@ class CropYieldPredictor:
         self.ensemble_weights = model_data['ensemble_weights']
         self.feature_importance = model_data['feature_importance']
         self.is_trained = model_data['is_trained']
-        print(f"Model loaded from {filepath}")
+        self._load_operating_point_data(model_data)
+        logger.info("Model loaded from %s", filepath)
+    
+    def artifact_parts(self) -> Tuple[Dict, Dict]:
+        """Each model and the compiled export as separate parts, plus the metadata kept in the manifest"""
+        parts = {f"models.{name}": model for name, model in self.models.items()}
+        if self.compiled is not None:
+            parts['compiled'] = self.compiled
+        metadata = {
+            'ensemble_weights': self.ensemble_weights,
+            'feature_importance': self.feature_importance,
+            'is_trained': self.is_trained,
+            **self._operating_point_data()
+        }
+        return parts, metadata
+    
+    def load_artifact_parts(self, parts: Dict, metadata: Dict):
+        """Restore from split artifact parts; any subset of the models may be given"""
+        self.models = {key.split('.', 1)[1]: model for key, model in parts.items() if key.startswith('models.')}
+        self.compiled = parts.get('compiled')
+        self.ensemble_weights = metadata['ensemble_weights']
+        self.feature_importance = metadata['feature_importance']
+        self.is_trained = metadata['is_trained']
+        self._load_operating_point_data(metadata)
+    
+    def _operating_point_data(self) -> Dict:
+        return {
+            'model_latency_ms': self.model_latency_ms,
+            'model_contributions': self.model_contributions,
+            'operating_points': self.operating_points,
+            'operating_point': self.operating_point
+        }
+    
+    def _load_operating_point_data(self, model_data: Dict):
+        # Artifacts saved before operating points existed have none
+        self.model_latency_ms = model_data.get('model_latency_ms', {})
+        self.model_contributions = model_data.get('model_contributions', {})
+        self.operating_points = model_data.get('operating_points', [])
+        self.operating_point = model_data.get('operating_point')
+    
+    def export_compiled(self, filepath: str):
+        """Save the ensemble flattened into numpy arrays for fast inference"""
+        from compiled_ensemble import CompiledEnsemble
+        
+        if not self.is_trained:
+            raise ValueError("Models must be trained before exporting")
+        
+        compiled = CompiledEnsemble.from_models(self.models)
+        model_data = {
+            'compiled': compiled,
+            'ensemble_weights': self.ensemble_weights,
+            'feature_importance': self.feature_importance,
+            'is_trained': self.is_trained,
+            **self._operating_point_data()
+        }
+        joblib.dump(model_data, filepath)
+        self.compiled = compiled
+        print(f"Compiled model saved to {filepath}")
+        return compiled
+    
+    def load_compiled(self, filepath: str, keep_models: bool = False):
+        """Load a compiled export; predictions no longer need the training libraries.
+        
+        With keep_models the native models already loaded stay, and serve
+        batches larger than compiled_max_rows.
+        """
+        model_data = joblib.load(filepath)
+        if not keep_models:
+            self.models = {}
+        self.compiled = model_data['compiled']
+        self.ensemble_weights = model_data['ensemble_weights']
+        self.feature_importance = model_data['feature_importance']
+        self.is_trained = model_data['is_trained']
+        self._load_operating_point_data(model_data)
+        logger.info("Compiled model loaded from %s", filepath)
     
     def predict_with_confidence(self, X: pd.DataFrame) -> Dict:
         """Predict yield with confidence intervals"""
-        predictions = self.predict_yield(X)
-        
+        return self.confidence_from_predictions(self.predict_yield(X), len(X))
+    
+    def confidence_from_predictions(self, predictions: Dict, n_samples: int) -> Dict:
+        """Derive confidence intervals from already computed model predictions"""
         if 'ensemble' in predictions:
             ensemble_pred = predictions['ensemble']
             
@@ -344,7 +591,7 @@ class CropYieldPredictor:
                 }
         
         return {
-            'prediction': predictions.get('ensemble', predictions.get('random_forest', [0] * len(X))),
+            'prediction': predictions.get('ensemble', predictions.get('random_forest', [0] * n_samples)),
             'confidence_lower': None,
             'confidence_upper': None,
             'uncertainty': None
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Yield Surrogate Grid
+Precomputes the yield ensemble on a grid per state/crop and answers by multilinear interpolation
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+SURROGATE_ARTIFACT = 'yield_surrogate.npz'
+
+# Numeric inputs gridded by default, over the ranges validate_input accepts
+DEFAULT_AXES = {
+    'soil_ph': (5.0, 8.5),
+    'soil_moisture': (20, 90),
+    'soil_nitrogen': (20, 100),
+    'soil_phosphorus': (15, 80),
+    'soil_potassium': (50, 250),
+    'avg_temperature': (15, 45),
+    'humidity': (30, 95),
+    'rainfall': (0, 20)
+}
+
+# Categorical inputs that select a slice of the grid instead of an axis
+SLICE_FIELDS = ('state', 'crop')
+
+
+class YieldSurrogate:
+    def __init__(self, axis_names: List[str], axes: List[np.ndarray], combos: List[Tuple[str, str]],
+                 ensemble: np.ndarray, uncertainty: np.ndarray, base_input: Dict, metadata: Dict):
+        self.axis_names = list(axis_names)
+        self.axes = [np.asarray(axis, dtype=np.float64) for axis in axes]
+        self.combos = [tuple(combo) for combo in combos]
+        self.combo_index = {combo: i for i, combo in enumerate(self.combos)}
+        # (n_combos, *grid_shape) values, flattened per combo for corner gathers
+        self.grid_shape = tuple(len(axis) for axis in self.axes)
+        self.ensemble = np.asarray(ensemble, dtype=np.float32).reshape(len(self.combos), -1)
+        self.uncertainty = np.asarray(uncertainty, dtype=np.float32).reshape(len(self.combos), -1)
+        # Every other model input the grid was evaluated at
+        self.base_input = dict(base_input)
+        self.metadata = dict(metadata)
+
+        n_axes = len(self.axes)
+        self.strides = np.array(
+            [int(np.prod(self.grid_shape[k + 1:])) for k in range(n_axes)], dtype=np.intp
+        )
+        # The 2^d corners of a grid cell as 0/1 offsets per axis
+        self.corners = ((np.arange(2 ** n_axes)[:, None] >> np.arange(n_axes)[::-1]) & 1).astype(np.intp)
+        self.corner_offsets = self.corners @ self.strides
+
+    def covers(self, input_data: Dict) -> bool:
+        """Whether the grid answers this input exactly as the ensemble would see it"""
+        if (str(input_data.get('state')), str(input_data.get('crop'))) not in self.combo_index:
+            return False
+
+        for name, axis in zip(self.axis_names, self.axes):
+            value = input_data.get(name)
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                return False
+            if not axis[0] <= value <= axis[-1]:
+                return False
+
+        # Anything else must be what the grid was built with
+        for name, base_value in self.base_input.items():
+            value = input_data.get(name, base_value)
+            if isinstance(base_value, str):
+                if str(value) != base_value:
+                    return False
+                continue
+            try:
+                if value is not None and float(value) != float(base_value):
+                    return False
+            except (TypeError, ValueError):
+                return False
+        return True
+
+    def interpolate(self, input_data: Dict) -> Tuple[float, float]:
+        """Ensemble yield and its uncertainty for one covered input"""
+        combo = self.combo_index[(str(input_data['state']), str(input_data['crop']))]
+        point = np.array([float(input_data[name]) for name in self.axis_names])
+
+        lower = np.empty(len(self.axes), dtype=np.intp)
+        fraction = np.empty(len(self.axes))
+        for k, axis in enumerate(self.axes):
+            i = min(max(int(np.searchsorted(axis, point[k], side='right')) - 1, 0), len(axis) - 2)
+            lower[k] = i
+            fraction[k] = (point[k] - axis[i]) / (axis[i + 1] - axis[i])
+
+        weights = np.where(self.corners, fraction, 1.0 - fraction).prod(axis=1)
+        flat = int(lower @ self.strides) + self.corner_offsets
+        return (float(self.ensemble[combo, flat] @ weights),
+                float(self.uncertainty[combo, flat] @ weights))
+
+    def predict(self, input_data: Dict) -> Dict:
+        """Prediction in the same shape as AgriculturalMLInference's yield results"""
+        ensemble, uncertainty = self.interpolate(input_data)
+        interval = 1.96 * uncertainty
+        return {
+            "ensemble_yield": ensemble,
+            "individual_models": {},
+            "confidence_interval": {
+                "lower": ensemble - interval,
+                "upper": ensemble + interval,
+                "uncertainty": uncertainty
+            },
+            "surrogate": {
+                "max_abs_error": self.metadata.get('interpolation_error', {}).get('max_abs'),
+                "mean_abs_error": self.metadata.get('interpolation_error', {}).get('mean_abs')
+            }
+        }
+
+    def save(self, filepath: str):
+        np.savez(
+            filepath,
+            ensemble=self.ensemble.reshape((len(self.combos),) + self.grid_shape),
+            uncertainty=self.uncertainty.reshape((len(self.combos),) + self.grid_shape),
+            **{f'axis_{k}': axis for k, axis in enumerate(self.axes)},
+            meta=np.array(json.dumps({
+                'axis_names': self.axis_names,
+                'combos': self.combos,
+                'base_input': self.base_input,
+                'metadata': self.metadata
+            }))
+        )
+        print(f"Yield surrogate saved to {filepath}")
+
+    @classmethod
+    def load(cls, filepath: str) -> 'YieldSurrogate':
+        with np.load(filepath) as data:
+            meta = json.loads(str(data['meta']))
+            axes = [data[f'axis_{k}'] for k in range(len(meta['axis_names']))]
+            return cls(meta['axis_names'], axes, meta['combos'], data['ensemble'],
+                       data['uncertainty'], meta['base_input'], meta['metadata'])
+
+
+def load_combos(database_path: str) -> List[Tuple[str, str]]:
+    """Every state/crop pair with yield data in the agricultural database"""
+    with open(database_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return [(state, crop) for state, crops in data.get('yieldData', {}).items() for crop in crops]
+
+
+def _evaluate(inference, base_input: Dict, axis_names: List[str], points: np.ndarray,
+              chunk_size: int = 65536) -> Tuple[np.ndarray, np.ndarray]:
+    """Run the full ensemble at each point, other inputs fixed, returning ensemble and uncertainty"""
+    encoder = inference.row_encoder
+    predictor = inference.yield_predictor
+    base_row = encoder.encode(base_input)
+    columns = [encoder.numeric_columns[name] for name in axis_names]
+
+    ensemble, uncertainty = [], []
+    for start in range(0, len(points), chunk_size):
+        chunk = points[start:start + chunk_size]
+        X = np.repeat(base_row, len(chunk), axis=0)
+        X[:, columns] = chunk
+        predictions = predictor.predict_yield(encoder.scale(X, 'yield'))
+        confidence = predictor.confidence_from_predictions(predictions, len(X))
+        ensemble.append(np.asarray(predictions['ensemble'], dtype=np.float64))
+        uncertainty.append(np.asarray(confidence['uncertainty'], dtype=np.float64)
+                           if confidence['uncertainty'] is not None else np.zeros(len(X)))
+    return np.concatenate(ensemble), np.concatenate(uncertainty)
+
+
+def build_surrogate(inference, combos: List[Tuple[str, str]], axes: Dict[str, Tuple[float, float, int]],
+                    check_points: int = 32, seed: int = 0) -> YieldSurrogate:
+    """Evaluate the loaded yield ensemble on the grid and measure interpolation error"""
+    from model_inference import DEFAULT_INPUT_VALUES
+
+    axis_names = list(axes)
+    unknown = [name for name in axis_names if name not in inference.row_encoder.numeric_columns]
+    if unknown:
+        raise ValueError(f"Not numeric model inputs: {', '.join(unknown)}")
+    if any(int(n) < 2 for _, _, n in axes.values()):
+        raise ValueError("Every axis needs at least 2 grid points")
+    axis_values = [np.linspace(lo, hi, int(n)) for lo, hi, n in axes.values()]
+    base_input = {
+        col: value for col, value in DEFAULT_INPUT_VALUES.items()
+        if col not in axis_names and col not in SLICE_FIELDS
+    }
+
+    mesh = np.stack(np.meshgrid(*axis_values, indexing='ij'), axis=-1).reshape(-1, len(axis_names))
+    ensemble = np.empty((len(combos), len(mesh)))
+    uncertainty = np.empty((len(combos), len(mesh)))
+
+    start_time = time.perf_counter()
+    for c, (state, crop) in enumerate(combos):
+        ensemble[c], uncertainty[c] = _evaluate(
+            inference, dict(base_input, state=state, crop=crop), axis_names, mesh
+        )
+    build_seconds = time.perf_counter() - start_time
+
+    surrogate = YieldSurrogate(axis_names, axis_values, combos, ensemble, uncertainty, base_input, {
+        'operating_point': inference.yield_predictor.operating_point,
+        'model_fingerprint': inference.model_fingerprint(),
+        'grid_points': int(len(mesh)),
+        'build_seconds': build_seconds
+    })
+
+    # Off-grid points drawn uniformly inside the grid, compared with the ensemble
+    rng = np.random.default_rng(seed)
+    errors = []
+    for state, crop in combos if check_points > 0 else []:
+        points = rng.uniform([a[0] for a in axis_values], [a[-1] for a in axis_values],
+                             size=(check_points, len(axis_names)))
+        exact, _ = _evaluate(inference, dict(base_input, state=state, crop=crop), axis_names, points)
+        approx = [
+            surrogate.interpolate(dict(zip(axis_names, point), state=state, crop=crop))[0]
+            for point in points.tolist()
+        ]
+        errors.append(np.abs(np.asarray(approx) - exact))
+    if errors:
+        errors = np.concatenate(errors)
+        surrogate.metadata['interpolation_error'] = {
+            'max_abs': float(errors.max()),
+            'mean_abs': float(errors.mean()),
+            'p95_abs': float(np.percentile(errors, 95)),
+            'check_points': len(errors)
+        }
+
+    return surrogate
+
+
+def parse_axes(specs: Optional[List[str]], points: int) -> Dict[str, Tuple[float, float, int]]:
+    """Default axes with `points` each, replaced by any name=lo:hi:n specs given"""
+    if not specs:
+        return {name: (lo, hi, points) for name, (lo, hi) in DEFAULT_AXES.items()}
+
+    axes = {}
+    for spec in specs:
+        name, _, bounds = spec.partition('=')
+        parts = bounds.split(':') if bounds else []
+        if len(parts) not in (0, 2, 3):
+            raise ValueError(f"Expected name or name=lo:hi[:n], got {spec!r}")
+        lo, hi = (float(parts[0]), float(parts[1])) if parts else DEFAULT_AXES[name]
+        axes[name] = (lo, hi, int(parts[2]) if len(parts) == 3 else points)
+    return axes
+
+
+def main():
+    """Build trained_models/yield_surrogate.npz from the trained yield ensemble"""
+    parser = argparse.ArgumentParser(description="Precompute the yield ensemble on an interpolation grid")
+    parser.add_argument("--models-dir", default="trained_models")
+    parser.add_argument("--database", default="../complete_agricultural_database.json")
+    parser.add_argument("--output", help=f"Output path (default: <models-dir>/{SURROGATE_ARTIFACT})")
+    parser.add_argument("--points", type=int, default=3, help="Grid points per axis")
+    parser.add_argument("--axis", action="append",
+                        help="Grid axis as name or name=lo:hi[:n]; repeat for each (default: all soil/weather inputs)")
+    parser.add_argument("--check-points", type=int, default=32,
+                        help="Random off-grid points per state/crop used to measure interpolation error")
+    args = parser.parse_args()
+
+    from model_inference import AgriculturalMLInference
+
+    inference = AgriculturalMLInference(args.models_dir)
+    with contextlib.redirect_stdout(sys.stderr):
+        if not inference.load_models(['preprocessor', 'yield_predictor']):
+            print("❌ Yield models are not available")
+            sys.exit(1)
+
+    combos = load_combos(args.database)
+    axes = parse_axes(args.axis, args.points)
+    print(f"Evaluating {len(combos)} state/crop pairs on a "
+          f"{' x '.join(str(n) for _, _, n in axes.values())} grid", file=sys.stderr)
+
+    surrogate = build_surrogate(inference, combos, axes, args.check_points)
+    surrogate.save(args.output or os.path.join(args.models_dir, SURROGATE_ARTIFACT))
+
+    error = surrogate.metadata.get('interpolation_error', {})
+    print(f"Built in {surrogate.metadata['build_seconds']:.1f}s; interpolation error "
+          f"max {error.get('max_abs', 0):.4f}, mean {error.get('mean_abs', 0):.4f}, "
+          f"p95 {error.get('p95_abs', 0):.4f} t/ha")
+
+
+if __name__ == "__main__":
+    main()
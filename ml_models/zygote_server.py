@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Zygote Fork-Server
+Loads the models once, then forks a fresh child per request so each prediction runs in its own process
+"""
+
+import os
+import gc
+import sys
+import json
+import math
+import time
+import signal
+import socket
+import logging
+import argparse
+import contextlib
+from typing import Dict
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from model_inference import AgriculturalMLInference
+from thread_config import InferenceThreadPolicy
+from prefork_server import bind_socket
+from predict_yield import generate_mock_yield_prediction
+from predict_crops import generate_mock_crop_recommendation
+from comprehensive_analysis import generate_mock_comprehensive_analysis
+
+MAX_REQUEST_BYTES = 1024 * 1024
+
+# task -> (prediction on loaded models, heuristic fallback)
+ZYGOTE_TASKS = {
+    "predict_yield": (
+        lambda inference, request: inference.predict_yield(request.get("input", {})),
+        generate_mock_yield_prediction
+    ),
+    "recommend_crops": (
+        lambda inference, request: inference.recommend_crops(request.get("input", {}),
+                                                             top_k=int(request.get("top_k", 5))),
+        generate_mock_crop_recommendation
+    ),
+    "comprehensive_analysis": (
+        lambda inference, request: inference.get_comprehensive_analysis(request.get("input", {})),
+        generate_mock_comprehensive_analysis
+    ),
+}
+
+
+def handle_request(inference: AgriculturalMLInference, request: Dict) -> Dict:
+    """Answer one decoded request the way the standalone scripts would"""
+    task = request.get("task")
+    if task not in ZYGOTE_TASKS:
+        return {"success": False, "error": f"Unknown task: {task}. Use one of {', '.join(ZYGOTE_TASKS)}"}
+
+    predict, fallback = ZYGOTE_TASKS[task]
+    if not inference.is_available(task):
+        return fallback(request.get("input", {}))
+    return predict(inference, request)
+
+
+class Zygote:
+    """Accepts connections and forks one child per connection, which answers a single request and exits.
+
+    The children inherit the loaded, frozen models copy-on-write, so they
+    start without importing or unpickling anything, yet a crash, leak or
+    runaway prediction only ever takes down one request.
+    """
+
+    def __init__(self, inference: AgriculturalMLInference, sock: socket.socket,
+                 max_children: int = 32, request_timeout: float = 30.0):
+        self.inference = inference
+        self.sock = sock
+        self.max_children = max_children
+        self.request_timeout = request_timeout
+        self.children = set()
+        self.stopping = False
+        self.stats = {"forked": 0, "failed": 0, "killed": 0}
+
+    def stop(self, *_):
+        self.stopping = True
+
+    def run(self) -> int:
+        """Accept and fork until SIGTERM/SIGINT, then wait for running children"""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        # Accept with a timeout so finished children are reaped and stop() is noticed
+        self.sock.settimeout(0.5)
+
+        while not self.stopping:
+            self._reap(block=len(self.children) >= self.max_children)
+            try:
+                conn, _ = self.sock.accept()
+            except (socket.timeout, InterruptedError):
+                continue
+            except OSError:
+                if self.stopping:
+                    break
+                raise
+
+            pid = os.fork()
+            if pid == 0:
+                self.sock.close()
+                os._exit(self._serve_child(conn))
+            conn.close()
+            self.children.add(pid)
+            self.stats["forked"] += 1
+
+        while self.children:
+            self._reap(block=True)
+        self.sock.close()
+        print(f"Zygote stopped after {self.stats['forked']} requests "
+              f"({self.stats['failed']} failed, {self.stats['killed']} timed out)", file=sys.stderr)
+        return 0
+
+    def _reap(self, block: bool = False):
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, 0 if block else os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            except InterruptedError:
+                continue
+            if pid == 0:
+                return
+            self.children.discard(pid)
+            if os.WIFSIGNALED(status) and os.WTERMSIG(status) == signal.SIGALRM:
+                self.stats["killed"] += 1
+            elif status != 0:
+                self.stats["failed"] += 1
+            block = False
+
+    def _serve_child(self, conn: socket.socket) -> int:
+        """Child process: read one JSON line, answer it and exit"""
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        # SIGALRM's default action ends a request that overruns its deadline
+        signal.alarm(max(1, math.ceil(self.request_timeout)))
+
+        status = 0
+        try:
+            conn.settimeout(self.request_timeout)
+            with conn, conn.makefile("rb") as reader:
+                line = reader.readline(MAX_REQUEST_BYTES + 1)
+                try:
+                    if len(line) > MAX_REQUEST_BYTES:
+                        raise ValueError("Request larger than 1 MB")
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("Request must be a JSON object")
+                    with contextlib.redirect_stdout(sys.stderr):
+                        result = handle_request(self.inference, request)
+                except ValueError as e:
+                    result = {"success": False, "error": f"Invalid request: {e}"}
+                except Exception as e:
+                    result = {"success": False, "error": str(e)}
+                    status = 1
+                conn.sendall((json.dumps(result) + "\n").encode("utf-8"))
+        except OSError:
+            status = 1
+        finally:
+            sys.stderr.flush()
+        return status
+
+
+def main():
+    """Load once, then fork a child per request"""
+    parser = argparse.ArgumentParser(description="Fork a pre-loaded child process per prediction request")
+    parser.add_argument("--unix-socket", default="/tmp/cropwise-ml-zygote.sock")
+    parser.add_argument("--port", type=int, help="Listen on 127.0.0.1:PORT instead of the Unix socket")
+    parser.add_argument("--models-dir", default="trained_models")
+    parser.add_argument("--max-children", type=int, default=os.cpu_count() or 4,
+                        help="Requests running at once; further connections wait in the listen backlog")
+    parser.add_argument("--request-timeout", type=float, default=30.0,
+                        help="Seconds before a child still reading or predicting is killed")
+    parser.add_argument("--warmup", action="store_true",
+                        help="Warm the models up in the zygote so every child starts warm")
+    parser.add_argument("--gc-freeze", action="store_true",
+                        help="Keep the children's garbage collector off the inherited objects")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    start = time.perf_counter()
+    # Children only ever score one row, so the native yield models are not loaded
+    inference = AgriculturalMLInference(args.models_dir, compiled_max_rows=None)
+    # One thread per model and no BLAS/OpenMP pools: native thread pools do not survive fork
+    inference.configure_threads(InferenceThreadPolicy(native_threads=1))
+    with contextlib.redirect_stdout(sys.stderr):
+        if not inference.load_models():
+            print("⚠️ Some models are not available, serving heuristic fallbacks for them")
+        if args.warmup:
+            inference.warmup()
+    inference.freeze()
+    print(f"Zygote ready in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+    if args.port is not None:
+        sock = bind_socket("127.0.0.1", args.port)
+        where = f"127.0.0.1:{args.port}"
+    else:
+        sock = bind_socket("", 0, args.unix_socket)
+        where = f"unix:{args.unix_socket}"
+    print(f"🧬 Zygote listening on {where}", file=sys.stderr)
+
+    if args.gc_freeze:
+        gc.collect()
+        gc.freeze()
+
+    try:
+        sys.exit(Zygote(inference, sock, args.max_children, args.request_timeout).run())
+    finally:
+        if args.port is None and os.path.exists(args.unix_socket):
+            os.unlink(args.unix_socket)
+
+
+if __name__ == "__main__":
+    main()